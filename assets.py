@@ -0,0 +1,103 @@
+"""Hashed, precompressed static files for the viewer page.
+
+Everything is read, hashed and compressed once at startup, so serving a
+request is a dict lookup. Hashed URLs never change content and are cached
+for a year; the page itself is revalidated with its ETag.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+MIN_COMPRESS_BYTES = 1024
+
+
+def accepted_encodings(header: str) -> set:
+    """Codings an ``Accept-Encoding`` header allows (those without ``q=0``)."""
+    accepted = set()
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip().replace(" ", "")
+        if coding and q not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class Asset:
+    """One file's bytes with their gzip/brotli variants and ETags."""
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str = REVALIDATE):
+        self.digest = hashlib.sha1(body).hexdigest()[:12]
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.variants = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = gzip.compress(body, 9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=11)
+
+    def response(self, accept_encoding: str = "", if_none_match: str = "",
+                 cache_control: str = None) -> tuple:
+        """``(status, body, headers)`` for the best variant the client accepts."""
+        accepted = accepted_encodings(accept_encoding)
+        encoding = next((e for e in ("br", "gzip") if e in self.variants and e in accepted), "identity")
+        # Each encoding is a different representation, so it gets its own tag.
+        etag = f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control or self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if if_none_match and etag_matches(if_none_match, etag):
+            return 304, b"", headers
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        headers["Content-Type"] = self.content_type
+        return 200, self.variants[encoding], headers
+
+
+class AssetBundle:
+    """The files in ``directory``, served under ``prefix`` with their hash in the name."""
+
+    def __init__(self, directory: str, prefix: str = "/static/"):
+        self.prefix = prefix
+        self._urls = {}   # name -> hashed URL
+        self._files = {}  # name or hashed name -> (Asset, immutable)
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path):
+                continue
+            with open(path, "rb") as fh:
+                body = fh.read()
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            if content_type.startswith("text/") or content_type.endswith("javascript"):
+                content_type += "; charset=utf-8"
+            asset = Asset(body, content_type, IMMUTABLE)
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{asset.digest}{ext}"
+            self._urls[name] = prefix + hashed
+            self._files[hashed] = (asset, True)
+            self._files[name] = (asset, False)
+
+    def url(self, name: str) -> str:
+        return self._urls[name]
+
+    def response(self, name: str, accept_encoding: str = "", if_none_match: str = "") -> tuple:
+        """Like Asset.response; unhashed names are served too, but revalidated."""
+        found = self._files.get(name)
+        if found is None:
+            return 404, b"Not found\n", {"Content-Type": "text/plain"}
+        asset, immutable = found
+        return asset.response(accept_encoding, if_none_match, None if immutable else REVALIDATE)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""Hardware-free benchmark for the capture -> encode -> HTTP streaming pipeline.
+
+Feeds a local video file (or a generated test pattern) through the same code
+the server uses and reports decode fps, encode cost, bytes per frame, and
+per-client throughput and latency for 1..N simulated HTTP clients.
+
+    python bench_pipeline.py                          # 1080p test pattern
+    python bench_pipeline.py --source clip.mp4 --clients 1,4,16
+    python bench_pipeline.py --compare bench_results.json --output after.json
+    python bench_pipeline.py --encoder opencv --encoder opencv:subsampling=444 \
+        --encoder turbojpeg:fast_dct=1      # JPEG encoders side by side
+
+Clients run as threads in the benchmark process, so with many clients their
+parsing competes with the server for the GIL. Compare runs made with the same
+settings on the same machine.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import statistics
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+import cv2
+import numpy as np
+from werkzeug.serving import make_server
+
+import encoders
+
+# Keep the viewer's last-frame cache in memory: a benchmark run must not
+# write JPEGs into the working tree.
+os.environ.setdefault("RTSP_VIEWER_LAST_FRAMES", "")
+import rtsp_viewer as viewer
+
+
+def make_test_pattern(path: str, width: int, height: int, frames: int, fps: float):
+    """Write a moving colour-bar clip so decode and encode see realistic detail."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    if not writer.isOpened():
+        raise SystemExit(f"Unable to write test pattern to {path}")
+    bars = np.zeros((height, width, 3), np.uint8)
+    colours = [(192, 192, 192), (0, 192, 192), (192, 192, 0), (0, 192, 0),
+               (192, 0, 192), (0, 0, 192), (192, 0, 0), (16, 16, 16)]
+    step = max(1, width // len(colours))
+    for i, colour in enumerate(colours):
+        bars[:, i * step:(i + 1) * step] = colour
+    rng = np.random.default_rng(0)
+    for n in range(frames):
+        frame = np.roll(bars, n * 4, axis=1)
+        noise = rng.integers(0, 24, (height // 4, width // 4, 1), np.uint8)
+        frame[: height // 4, : width // 4] = noise
+        cv2.putText(frame, f"{n:05d}", (width // 20, height // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                    height / 200, (255, 255, 255), max(1, height // 180), cv2.LINE_AA)
+        writer.write(frame)
+    writer.release()
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(values)
+    return {
+        "p50": round(statistics.median(ordered), 2),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def bench_decode(source: str, max_frames: int) -> tuple:
+    options = viewer.capture_options_for(source)
+    started = time.perf_counter()
+    cap = viewer.open_capture(source, options)
+    if cap is None:
+        raise SystemExit(f"Unable to open {source}")
+    open_ms = (time.perf_counter() - started) * 1000.0
+    frames = []
+    started = time.perf_counter()
+    while len(frames) < max_frames:
+        ok, frame = cap.read()
+        if not ok or frame is None:
+            break
+        frames.append(frame)
+    elapsed = time.perf_counter() - started
+    cap.release()
+    if not frames:
+        raise SystemExit(f"No frames decoded from {source}")
+    height, width = frames[0].shape[:2]
+    return frames, {
+        "open_ms": round(open_ms, 1),
+        "frames": len(frames),
+        "width": width,
+        "height": height,
+        "decode_fps": round(len(frames) / elapsed, 1),
+    }
+
+
+def bench_encode(frames: list, quality: int, widths: list, specs: list) -> list:
+    results = []
+    widths = [w for w in widths if w < frames[0].shape[1]]
+    for spec in specs:
+        try:
+            encoder = encoders.create(**encoders.parse_spec(spec))
+        except (ValueError, RuntimeError, OSError) as exc:
+            print(f"  skipping {spec}: {exc}")
+            continue
+        for width in [0] + widths:
+            view = viewer.FrameView(width=width) if width else viewer.FULL_FRAME
+            times, sizes = [], []
+            for frame in frames:
+                started = time.perf_counter()
+                buf = encoder.encode(view.apply(frame), quality)
+                times.append((time.perf_counter() - started) * 1000.0)
+                sizes.append(len(buf))
+            results.append({
+                "encoder": encoder.describe(),
+                "width": width or frames[0].shape[1],
+                "quality": quality,
+                "encode_ms": round(statistics.mean(times), 3),
+                "bytes_per_frame": int(statistics.mean(sizes)),
+            })
+    return results
+
+
+class StreamClient(threading.Thread):
+    """Reads /video_feed like a browser would and times every part."""
+
+    def __init__(self, port: int, path: str, publish_times: dict, stop: threading.Event):
+        super().__init__(daemon=True)
+        self.port = port
+        self.path = path
+        self.publish_times = publish_times
+        self.stop = stop
+        self.frames = 0
+        self.bytes = 0
+        self.latencies_ms = []
+        self.error = None
+
+    def run(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        try:
+            conn.request("GET", self.path)
+            resp = conn.getresponse()
+            while not self.stop.is_set():
+                if not resp.readline():  # boundary line
+                    break
+                headers = {}
+                while True:
+                    line = resp.readline().strip()
+                    if not line:
+                        break
+                    key, _, value = line.partition(b":")
+                    headers[key.strip().lower()] = value.strip()
+                body = resp.read(int(headers.get(b"content-length", b"0")))
+                resp.read(2)
+                received = time.perf_counter()
+                seq = headers.get(b"x-frame-seq")
+                if seq is None:
+                    continue  # placeholder frame, not a camera frame
+                published = self.publish_times.get(int(seq))
+                if published is not None:
+                    self.latencies_ms.append((received - published) * 1000.0)
+                self.frames += 1
+                self.bytes += len(body)
+        except Exception as exc:  # reported in the results, not fatal
+            self.error = repr(exc)
+        finally:
+            conn.close()
+
+
+def bench_clients(source: str, counts: list, duration: float, query: str) -> list:
+    # File sources hit EOF and "reconnect"; make that immediate so the clip loops.
+    viewer.CAPTURE_RETRY_DELAY_SEC = 0.0
+    server = make_server("127.0.0.1", 0, viewer.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    # Hold our own reference so the reader stays warm between rounds, and
+    # note when each frame is published to measure capture-to-client latency.
+    options = viewer.capture_options_for(source)
+    reader = viewer.capture_hub.acquire(source, options)
+    publish_times = {}
+
+    def on_publish():
+        seq = reader.seq
+        publish_times[seq] = time.perf_counter()
+        publish_times.pop(seq - 2000, None)
+
+    reader.add_listener(on_publish)
+    path = f"/video_feed?src={quote(source, safe='')}{'&' + query if query else ''}"
+    results = []
+    try:
+        for count in counts:
+            stop = threading.Event()
+            clients = [StreamClient(port, path, publish_times, stop) for _ in range(count)]
+            seq_before = reader.seq
+            cpu_before = time.process_time()
+            started = time.perf_counter()
+            for client in clients:
+                client.start()
+            time.sleep(duration)
+            stop.set()
+            elapsed = time.perf_counter() - started
+            cpu = time.process_time() - cpu_before
+            source_frames = reader.seq - seq_before
+            for client in clients:
+                client.join(timeout=5)
+            latencies = [ms for client in clients for ms in client.latencies_ms]
+            results.append({
+                "clients": count,
+                "source_fps": round(source_frames / elapsed, 1),
+                "per_client_fps": round(statistics.mean(c.frames for c in clients) / elapsed, 1),
+                "per_client_kbps": round(statistics.mean(c.bytes for c in clients) * 8 / 1000 / elapsed, 1),
+                "total_mbps": round(sum(c.bytes for c in clients) * 8 / 1e6 / elapsed, 2),
+                "latency_ms": _percentiles(latencies),
+                "cpu_percent": round(cpu / elapsed * 100.0, 1),
+                "errors": [c.error for c in clients if c.error],
+            })
+            print(f"  {count:>3} clients: {results[-1]['per_client_fps']} fps/client, "
+                  f"latency p50 {results[-1]['latency_ms']['p50']} ms, "
+                  f"cpu {results[-1]['cpu_percent']}%")
+            time.sleep(0.5)  # let disconnects settle before the next round
+    finally:
+        reader.remove_listener(on_publish)
+        viewer.capture_hub.release(reader)
+        server.shutdown()
+    return results
+
+
+def _flatten(prefix: str, value, out: dict):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            _flatten(f"{prefix}[{i}]", item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+
+def compare(previous: dict, current: dict):
+    before, after = {}, {}
+    for section in ("decode", "encode", "clients"):
+        _flatten(section, previous.get(section), before)
+        _flatten(section, current.get(section), after)
+    print("\nChange vs previous run:")
+    for key, new in after.items():
+        old = before.get(key)
+        if old in (None, 0) or old == new:
+            continue
+        print(f"  {key:<45} {old:>10} -> {new:<10} ({(new - old) / old * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--source", help="video file to use instead of a generated test pattern")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=150, help="frames to decode/encode")
+    parser.add_argument("--quality", type=int, default=viewer.JPEG_QUALITY)
+    parser.add_argument("--encode-widths", default="1280,640",
+                        help="extra downscaled widths to time the encode at")
+    parser.add_argument("--encoder", action="append", dest="encoders",
+                        help="JPEG encoder spec to time, e.g. 'turbojpeg:subsampling=422,fast_dct=1' "
+                             "(repeatable; default: every installed encoder). Streaming uses the configured one.")
+    parser.add_argument("--clients", default="1,2,4,8", help="client counts to simulate")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per client round")
+    parser.add_argument("--query", default="", help="extra /video_feed query, e.g. 'w=640&quality=60'")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    tmpdir = None
+    source = args.source
+    if source is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        source = os.path.join(tmpdir.name, "pattern.avi")
+        print(f"Generating {args.width}x{args.height} test pattern...")
+        make_test_pattern(source, args.width, args.height, args.frames, 30.0)
+
+    try:
+        print("Decoding...")
+        frames, decode = bench_decode(source, args.frames)
+        print(f"  {decode['decode_fps']} fps at {decode['width']}x{decode['height']}, open {decode['open_ms']} ms")
+        print("Encoding...")
+        widths = [int(w) for w in args.encode_widths.split(",") if w]
+        specs = args.encoders or [name for name in encoders.ENCODERS
+                                  if name != "turbojpeg" or encoders.turbojpeg is not None]
+        encode = bench_encode(frames, args.quality, widths, specs)
+        for row in encode:
+            print(f"  {row['encoder']:<36} {row['width']:>5} px: {row['encode_ms']} ms/frame, "
+                  f"{row['bytes_per_frame']} bytes")
+        del frames
+        print("Streaming...")
+        counts = [int(n) for n in args.clients.split(",") if n]
+        clients = bench_clients(source, counts, args.duration, args.query)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "source": args.source or f"pattern {args.width}x{args.height}",
+            "query": args.query,
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "stream_encoder": viewer.JPEG_ENCODER.describe(),
+            "cpu_count": os.cpu_count(),
+            "machine": platform.machine(),
+        },
+        "decode": decode,
+        "encode": encode,
+        "clients": clients,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"\nSaved {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            compare(json.load(fh), results)
+
+
+if __name__ == "__main__":
+    main()
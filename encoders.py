@@ -0,0 +1,116 @@
+"""JPEG encoders for the viewer, chosen in the "jpeg" config section.
+
+``opencv`` (cv2.imencode) is always available. ``turbojpeg`` calls
+libjpeg-turbo through PyTurboJPEG (``pip install PyTurboJPEG`` plus the
+libturbojpeg library), skipping OpenCV's intermediate buffers, and can use
+the fast integer DCT. ``bench_pipeline.py --encoder`` times them side by side.
+"""
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+try:
+    import turbojpeg
+except ImportError:  # optional: OpenCV only
+    turbojpeg = None
+
+SUBSAMPLING = ("444", "422", "420")
+
+
+def _flag(value) -> bool:
+    return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes", "on")
+
+
+class Encoder(ABC):
+    """Turns a BGR frame into JPEG bytes (any buffer), or None on failure."""
+
+    name = ""
+
+    def __init__(self, subsampling: str = "420", **options):
+        subsampling = str(subsampling)
+        if subsampling not in SUBSAMPLING:
+            raise ValueError(f"subsampling must be one of {', '.join(SUBSAMPLING)}")
+        self.options = {"subsampling": subsampling, **options}
+
+    def describe(self) -> str:
+        """The encoder as a spec string, as parse_spec() reads it."""
+        return self.name + ":" + ",".join(f"{k}={int(v) if isinstance(v, bool) else v}"
+                                          for k, v in self.options.items() if v is not None)
+
+    @abstractmethod
+    def encode(self, frame, quality: int):
+        """JPEG for BGR ``frame`` at ``quality``, or None if encoding failed."""
+
+
+class OpenCVEncoder(Encoder):
+    """cv2.imencode. ``optimize`` builds optimal Huffman tables: a few % smaller, slower."""
+
+    name = "opencv"
+
+    def __init__(self, subsampling: str = "420", optimize: bool = False):
+        super().__init__(subsampling, optimize=_flag(optimize))
+        self._params = [int(cv2.IMWRITE_JPEG_OPTIMIZE), int(self.options["optimize"])]
+        if self.options["subsampling"] != "420":  # libjpeg's default; not settable before OpenCV 4.5.5
+            factor = getattr(cv2, f"IMWRITE_JPEG_SAMPLING_FACTOR_{subsampling}", None)
+            if factor is None:
+                raise ValueError(f"OpenCV {cv2.__version__} can't set {subsampling} subsampling")
+            self._params += [int(cv2.IMWRITE_JPEG_SAMPLING_FACTOR), int(factor)]
+
+    def encode(self, frame, quality: int):
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)] + self._params)
+        return buf if ok else None
+
+
+class TurboJPEGEncoder(Encoder):
+    """libjpeg-turbo via PyTurboJPEG. ``fast_dct`` trades a little accuracy for speed."""
+
+    name = "turbojpeg"
+
+    def __init__(self, subsampling: str = "420", fast_dct: bool = False, library: str = None):
+        super().__init__(subsampling, fast_dct=_flag(fast_dct), library=library)
+        if turbojpeg is None:
+            raise RuntimeError("PyTurboJPEG is not installed")
+        self._tj = turbojpeg.TurboJPEG(library)  # raises if libturbojpeg can't be loaded
+        self._subsample = {"444": turbojpeg.TJSAMP_444, "422": turbojpeg.TJSAMP_422,
+                           "420": turbojpeg.TJSAMP_420}[self.options["subsampling"]]
+        self._flags = turbojpeg.TJFLAG_FASTDCT if self.options["fast_dct"] else 0
+
+    def encode(self, frame, quality: int):
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)  # crops are views with a wider pitch
+        try:
+            return self._tj.encode(frame, quality=int(quality), pixel_format=turbojpeg.TJPF_BGR,
+                                   jpeg_subsample=self._subsample, flags=self._flags)
+        except OSError:
+            return None
+
+
+ENCODERS = {cls.name: cls for cls in (OpenCVEncoder, TurboJPEGEncoder)}
+
+
+def create(encoder: str = "opencv", **options) -> Encoder:
+    """The encoder named ``encoder`` with ``options``.
+
+    Raises ValueError for unknown names or options, and RuntimeError (or
+    OSError) when an optional backend can't be loaded.
+    """
+    cls = ENCODERS.get(encoder)
+    if cls is None:
+        raise ValueError(f"unknown JPEG encoder: {encoder} (have {', '.join(ENCODERS)})")
+    try:
+        return cls(**options)
+    except TypeError as exc:
+        raise ValueError(f"{encoder}: {exc}") from None
+
+
+def parse_spec(spec: str) -> dict:
+    """``"turbojpeg:subsampling=422,fast_dct=1"`` -> keyword arguments for create()."""
+    name, _, rest = spec.partition(":")
+    settings = {"encoder": name.strip()}
+    for item in filter(None, rest.split(",")):
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"expected key=value in {spec!r}")
+        settings[key.strip()] = value.strip()
+    return settings
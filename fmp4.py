@@ -0,0 +1,132 @@
+"""Just enough ISO-BMFF (MP4) parsing to fan out a fragmented MP4 stream.
+
+FFmpeg remuxes the camera's packets into ``ftyp moov (moof mdat)*``; the
+viewer needs to know where the init segment ends, which fragments start
+with a keyframe, and the codec string for MediaSource.isTypeSupported().
+"""
+import struct
+
+SAMPLE_NON_SYNC = 0x00010000
+
+
+def read_box(stream):
+    """``(type, whole_box_bytes)`` for the next top-level box, or None at EOF."""
+    header = stream.read(8)
+    if len(header) < 8:
+        return None
+    size, kind = struct.unpack(">I4s", header)
+    if size == 1:
+        large = stream.read(8)
+        if len(large) < 8:
+            return None
+        header += large
+        size = struct.unpack(">Q", large)[0]
+    elif size == 0:
+        raise ValueError(f"unbounded '{kind.decode('latin-1')}' box in a live stream")
+    payload = stream.read(size - len(header))
+    if len(payload) < size - len(header):
+        return None
+    return kind, header + payload
+
+
+def iter_boxes(data: bytes, offset: int = 0, end: int = None):
+    """Yield ``(type, payload_start, box_end)`` for boxes in ``data[offset:end]``."""
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        start = offset + 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, start)[0]
+            start += 8
+        elif size == 0:
+            size = end - offset
+        if size < start - offset or offset + size > end:
+            return
+        yield kind, start, offset + size
+        offset += size
+
+
+def find_box(data: bytes, path: tuple, offset: int = 0, end: int = None):
+    """``(payload_start, box_end)`` of the first box along ``path``, or None."""
+    for kind, start, stop in iter_boxes(data, offset, end):
+        if kind != path[0]:
+            continue
+        if len(path) == 1:
+            return start, stop
+        return find_box(data, path[1:], start, stop)
+    return None
+
+
+def codec_string(init: bytes):
+    """RFC 6381 codec string (e.g. ``avc1.64001f``) of the first video track."""
+    found = find_box(init, (b"moov", b"trak", b"mdia", b"minf", b"stbl", b"stsd"))
+    if found is None:
+        return None
+    # stsd: version/flags, entry count, then sample entries. Visual sample
+    # entries have 78 bytes of fixed fields before their child boxes.
+    start, stop = found
+    for kind, entry, entry_end in iter_boxes(init, start + 8, stop):
+        children = entry + 78
+        if kind in (b"avc1", b"avc3"):
+            config = find_box(init, (b"avcC",), children, entry_end)
+            if config is None:
+                return kind.decode()
+            c = init[config[0]:config[0] + 4]
+            return f"{kind.decode()}.{c[1]:02x}{c[2]:02x}{c[3]:02x}"
+        if kind in (b"hvc1", b"hev1"):
+            config = find_box(init, (b"hvcC",), children, entry_end)
+            if config is None:
+                return kind.decode()
+            return _hevc_codec(kind.decode(), init[config[0]:config[0] + 13])
+        return kind.decode("latin-1")
+    return None
+
+
+def _hevc_codec(kind: str, c: bytes) -> str:
+    space = "", "A", "B", "C"
+    compat = int.from_bytes(c[2:6], "big")
+    compat = int(f"{compat:032b}"[::-1], 2)  # ISO/IEC 14496-15 wants it bit-reversed
+    constraints = c[6:12].rstrip(b"\0")
+    parts = [kind, f"{space[c[1] >> 6]}{c[1] & 0x1f}", f"{compat:x}",
+             f"{'H' if c[1] & 0x20 else 'L'}{c[12]}"]
+    parts += [f"{b:X}" for b in constraints]
+    return ".".join(parts)
+
+
+def default_sample_flags(init: bytes) -> int:
+    """Default sample flags from ``moov/mvex/trex`` (0 if absent)."""
+    found = find_box(init, (b"moov", b"mvex", b"trex"))
+    if found is None:
+        return 0
+    # version/flags, track_ID, description index, duration, size, flags
+    return struct.unpack_from(">I", init, found[0] + 20)[0]
+
+
+def starts_with_keyframe(moof: bytes, default_flags: int = 0) -> bool:
+    """Whether the first sample of the fragment is a sync sample."""
+    traf = find_box(moof, (b"moof", b"traf"))
+    if traf is None:
+        return False
+    flags = default_flags
+    tfhd = find_box(moof, (b"tfhd",), *traf)
+    if tfhd is not None:
+        tf_flags = struct.unpack_from(">I", moof, tfhd[0])[0] & 0xFFFFFF
+        pos = tfhd[0] + 8  # version/flags, track_ID
+        for bit, size in ((0x01, 8), (0x02, 4), (0x08, 4), (0x10, 4)):
+            if tf_flags & bit:
+                pos += size
+        if tf_flags & 0x20:
+            flags = struct.unpack_from(">I", moof, pos)[0]
+    trun = find_box(moof, (b"trun",), *traf)
+    if trun is not None:
+        tr_flags = struct.unpack_from(">I", moof, trun[0])[0] & 0xFFFFFF
+        pos = trun[0] + 8  # version/flags, sample_count
+        if tr_flags & 0x01:
+            pos += 4  # data_offset
+        if tr_flags & 0x04:
+            flags = struct.unpack_from(">I", moof, pos)[0]
+        elif tr_flags & 0x400:
+            # Per-sample flags follow duration and size when present.
+            pos += 4 * bool(tr_flags & 0x100) + 4 * bool(tr_flags & 0x200)
+            flags = struct.unpack_from(">I", moof, pos)[0]
+    return not flags & SAMPLE_NON_SYNC
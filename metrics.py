@@ -0,0 +1,147 @@
+"""Minimal Prometheus text-format metrics for the viewer (no client library needed)."""
+import threading
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{format_labels(self.labels, key)} {value}" for key, value in items]
+
+    def take(self) -> dict:
+        """Every series, removed, e.g. to ship counts since the last take() to another process."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def add(self, values: dict):
+        """Add another process's take() to these totals."""
+        with self._lock:
+            for labels, amount in values.items():
+                self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def replace(self, values: dict):
+        """Swap in a fresh ``{labels: value}`` snapshot, dropping stale series."""
+        with self._lock:
+            self._values = dict(values)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = ()):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def add(self, values: dict):
+        """Add another process's take() to these buckets."""
+        with self._lock:
+            for labels, (counts, total, count) in values.items():
+                state = self._values.get(labels)
+                if state is None:
+                    state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+
+    def samples(self) -> list:
+        with self._lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            for bound, n in zip(self.buckets, counts):
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le)} {n}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le)} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors that produce gauges on demand at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = ()) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, collect):
+        """``collect()`` refreshes gauges just before each render."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for metric in self._metrics:
+            lines += metric.header()
+            lines += metric.samples()
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+REGISTRY = Registry()
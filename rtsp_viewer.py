@@ -1,1183 +1,3279 @@
 #!/usr/bin/env python3
+import atexit
+import base64
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import threading
 import time
+import zlib
+from hashlib import sha1
+from dataclasses import asdict, dataclass, field, fields, replace
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+from multiprocessing import shared_memory
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
 import cv2
-from flask import Flask, Response, render_template_string, request
+import numpy as np
+from flask import Flask, Response, abort, jsonify, request, send_file
+
+import assets
+import encoders
+import fmp4
+import metrics
+
+try:
+    from flask_sock import Sock
+    from simple_websocket import ConnectionClosed
+except ImportError:  # /ws_feed is optional in the Flask app; the ASGI app has it built in
+    Sock = None
 
 # ==== Defaults (can be overridden from UI via querystring) ====
 DEFAULT_RTSP_URL = "rtsp://192.168.1.164:554/stream1"
 
-CAPTURE_RETRY_DELAY_SEC = 2.0
+# Reconnect backoff: CAPTURE_RETRY_DELAY_SEC doubles per consecutive failure
+# up to CAPTURE_RETRY_MAX_DELAY_SEC, with jitter. After CAPTURE_MAX_ATTEMPTS
+# consecutive failures (0 = never) the source is reported as failed.
+CAPTURE_RETRY_DELAY_SEC = 1.0
+CAPTURE_RETRY_MAX_DELAY_SEC = 30.0
+CAPTURE_MAX_ATTEMPTS = 12
+PLACEHOLDER_INTERVAL_SEC = 2.0
 JPEG_QUALITY = 80  # 0..100
 
-app = Flask(__name__)
-
-HTML = r"""
-<!doctype html>
-<html lang="en">
-<head>
-  <meta charset="utf-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <title>Lettuce Stream</title>
-  <style>
-    :root{
-      --overlay-x: 50%;
-      --overlay-y: 50%;
-    }
-    html, body { height: 100%; margin: 0; }
-    body {
-      min-height: 100vh;
-      display: grid;
-      grid-template-columns: minmax(260px, 22vw) 1fr;
-      grid-template-rows: auto 1fr;
-      background: var(--bg, #101418);
-      color: #e8e8e8;
-      font-family: system-ui, -apple-system, Segoe UI, Roboto, Helvetica, Arial, "Apple Color Emoji", "Segoe UI Emoji", "Segoe UI Symbol";
-      transition: grid-template-columns 0.3s ease;
-    }
-    body.panel-collapsed {
-      grid-template-columns: 0 1fr;
-    }
-    header {
-      grid-column: 1 / -1;
-      padding: 12px 16px 6px;
-      display: flex;
-      align-items: flex-start;
-      justify-content: flex-start;
-      flex-wrap: wrap;
-      gap: 4px;
-      background: rgba(0,0,0,0.25);
-      backdrop-filter: blur(6px);
-      border-bottom: 1px solid rgba(255,255,255,0.07);
-      position: sticky;
-      top: 0;
-      z-index: 10;
-    }
-    .title-trigger {
-      appearance: none;
-      border: none;
-      background: transparent;
-      color: inherit;
-      font: inherit;
-      font-weight: 700;
-      font-size: 20px;
-      letter-spacing: 0.02em;
-      display: inline-flex;
-      align-items: center;
-      gap: 6px;
-      cursor: pointer;
-      padding: 6px 10px;
-      border-radius: 12px;
-      transition: background 0.2s ease;
-    }
-    .title-trigger:hover,
-    .title-trigger:focus-visible {
-      background: rgba(255,255,255,0.08);
-      outline: none;
-    }
-    .title-trigger .brand-suffix::before {
-      content: attr(data-prefix);
-      display: inline;
-    }
-    .title-trigger .brand-suffix:empty::before {
-      content: '';
-    }
-    .menu-hint {
-      flex-basis: 100%;
-      font-size: 12px;
-      opacity: 0.75;
-      padding-left: 12px;
-      transition: opacity 0.3s ease, transform 0.3s ease;
-    }
-    .menu-hint.is-hidden {
-      opacity: 0;
-      transform: translateY(-4px);
-      pointer-events: none;
-    }
-    main {
-      grid-row: 2;
-      grid-column: 2;
-      position: relative;
-      overflow: hidden;
-      min-height: 0;
-    }
-    body.panel-collapsed main {
-      grid-column: 1 / span 2;
-    }
-    .stream-frame {
-      position: absolute;
-      top: clamp(20px, 6vh, 80px);
-      left: clamp(20px, 8vw, 140px);
-      width: min(80vw, 1100px);
-      height: min(70vh, 660px);
-      display: block;
-      border-radius: 18px;
-      background: transparent;
-      box-shadow: none;
-      border: none;
-      overflow: visible;
-    }
-    .stage {
-      position: relative;
-      width: 100%;
-      height: 100%;
-      display: flex;
-      align-items: center;
-      justify-content: center;
-      background: rgba(0,0,0,0.55);
-      border-radius: inherit;
-      overflow: hidden;
-      box-shadow: 0 20px 55px rgba(0,0,0,0.45);
-      backdrop-filter: blur(2px);
-      min-width: 220px;
-      min-height: 160px;
-    }
-    .stage img {
-      width: 100%;
-      height: 100%;
-      object-fit: contain;
-      border-radius: inherit;
-      background: #000;
-    }
-    .frame-handle {
-      position: absolute;
-      top: 12px;
-      left: 12px;
-      display: inline-flex;
-      align-items: center;
-      justify-content: center;
-      gap: 6px;
-      padding: 6px 12px;
-      font-size: 11px;
-      letter-spacing: 0.18em;
-      text-transform: uppercase;
-      cursor: grab;
-      background: rgba(0,0,0,0.55);
-      border-radius: 999px;
-      border: 1px solid rgba(255,255,255,0.18);
-      user-select: none;
-      z-index: 3;
-      color: rgba(255,255,255,0.8);
-    }
-    .frame-handle:active {
-      cursor: grabbing;
-    }
-    .frame-resizer {
-      position: absolute;
-      right: -12px;
-      bottom: -12px;
-      width: 26px;
-      height: 26px;
-      border-radius: 8px;
-      border: 1px solid rgba(255,255,255,0.3);
-      background: rgba(0,0,0,0.65);
-      cursor: nwse-resize;
-      display: flex;
-      align-items: center;
-      justify-content: center;
-      font-size: 12px;
-      color: rgba(255,255,255,0.85);
-      user-select: none;
-      z-index: 3;
-      box-shadow: 0 12px 30px rgba(0,0,0,0.4);
-    }
-    .overlay {
-      position: absolute;
-      top: var(--overlay-y);
-      left: var(--overlay-x);
-      transform: translate(-50%, -50%);
-      pointer-events: auto;
-      cursor: grab;
-      padding: 12px;
-      max-width: min(90vw, 1200px);
-      width: max-content;
-      display: inline-flex;
-      justify-content: center;
-      touch-action: none;
-      z-index: 4;
-    }
-    .overlay:active { cursor: grabbing; }
-    .overlay-inner {
-      width: auto;
-      text-align: center;
-      font-size: clamp(18px, 4vw, 48px);
-      font-weight: 700;
-      line-height: 1.2;
-      color: var(--text, #ffffff);
-      text-shadow: 0 2px 10px rgba(0,0,0,0.65);
-      white-space: pre-wrap;
-      user-select: none;
-      pointer-events: none;
-    }
-    .expand-control {
-      position: absolute;
-      bottom: 14px;
-      right: 14px;
-      padding: 8px 12px;
-      border-radius: 999px;
-      border: 1px solid rgba(255,255,255,0.25);
-      background: rgba(0,0,0,0.55);
-      color: #fff;
-      font-size: 18px;
-      line-height: 1;
-      opacity: 0;
-      transform: translateY(8px);
-      transition: opacity 0.2s ease, transform 0.2s ease;
-      pointer-events: none;
-      z-index: 2;
-    }
-    .stage:hover .expand-control,
-    .stage:focus-within .expand-control {
-      opacity: 1;
-      pointer-events: auto;
-      transform: translateY(0);
-    }
-    .expand-control:focus-visible {
-      outline: 2px solid rgba(255,255,255,0.75);
-      outline-offset: 2px;
-    }
-    .stage.fullscreen-active img {
-      border-radius: 0;
-      box-shadow: none;
-    }
-    .control-panel {
-      grid-row: 2;
-      grid-column: 1;
-      background: rgba(0,0,0,0.35);
-      border-right: 1px solid rgba(255,255,255,0.07);
-      display: flex;
-      flex-direction: column;
-      max-height: 100%;
-      transition: transform 0.3s ease;
-      overflow: hidden;
-    }
-    .control-panel.collapsed {
-      transform: translateX(-100%);
-      pointer-events: none;
-    }
-    .panel-scroll {
-      padding: 18px;
-      overflow-y: auto;
-      display: grid;
-      gap: 18px;
-    }
-    .panel-section {
-      background: rgba(0,0,0,0.25);
-      border: 1px solid rgba(255,255,255,0.08);
-      border-radius: 12px;
-      overflow: hidden;
-    }
-    .panel-section summary {
-      list-style: none;
-      cursor: pointer;
-      padding: 14px 18px;
-      display: flex;
-      align-items: center;
-      justify-content: space-between;
-      gap: 12px;
-      font-weight: 600;
-    }
-    .panel-section summary::-webkit-details-marker { display: none; }
-    .panel-section[open] summary .chevron { transform: rotate(180deg); }
-    .panel-section .chevron { transition: transform 0.2s ease; }
-    .panel-section .section-body {
-      display: grid;
-      gap: 12px;
-      padding: 0 18px 18px;
-    }
-    .panel-section label {
-      font-size: 12px;
-      opacity: 0.92;
-      display: flex;
-      flex-direction: column;
-      gap: 6px;
-    }
-    .panel-section input[type="text"],
-    .panel-section input[type="password"],
-    .panel-section input[type="color"],
-    .panel-section select {
-      padding: 6px 8px;
-      border-radius: 8px;
-      border: 1px solid rgba(255,255,255,0.15);
-      background: rgba(0,0,0,0.2);
-      color: #f3f3f3;
-      outline: none;
-    }
-    .panel-section button {
-      padding: 8px 12px;
-      border-radius: 10px;
-      border: 1px solid rgba(255,255,255,0.15);
-      background: rgba(255,255,255,0.05);
-      color: #fff;
-      cursor: pointer;
-    }
-    .section-actions {
-      display: flex;
-      gap: 12px;
-      flex-wrap: wrap;
-    }
-    .panel-hint {
-      font-size: 12px;
-      opacity: 0.75;
-    }
-    .stream-frame.fullscreen-mode .frame-handle,
-    .stream-frame.fullscreen-mode .frame-resizer {
-      display: none;
-    }
-    .stage.fullscreen-active ~ .frame-resizer,
-    .stage.fullscreen-active ~ .frame-handle {
-      display: none;
-    }
-    @media (max-width: 900px) {
-      body {
-        grid-template-columns: 1fr;
-        grid-template-rows: auto 1fr;
-      }
-      main {
-        grid-column: 1;
-      }
-      .control-panel {
-        grid-column: 1;
-        grid-row: 2;
-        max-height: 320px;
-      }
-      body.panel-collapsed {
-        grid-template-rows: auto 1fr;
-      }
-      body.panel-collapsed main {
-        grid-row: 2;
-      }
-      .stream-frame {
-        left: clamp(16px, 8vw, 60px);
-      }
-    }
-    .sticker-layer {
-      position: absolute;
-      inset: 0;
-      pointer-events: none;
-      z-index: 2;
-    }
-    .sticker {
-      position: absolute;
-      transform: translate(-50%, -50%);
-      pointer-events: auto;
-      cursor: grab;
-      max-width: 40vw;
-      max-height: 40vh;
-      box-shadow: 0 12px 35px rgba(0,0,0,0.35);
-      border-radius: 12px;
-      overflow: hidden;
-      border: 1px solid rgba(255,255,255,0.2);
-      background: rgba(0,0,0,0.45);
-      touch-action: none;
-    }
-    .sticker:active { cursor: grabbing; }
-    .sticker img {
-      display: block;
-      width: 100%;
-      height: auto;
-      pointer-events: none;
-    }
-    .sticker-remove {
-      position: absolute;
-      top: 6px;
-      right: 6px;
-      border: none;
-      background: rgba(0,0,0,0.65);
-      color: #fff;
-      width: 22px;
-      height: 22px;
-      border-radius: 999px;
-      font-size: 14px;
-      line-height: 1;
-      display: flex;
-      align-items: center;
-      justify-content: center;
-      cursor: pointer;
-    }
-    .panel-section input[type="file"] {
-      border: 1px dashed rgba(255,255,255,0.25);
-      padding: 8px;
-      border-radius: 8px;
-      background: rgba(0,0,0,0.2);
-      color: #f3f3f3;
-    }
-    .panel-section label.checkbox {
-      flex-direction: row;
-      align-items: center;
-      gap: 8px;
-    }
-  </style>
-</head>
-<body>
-  <header>
-    <button class="title-trigger" id="menuToggle" type="button" aria-expanded="true" aria-controls="rtspPanel">
-      <span class="brand-name" id="brandName">Lettuce Stream</span>
-      <span class="brand-emoji" id="brandEmoji" aria-hidden="true">🥬</span>
-      <span class="brand-suffix" id="brandSuffix" data-prefix=" "></span>
-    </button>
-    <span class="menu-hint" id="menuHint">Click to Start!</span>
-  </header>
-
-  <aside class="control-panel" id="rtspPanel">
-    <div class="panel-scroll">
-      <details class="panel-section" open>
-        <summary>
-          <span>Appearance</span>
-          <span class="chevron">⌄</span>
-        </summary>
-        <div class="section-body">
-          <label>Background <input id="bg" type="color" /></label>
-          <label>Text color <input id="fg" type="color" value="#ffffff" /></label>
-          <label>Overlay text <input id="text" type="text" placeholder="Type overlay text…" /></label>
-          <label>Position
-            <select id="pos">
-              <option value="center">Center</option>
-              <option value="top-left">Top-Left</option>
-              <option value="top-right">Top-Right</option>
-              <option value="bottom-left">Bottom-Left</option>
-              <option value="bottom-right">Bottom-Right</option>
-              <option value="custom">Custom (drag)</option>
-            </select>
-          </label>
-          <label>Header name <input id="headerSuffix" type="text" placeholder="Add your name" /></label>
-          <label class="checkbox"><input id="showEmoji" type="checkbox" checked /> Show lettuce icon</label>
-          <label>Sticker upload <input id="stickerUpload" type="file" accept="image/*" /></label>
-          <div class="section-actions">
-            <button id="saveStyle" type="button">Save</button>
-            <button id="clearStyle" type="button">Clear</button>
-            <button id="clearStickers" type="button">Clear stickers</button>
-          </div>
-          <span class="panel-hint">Tip: Drag overlay text or stickers anywhere over the video or background.</span>
-        </div>
-      </details>
-      <details class="panel-section" open>
-        <summary>
-          <span>Stream source</span>
-          <span class="chevron">⌄</span>
-        </summary>
-        <div class="section-body">
-          <label>User
-            <input id="u" type="text" placeholder="username" />
-          </label>
-          <label>Pass
-            <input id="p" type="password" placeholder="password" />
-          </label>
-          <label>IP
-            <input id="ip" type="text" placeholder="192.168.1.164" />
-          </label>
-          <label>Port
-            <input id="port" type="text" value="554" />
-          </label>
-          <label>Path
-            <input id="path" type="text" value="/stream1" />
-          </label>
-          <div class="section-actions">
-            <button id="saveRtsp" type="button">Save</button>
-          </div>
-          <span class="panel-hint">Tip: Many cameras use <code>/stream1</code> (HD) and <code>/stream2</code> (SD).</span>
-        </div>
-      </details>
-    </div>
-  </aside>
-
-  <main>
-    <div id="stickerLayer" class="sticker-layer"></div>
-    <div class="stream-frame" id="streamFrame">
-      <div class="frame-handle" id="frameHandle" title="Drag to move stream">⋮⋮</div>
-      <div class="stage" id="stage">
-        <img id="feed" src="/video_feed" alt="RTSP stream" />
-        <button id="expandToggle" class="expand-control" type="button" aria-label="Toggle fullscreen">⤢</button>
-      </div>
-      <div class="frame-resizer" id="frameResizer" title="Drag to resize">⤢</div>
-    </div>
-    <div id="overlay" class="overlay">
-      <div id="overlayInner" class="overlay-inner"></div>
-    </div>
-  </main>
-
-  <script>
-    const $ = sel => document.querySelector(sel);
-    const $bg = $('#bg'), $fg = $('#fg'), $text = $('#text'), $pos = $('#pos');
-    const $overlay = $('#overlay'), $inner = $('#overlayInner');
-    const $stage = $('#stage');
-    const $expand = $('#expandToggle');
-    const $rtspPanel = $('#rtspPanel');
-    const $menuToggle = $('#menuToggle');
-    const $menuHint = $('#menuHint');
-    const $brandEmoji = $('#brandEmoji');
-    const $brandSuffixEl = $('#brandSuffix');
-    const $brandName = $('#brandName');
-    const $headerSuffix = $('#headerSuffix');
-    const $showEmoji = $('#showEmoji');
-    const $stickerUpload = $('#stickerUpload');
-    const $stickerLayer = $('#stickerLayer');
-    const $clearStickers = $('#clearStickers');
-    const $u = $('#u'), $p = $('#p'), $ip = $('#ip'), $port = $('#port'), $path = $('#path');
-    const $feed = $('#feed');
-    const $frame = $('#streamFrame');
-    const $frameHandle = $('#frameHandle');
-    const $frameResizer = $('#frameResizer');
-    const $main = document.querySelector('main');
-    const root = document.documentElement;
-
-    const DEFAULTS = { bg: '#101418', fg: '#ffffff', posX: 50, posY: 50 };
-    const BRANDING_DEFAULTS = { suffix: '', showEmoji: true };
-    const BRANDING_KEY = 'rtsp_viewer_branding';
-    const HINT_KEY = 'rtsp_viewer_hint_dismissed';
-    const STICKER_KEY = 'rtsp_viewer_stickers';
-    const overlayArea = $main || document.body;
-    let brandingState = { ...BRANDING_DEFAULTS };
-    let hintDismissed = false;
-    let stickers = [];
-
-    try {
-      hintDismissed = localStorage.getItem(HINT_KEY) === '1';
-    } catch (_) {}
-    if ($menuHint && hintDismissed) {
-      $menuHint.classList.add('is-hidden');
-    }
+# Each reader decodes into FRAME_SLOTS preallocated frames, reusing one once
+# it is neither published nor being encoded, instead of allocating per read.
+FRAME_SLOTS = 4
 
-    const presetPositions = {
-      'center': { x: 50, y: 50 },
-      'top-left': { x: 12, y: 12 },
-      'top-right': { x: 88, y: 12 },
-      'bottom-left': { x: 12, y: 88 },
-      'bottom-right': { x: 88, y: 88 }
-    };
-
-    let overlayPos = { x: DEFAULTS.posX, y: DEFAULTS.posY };
-
-    const applyOverlayPosition = () => {
-      root.style.setProperty('--overlay-x', `${overlayPos.x}%`);
-      root.style.setProperty('--overlay-y', `${overlayPos.y}%`);
-    };
-
-    const setOverlayFromPreset = value => {
-      if (presetPositions[value]) {
-        overlayPos = { ...presetPositions[value] };
-        applyOverlayPosition();
-      }
-    };
-
-    const clamp = (value, min, max) => Math.min(Math.max(value, min), max);
-
-    const updateOverlayFromPointer = (clientX, clientY) => {
-      if (!overlayArea) return;
-      const rect = overlayArea.getBoundingClientRect();
-      if (!rect.width || !rect.height) return;
-      const x = ((clientX - rect.left) / rect.width) * 100;
-      const y = ((clientY - rect.top) / rect.height) * 100;
-      overlayPos = {
-        x: clamp(x, 1, 99),
-        y: clamp(y, 1, 99)
-      };
-      applyOverlayPosition();
-      if ($pos.value !== 'custom') {
-        $pos.value = 'custom';
-      }
-    };
-
-    if ($overlay) {
-      let dragging = false;
-      $overlay.addEventListener('pointerdown', event => {
-        dragging = true;
-        try { $overlay.setPointerCapture(event.pointerId); } catch (_) {}
-        $overlay.dataset.dragging = 'true';
-        updateOverlayFromPointer(event.clientX, event.clientY);
-        event.preventDefault();
-      });
-      const endDrag = event => {
-        if (!dragging) return;
-        dragging = false;
-        try { $overlay.releasePointerCapture(event.pointerId); } catch (_) {}
-        delete $overlay.dataset.dragging;
-      };
-      $overlay.addEventListener('pointermove', event => {
-        if (!dragging) return;
-        updateOverlayFromPointer(event.clientX, event.clientY);
-      });
-      $overlay.addEventListener('pointerup', endDrag);
-      $overlay.addEventListener('pointercancel', endDrag);
-    }
+# The last frame of each source is shown to new viewers while the source is
+# still connecting. It is kept in memory across reader restarts and saved to
+# LAST_FRAME_DIR (every LAST_FRAME_SAVE_SEC and when the reader stops) so it
+# survives a server restart too. An empty LAST_FRAME_DIR keeps it in memory only.
+LAST_FRAME_DIR = os.environ.get(
+    "RTSP_VIEWER_LAST_FRAMES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "last_frames"))
+LAST_FRAME_SAVE_SEC = 30.0
 
-    // ---- Branding ----
-    const applyBranding = () => {
-      const suffix = (brandingState.suffix || '').trim();
-      if ($brandSuffixEl) {
-        $brandSuffixEl.textContent = suffix;
-        $brandSuffixEl.dataset.prefix = suffix ? ' ' : '';
-      }
-      if ($headerSuffix && $headerSuffix.value !== brandingState.suffix) {
-        $headerSuffix.value = brandingState.suffix;
-      }
-      if ($showEmoji) {
-        $showEmoji.checked = Boolean(brandingState.showEmoji);
-      }
-      if ($brandEmoji) {
-        $brandEmoji.style.display = brandingState.showEmoji ? '' : 'none';
-      }
-      if ($menuToggle) {
-        const ariaLabel = suffix ? `Toggle setup panel for Lettuce Stream ${suffix}` : 'Toggle setup panel for Lettuce Stream';
-        $menuToggle.setAttribute('aria-label', ariaLabel);
-      }
-      if (suffix) {
-        document.title = `Lettuce Stream ${suffix}`;
-      } else {
-        document.title = 'Lettuce Stream';
-      }
-    };
-
-    const saveBranding = () => {
-      try {
-        localStorage.setItem(BRANDING_KEY, JSON.stringify(brandingState));
-      } catch (_) {}
-    };
-
-    const loadBranding = () => {
-      brandingState = { ...BRANDING_DEFAULTS };
-      try {
-        const stored = JSON.parse(localStorage.getItem(BRANDING_KEY) || '{}');
-        if (typeof stored.suffix === 'string') brandingState.suffix = stored.suffix;
-        if (typeof stored.showEmoji === 'boolean') brandingState.showEmoji = stored.showEmoji;
-      } catch (_) {}
-      applyBranding();
-    };
-
-    if ($headerSuffix) {
-      $headerSuffix.addEventListener('input', event => {
-        brandingState.suffix = event.target.value;
-        applyBranding();
-        saveBranding();
-      });
-    }
-    if ($showEmoji) {
-      $showEmoji.addEventListener('change', event => {
-        brandingState.showEmoji = event.target.checked;
-        applyBranding();
-        saveBranding();
-      });
-    }
+# Change detection (capture option motion_threshold > 0): each decoded frame
+# is shrunk to a MOTION_THUMB_SIZE grayscale thumbnail and compared with the
+# last published one. A pixel counts as changed when its luma moved by more
+# than MOTION_PIXEL_DELTA. Frames with fewer changed pixels than the
+# threshold (percent) are not published, so nothing is encoded or sent. A
+# keepalive frame still goes out every MOTION_KEEPALIVE_SEC.
+MOTION_THUMB_SIZE = (64, 36)
+MOTION_PIXEL_DELTA = 20
+MOTION_KEEPALIVE_SEC = 5.0
 
-    // ---- Sticker helpers ----
-    const positionStickerEl = (el, sticker) => {
-      if (!el || !sticker) return;
-      el.style.left = `${sticker.x}%`;
-      el.style.top = `${sticker.y}%`;
-      if (sticker.width) {
-        el.style.width = `${sticker.width}px`;
-      }
-    };
-
-    const saveStickers = () => {
-      try {
-        localStorage.setItem(STICKER_KEY, JSON.stringify(stickers));
-      } catch (_) {}
-    };
-
-    const removeSticker = id => {
-      stickers = stickers.filter(item => item.id !== id);
-      if ($stickerLayer) {
-        const existing = $stickerLayer.querySelector(`.sticker[data-id="${id}"]`);
-        if (existing) existing.remove();
-      }
-      saveStickers();
-    };
-
-    const updateStickerPosition = (clientX, clientY, sticker, el) => {
-      if (!overlayArea) return;
-      const rect = overlayArea.getBoundingClientRect();
-      if (!rect.width || !rect.height) return;
-      const x = clamp(((clientX - rect.left) / rect.width) * 100, 1, 99);
-      const y = clamp(((clientY - rect.top) / rect.height) * 100, 1, 99);
-      sticker.x = x;
-      sticker.y = y;
-      positionStickerEl(el, sticker);
-      saveStickers();
-    };
-
-    const attachStickerDrag = (el, sticker) => {
-      if (!el) return;
-      let dragging = false;
-      el.addEventListener('pointerdown', event => {
-        const target = event.target;
-        if (target && target.classList && target.classList.contains('sticker-remove')) {
-          return;
-        }
-        dragging = true;
-        try { el.setPointerCapture(event.pointerId); } catch (_) {}
-        event.preventDefault();
-      });
-      const stopDrag = event => {
-        if (!dragging) return;
-        dragging = false;
-        try { el.releasePointerCapture(event.pointerId); } catch (_) {}
-      };
-      el.addEventListener('pointermove', event => {
-        if (!dragging) return;
-        updateStickerPosition(event.clientX, event.clientY, sticker, el);
-      });
-      el.addEventListener('pointerup', stopDrag);
-      el.addEventListener('pointercancel', stopDrag);
-    };
-
-    const stickerBaseWidth = () => {
-      if (!overlayArea) return 200;
-      const rect = overlayArea.getBoundingClientRect();
-      if (!rect.width) return 200;
-      return Math.max(120, Math.min(rect.width * 0.22, 280));
-    };
-
-    const createStickerElement = sticker => {
-      if (!$stickerLayer) return null;
-      const el = document.createElement('div');
-      el.className = 'sticker';
-      el.dataset.id = sticker.id;
-      const img = document.createElement('img');
-      img.src = sticker.src;
-      img.alt = 'Custom sticker';
-      const remove = document.createElement('button');
-      remove.type = 'button';
-      remove.className = 'sticker-remove';
-      remove.textContent = '×';
-      remove.addEventListener('click', event => {
-        event.stopPropagation();
-        removeSticker(sticker.id);
-      });
-      el.appendChild(img);
-      el.appendChild(remove);
-      sticker.width = sticker.width || Math.round(stickerBaseWidth());
-      positionStickerEl(el, sticker);
-      attachStickerDrag(el, sticker);
-      $stickerLayer.appendChild(el);
-      return el;
-    };
-
-    const renderStickers = () => {
-      if (!$stickerLayer) return;
-      $stickerLayer.innerHTML = '';
-      stickers.forEach(sticker => createStickerElement(sticker));
-    };
-
-    const addSticker = src => {
-      if (!src) return;
-      const sticker = {
-        id: `s_${Date.now()}_${Math.floor(Math.random() * 1000)}`,
-        src,
-        x: 50,
-        y: 50,
-        width: Math.round(stickerBaseWidth())
-      };
-      stickers.push(sticker);
-      createStickerElement(sticker);
-      saveStickers();
-    };
-
-    const loadStickers = () => {
-      stickers = [];
-      try {
-        const stored = JSON.parse(localStorage.getItem(STICKER_KEY) || '[]');
-        if (Array.isArray(stored)) {
-          stickers = stored.filter(item => item && typeof item.src === 'string').map(item => ({
-            id: item.id || `s_${Date.now()}_${Math.floor(Math.random() * 1000)}`,
-            src: item.src,
-            x: typeof item.x === 'number' ? item.x : 50,
-            y: typeof item.y === 'number' ? item.y : 50,
-            width: typeof item.width === 'number' ? item.width : Math.round(stickerBaseWidth())
-          }));
-        }
-      } catch (_) {}
-      renderStickers();
-    };
-
-    if ($stickerUpload) {
-      $stickerUpload.addEventListener('change', event => {
-        const input = event.target;
-        if (!input || !input.files || !input.files[0]) return;
-        const file = input.files[0];
-        const reader = new FileReader();
-        reader.addEventListener('load', () => {
-          if (typeof reader.result === 'string') {
-            addSticker(reader.result);
-          }
-          $stickerUpload.value = '';
-        });
-        reader.readAsDataURL(file);
-      });
-    }
+# Server-side overlay burn-in (/overlay): text height as a fraction of the
+# frame height, and limits on what a client may upload.
+OVERLAY_TEXT_HEIGHT = 0.06
+OVERLAY_MAX_STICKERS = 16
+OVERLAY_MAX_BYTES = 8 * 1024 * 1024
 
-    if ($clearStickers) {
-      $clearStickers.addEventListener('click', () => {
-        stickers = [];
-        if ($stickerLayer) {
-          $stickerLayer.innerHTML = '';
-        }
-        saveStickers();
-      });
-    }
+# Adaptive streaming (/video_feed?adaptive=1) moves between these steps.
+# They are deliberately coarse so adapting viewers still share encodes.
+ADAPTIVE_QUALITY_STEPS = (30, 40, 50, 60, 70, 80, 90)
+ADAPTIVE_FPS_STEPS = (1, 2, 5, 10, 15, 20, 25, 30)
+ADAPTIVE_MAX_FPS = 30
 
-    // ---- Frame layout helpers ----
-    let frameTouched = false;
-
-    function clampFrameWithinMain() {
-      if (!$frame || !$main) return;
-      const mainRect = $main.getBoundingClientRect();
-      const frameRect = $frame.getBoundingClientRect();
-      if (!mainRect.width || !mainRect.height) return;
-      let left = frameRect.left;
-      let top = frameRect.top;
-      let width = frameRect.width;
-      let height = frameRect.height;
-      const minWidth = 240;
-      const minHeight = 160;
-      if (width < minWidth) width = minWidth;
-      if (height < minHeight) height = minHeight;
-      left = Math.max(mainRect.left + 12, Math.min(left, mainRect.right - width - 12));
-      top = Math.max(mainRect.top + 12, Math.min(top, mainRect.bottom - height - 12));
-      $frame.style.width = `${width}px`;
-      $frame.style.height = `${height}px`;
-      $frame.style.left = `${left - mainRect.left}px`;
-      $frame.style.top = `${top - mainRect.top}px`;
-    }
+# /grid_feed composites up to GRID_MAX_TILES sources into one canvas.
+GRID_DEFAULT_SIZE = (1280, 720)
+GRID_MAX_SIZE = (3840, 2160)
+GRID_MAX_TILES = 16
+GRID_MAX_FPS = 15
+GRID_GAP = 2
+GRID_MIN_CELL = 32        # px per tile, after the gap
+GRID_RESTART_SEC = 30.0   # how often tiles whose source gave up are retried
 
-    function positionFrameInitially() {
-      if (!$frame || !$main) return;
-      const mainRect = $main.getBoundingClientRect();
-      if (!mainRect.width || !mainRect.height) return;
-      const collapsed = document.body.classList.contains('panel-collapsed');
-      const factor = collapsed ? 0.9 : 0.75;
-      const maxWidth = collapsed ? 1400 : 1100;
-      const maxHeightBase = collapsed ? 0.82 : 0.7;
-      const baseWidth = Math.min(mainRect.width * factor, maxWidth);
-      const baseHeight = Math.min(mainRect.height * maxHeightBase, collapsed ? 720 : 660);
-      const finalWidth = Math.max(baseWidth, 320);
-      const finalHeight = Math.max(baseHeight, 200);
-      $frame.style.width = `${finalWidth}px`;
-      $frame.style.height = `${finalHeight}px`;
-      $frame.style.left = `${Math.max(12, (mainRect.width - finalWidth) / 2)}px`;
-      $frame.style.top = `${Math.max(24, (mainRect.height - finalHeight) / 2)}px`;
-      frameTouched = false;
-    }
+# /snapshot.jpg waits this long for a first frame when it has to start the
+# source, then keeps the source open for SNAPSHOT_LINGER_SEC so polling
+# dashboards reuse the connection instead of paying a handshake per poll.
+SNAPSHOT_WAIT_SEC = 5.0
+SNAPSHOT_LINGER_SEC = 30.0
 
-    // ---- Style state ----
-    const loadStyle = () => {
-      overlayPos = { x: DEFAULTS.posX, y: DEFAULTS.posY };
-      $bg.value = DEFAULTS.bg;
-      $fg.value = DEFAULTS.fg;
-      $text.value = '';
-      $pos.value = 'center';
-      try {
-        const s = JSON.parse(localStorage.getItem('rtsp_viewer_style') || '{}');
-        if (s.bg) $bg.value = s.bg;
-        if (s.fg) $fg.value = s.fg;
-        if ('text' in s) $text.value = s.text || '';
-        if (s.pos === 'custom' && typeof s.posX === 'number' && typeof s.posY === 'number') {
-          overlayPos = { x: s.posX, y: s.posY };
-          $pos.value = 'custom';
-        } else if (s.pos && presetPositions[s.pos]) {
-          $pos.value = s.pos;
-          overlayPos = { ...presetPositions[s.pos] };
-        }
-        if (typeof s.posX === 'number' && typeof s.posY === 'number' && $pos.value === 'custom') {
-          overlayPos = { x: s.posX, y: s.posY };
-        }
-      } catch (_) {}
-      document.body.style.setProperty('--bg', $bg.value);
-      document.body.style.setProperty('--text', $fg.value);
-      $inner.textContent = $text.value;
-      applyOverlayPosition();
-    };
-    const saveStyle = () => {
-      const s = {
-        bg: $bg.value,
-        fg: $fg.value,
-        text: $text.value,
-        pos: $pos.value,
-        posX: overlayPos.x,
-        posY: overlayPos.y
-      };
-      localStorage.setItem('rtsp_viewer_style', JSON.stringify(s));
-      loadStyle();
-    };
-    const clearStyle = () => {
-      localStorage.removeItem('rtsp_viewer_style');
-      overlayPos = { x: DEFAULTS.posX, y: DEFAULTS.posY };
-      $bg.value = DEFAULTS.bg;
-      $fg.value = DEFAULTS.fg;
-      $text.value = '';
-      $pos.value = 'center';
-      document.body.style.setProperty('--bg', DEFAULTS.bg);
-      document.body.style.setProperty('--text', DEFAULTS.fg);
-      $inner.textContent = '';
-      applyOverlayPosition();
-    };
-
-    // live preview
-    $bg.addEventListener('input', () => document.body.style.setProperty('--bg', $bg.value));
-    $fg.addEventListener('input', () => document.body.style.setProperty('--text', $fg.value));
-    $text.addEventListener('input', () => $inner.textContent = $text.value);
-    $pos.addEventListener('change', () => {
-      if ($pos.value === 'custom') return;
-      setOverlayFromPreset($pos.value);
-    });
-    $('#saveStyle').addEventListener('click', () => {
-      saveStyle();
-      setPanelCollapsed(true);
-    });
-    $('#clearStyle').addEventListener('click', clearStyle);
-
-    // ---- Fullscreen control ----
-    const updateFullscreenState = () => {
-      if (!$stage || !$expand) return;
-      const fullscreenEl = document.fullscreenElement || document.webkitFullscreenElement;
-      const isFullscreen = fullscreenEl === $stage;
-      $stage.classList.toggle('fullscreen-active', isFullscreen);
-      if ($frame) {
-        $frame.classList.toggle('fullscreen-mode', isFullscreen);
-      }
-      $expand.textContent = isFullscreen ? '⤡' : '⤢';
-      $expand.setAttribute('aria-label', isFullscreen ? 'Exit fullscreen' : 'Enter fullscreen');
-    };
-    const toggleFullscreen = () => {
-      if (!$stage) return;
-      const fullscreenEl = document.fullscreenElement || document.webkitFullscreenElement;
-      if (fullscreenEl === $stage) {
-        if (document.exitFullscreen) {
-          document.exitFullscreen();
-        } else if (document.webkitExitFullscreen) {
-          document.webkitExitFullscreen();
-        }
-      } else {
-        if ($stage.requestFullscreen) {
-          $stage.requestFullscreen();
-        } else if ($stage.webkitRequestFullscreen) {
-          $stage.webkitRequestFullscreen();
-        }
-      }
-    };
-    if ($expand) {
-      $expand.addEventListener('click', toggleFullscreen);
-    }
-    document.addEventListener('fullscreenchange', updateFullscreenState);
-    document.addEventListener('webkitfullscreenchange', updateFullscreenState);
-
-    // ---- Panel visibility ----
-    const setPanelCollapsed = (collapsed, options = {}) => {
-      const { fromUser = false } = options;
-      if (!$rtspPanel) return;
-      $rtspPanel.classList.toggle('collapsed', collapsed);
-      document.body.classList.toggle('panel-collapsed', collapsed);
-      if ($menuToggle) {
-        $menuToggle.setAttribute('aria-expanded', String(!collapsed));
-      }
-      if ($menuHint) {
-        if (collapsed && fromUser && !hintDismissed) {
-          hintDismissed = true;
-          $menuHint.classList.add('is-hidden');
-          try { localStorage.setItem(HINT_KEY, '1'); } catch (_) {}
-        } else if (!hintDismissed) {
-          $menuHint.classList.remove('is-hidden');
+# /video_mp4 remuxes the camera's own H.264/H.265 into fragmented MP4 with
+# FFmpeg (no decoding). Fragments are cut every MP4_FRAGMENT_USEC; the ones
+# since the last keyframe are kept (up to MP4_GOP_MAX_BYTES) so new viewers
+# start playing immediately.
+FFMPEG_BIN = os.environ.get("RTSP_VIEWER_FFMPEG", "ffmpeg")
+MP4_FRAGMENT_USEC = 500000
+MP4_GOP_MAX_BYTES = 16 * 1024 * 1024
+MP4_INIT_WAIT_SEC = 10.0
+
+# Instant replay: each running source keeps its last REPLAY_SECONDS as JPEGs
+# (REPLAY_FPS, downscaled to REPLAY_WIDTH) in one preallocated buffer of
+# REPLAY_MAX_BYTES. REPLAY_SECONDS = 0 turns recording off. A buffer no
+# reader uses any more is freed REPLAY_KEEP_SEC after the last one stops.
+REPLAY_SECONDS = 30.0
+REPLAY_MAX_BYTES = 64 * 1024 * 1024
+REPLAY_KEEP_SEC = 300.0
+REPLAY_FPS = 10
+REPLAY_QUALITY = 70
+REPLAY_WIDTH = 960
+
+# Continuous recording: FFmpeg stream-copies a source into RECORD_SEGMENT_SEC
+# MP4 segments under RECORDINGS_DIR/<source>/. Segments older than
+# RECORD_RETENTION_SEC, or beyond RECORD_MAX_BYTES per source (0 = no cap),
+# are deleted as new ones complete.
+RECORDINGS_DIR = os.environ.get(
+    "RTSP_VIEWER_RECORDINGS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings"))
+RECORD_SEGMENT_SEC = 300
+RECORD_RETENTION_SEC = 72 * 3600
+RECORD_MAX_BYTES = 0
+RECORD_STOP_TIMEOUT_SEC = 5.0
+
+# Warm standby: cameras marked "warm" stay open without viewers so the first
+# one gets frames at once; a warm reader that gave up is restarted this often.
+WARM_CHECK_SEC = 30.0
+
+# Resolution ladder: a camera may list smaller variants of itself (camera
+# sub-streams or server-side downscales); feeds asking for a small size are
+# served from the narrowest one that still fills it.
+LADDER_MAX_RUNGS = 8
+
+# Worker mode: decode and encode each source in one of WORKER_PROCESSES
+# processes instead of in threads of the web process (0 = off). Workers are
+# pinned round-robin to the CPU sets in WORKER_CPUS (e.g. [[0, 1], [2, 3]]).
+# Encoded frames come back through a WORKER_RING_BYTES shared memory ring
+# per source; only small notices go through the pipe. An encode variant
+# (quality, view) nobody asked for in WORKER_VARIANT_IDLE_SEC is dropped.
+WORKER_PROCESSES = int(os.environ.get("RTSP_VIEWER_WORKERS", 0))
+WORKER_CPUS = []
+WORKER_RING_BYTES = 32 * 2**20
+WORKER_VARIANT_IDLE_SEC = 5.0
+WORKER_ENCODE_WAIT_SEC = 1.0
+WORKER_METRICS_SEC = 1.0
+WORKER_STOP_SEC = 2.0
+
+# Optional JSON config: {"capture": {...}, "per_source": {"rtsp://...": {...}}}
+CONFIG_PATH = os.environ.get(
+    "RTSP_VIEWER_CONFIG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rtsp_viewer.json"))
+# Cameras added through /sources are saved here (it holds credentials).
+SOURCES_PATH = os.environ.get(
+    "RTSP_VIEWER_SOURCES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rtsp_viewer_sources.json"))
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# The page's CSS/JS are served by STATIC_ASSETS, not Flask's static route.
+app = Flask(__name__, static_folder=None)
+
+
+@dataclass(frozen=True)
+class CaptureOptions:
+    """How a source is opened. Defaults favour low latency over robustness."""
+
+    transport: str = "tcp"          # tcp | udp | auto (let FFmpeg negotiate)
+    backend: str = "ffmpeg"         # ffmpeg | any
+    buffer_size: int = 1            # CAP_PROP_BUFFERSIZE in frames, 0 = backend default
+    probesize: int = 500000         # bytes FFmpeg reads to detect the stream
+    analyzeduration: int = 500000   # microseconds FFmpeg spends probing
+    low_latency: bool = True        # fflags=nobuffer, flags=low_delay
+    open_timeout_ms: int = 5000
+    read_timeout_ms: int = 5000
+    # % of thumbnail pixels that must change; 0 = publish every frame. A
+    # per-source setting (config or camera, not a query parameter), left out
+    # of comparisons so it never splits a source's shared reader.
+    motion_threshold: int = field(default=0, compare=False)
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "CaptureOptions":
+        kwargs = {}
+        for f in fields(cls):
+            if f.name not in values:
+                continue
+            raw = values[f.name]
+            if f.type is bool:
+                value = raw if isinstance(raw, bool) else str(raw).lower() in ("1", "true", "yes", "on")
+            elif f.type is int:
+                value = int(raw)
+                if value < 0:
+                    raise ValueError(f"{f.name} must be >= 0")
+            else:
+                value = str(raw).lower()
+            kwargs[f.name] = value
+        opts = cls(**kwargs)
+        if opts.transport not in ("tcp", "udp", "auto"):
+            raise ValueError(f"unknown transport: {opts.transport}")
+        if opts.backend not in ("ffmpeg", "any"):
+            raise ValueError(f"unknown backend: {opts.backend}")
+        if opts.motion_threshold > 100:
+            raise ValueError("motion_threshold must be in 0..100")
+        return opts
+
+    def ffmpeg_options(self) -> str:
+        """Value for OPENCV_FFMPEG_CAPTURE_OPTIONS ("key;value|key;value")."""
+        opts = []
+        if self.transport != "auto":
+            opts.append(("rtsp_transport", self.transport))
+        if self.probesize:
+            opts.append(("probesize", self.probesize))
+        if self.analyzeduration:
+            opts.append(("analyzeduration", self.analyzeduration))
+        if self.low_latency:
+            opts += [("fflags", "nobuffer"), ("flags", "low_delay")]
+        return "|".join(f"{k};{v}" for k, v in opts)
+
+    def ffmpeg_args(self) -> list:
+        """The same demuxer options as ``ffmpeg`` input arguments."""
+        args = []
+        for pair in self.ffmpeg_options().split("|"):
+            if pair:
+                key, value = pair.split(";", 1)
+                args += [f"-{key}", value]
+        if self.read_timeout_ms:
+            args += ["-rw_timeout", str(self.read_timeout_ms * 1000)]
+        return args
+
+
+# Query parameter -> CaptureOptions field, for /video_feed overrides.
+CAPTURE_QUERY_PARAMS = {
+    "transport": "transport",
+    "backend": "backend",
+    "buffer": "buffer_size",
+    "probesize": "probesize",
+    "analyzeduration": "analyzeduration",
+    "low_latency": "low_latency",
+    "open_timeout": "open_timeout_ms",
+    "read_timeout": "read_timeout_ms",
+}
+
+
+def load_config(path: str = CONFIG_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            config = json.load(fh)
+    except (OSError, ValueError) as exc:
+        print(f"[warn] Ignoring config {path}: {exc}")
+        return {}
+    print(f"[info] Loaded config: {path}")
+    return config
+
+
+CONFIG = load_config()
+
+# Config "replay" overrides, e.g. {"replay": {"seconds": 60, "max_mb": 128, "keep_sec": 300}}.
+REPLAY_SECONDS = float(CONFIG.get("replay", {}).get("seconds", REPLAY_SECONDS))
+REPLAY_MAX_BYTES = int(float(CONFIG.get("replay", {}).get("max_mb", REPLAY_MAX_BYTES / 2**20)) * 2**20)
+REPLAY_KEEP_SEC = float(CONFIG.get("replay", {}).get("keep_sec", REPLAY_KEEP_SEC))
+
+# Config "recording": {"dir": ..., "segment_sec": 300, "retention_hours": 72,
+# "max_gb": 0, "sources": ["rtsp://..."]}; listed sources record from startup.
+_recording = CONFIG.get("recording", {})
+RECORDINGS_DIR = _recording.get("dir", RECORDINGS_DIR)
+RECORD_SEGMENT_SEC = int(_recording.get("segment_sec", RECORD_SEGMENT_SEC))
+RECORD_RETENTION_SEC = float(_recording.get("retention_hours", RECORD_RETENTION_SEC / 3600)) * 3600
+RECORD_MAX_BYTES = int(float(_recording.get("max_gb", RECORD_MAX_BYTES / 2**30)) * 2**30)
+
+# Config "workers": {"processes": 4, "cpus": [[0, 1], [2, 3], [4, 5], [6, 7]]}.
+_workers = CONFIG.get("workers", {})
+WORKER_PROCESSES = int(_workers.get("processes", WORKER_PROCESSES))
+WORKER_CPUS = [[int(c) for c in cpus] for cpus in _workers.get("cpus", WORKER_CPUS)]
+
+
+def load_encoder(settings: dict) -> encoders.Encoder:
+    """The configured JPEG encoder, or OpenCV's if it can't be used."""
+    try:
+        encoder = encoders.create(**settings)
+    except (ValueError, RuntimeError, OSError) as exc:
+        print(f"[warn] JPEG encoder {settings.get('encoder', 'opencv')} unavailable ({exc}); using opencv")
+        return encoders.create()
+    if settings:
+        print(f"[info] JPEG encoder: {encoder.describe()}")
+    return encoder
+
+
+# Config "jpeg": {"encoder": "opencv" | "turbojpeg", "subsampling": "420", ...},
+# options as in encoders.py. Every encode (streams, snapshots, replay) uses it.
+JPEG_ENCODER = load_encoder(CONFIG.get("jpeg", {}))
+
+
+# A source may be given as the name of a registered camera instead of a URL.
+DEFAULT_RTSP_URL = CONFIG.get("default_source", DEFAULT_RTSP_URL)
+
+
+def capture_options_for(rtsp_url: str, args=None) -> CaptureOptions:
+    """Defaults < config "capture" < config "per_source"[url] < camera "capture" < query args."""
+    values = dict(CONFIG.get("capture", {}))
+    values.update(CONFIG.get("per_source", {}).get(rtsp_url, {}))
+    camera = cameras.get(main_source(rtsp_url))  # sub-streams share their camera's settings
+    if camera is not None:
+        values.update(camera.capture)
+    for param, name in CAPTURE_QUERY_PARAMS.items():
+        if args is not None and param in args:
+            values[name] = args[param]
+    return CaptureOptions.from_dict(values)
+
+
+# OpenCV only reads FFmpeg options from the environment, so opens that set
+# them must not interleave.
+_capture_open_lock = threading.Lock()
+
+def _open_once(rtsp_url: str, options: CaptureOptions):
+    api = cv2.CAP_FFMPEG if options.backend == "ffmpeg" else cv2.CAP_ANY
+    params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, options.open_timeout_ms,
+              cv2.CAP_PROP_READ_TIMEOUT_MSEC, options.read_timeout_ms]
+    with _capture_open_lock:
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = options.ffmpeg_options()
+        cap = cv2.VideoCapture(rtsp_url, api, params)
+    if cap.isOpened() and options.buffer_size:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, options.buffer_size)
+    return cap
+
+
+def capture_options_header(options: CaptureOptions) -> str:
+    return json.dumps(asdict(options), separators=(",", ":"))
+
+
+def capture_info(cap, options: CaptureOptions) -> dict:
+    """Effective capture settings, as reported back to clients."""
+    info = asdict(options)
+    info["ffmpeg_options"] = options.ffmpeg_options()
+    try:
+        info["backend_name"] = cap.getBackendName()
+    except cv2.error:
+        info["backend_name"] = None
+    info["effective_buffer_size"] = int(cap.get(cv2.CAP_PROP_BUFFERSIZE))
+    info["width"] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    info["height"] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    info["fps"] = round(cap.get(cv2.CAP_PROP_FPS), 2)
+    return info
+
+
+def open_capture(rtsp_url: str, options: CaptureOptions = CaptureOptions()):
+    """Single open attempt; returns None on failure. Retrying is the caller's job."""
+    cap = _open_once(source_url(rtsp_url), options)
+    if not cap.isOpened():
+        try: cap.release()
+        except Exception: pass
+        return None
+    print(f"[info] RTSP capture opened: {redact_url(rtsp_url)}")
+    return cap
+
+
+def backoff_delay(failures: int) -> float:
+    delay = min(CAPTURE_RETRY_MAX_DELAY_SEC, CAPTURE_RETRY_DELAY_SEC * 2 ** max(0, failures - 1))
+    # Jitter so cameras that dropped together don't all retry in lockstep.
+    return delay * random.uniform(0.5, 1.0)
+
+
+# Requested output sizes are rounded up to this step so viewers with
+# slightly different window sizes still share one encode.
+VIEW_SIZE_STEP = 32
+
+
+def _round_up(value: int, step: int = VIEW_SIZE_STEP) -> int:
+    return -(-value // step) * step
+
+
+@dataclass(frozen=True)
+class FrameView:
+    """Server-side crop and downscale applied before encoding."""
+
+    width: int = 0                  # bounding box; 0 = unconstrained
+    height: int = 0
+    scale: float = 1.0
+    crop: tuple = None              # (x, y, w, h) as fractions of the frame
+
+    @classmethod
+    def from_args(cls, args) -> "FrameView":
+        width = int(args.get("w", 0) or 0)
+        height = int(args.get("h", 0) or 0)
+        scale = float(args.get("scale", 1.0) or 1.0)
+        if width < 0 or height < 0:
+            raise ValueError("w and h must be >= 0")
+        if not 0 < scale <= 1:
+            raise ValueError("scale must be in (0, 1]")
+        crop = None
+        if args.get("crop"):
+            crop = tuple(float(v) for v in args["crop"].split(","))
+            if len(crop) != 4:
+                raise ValueError("crop must be x,y,w,h")
+            x, y, cw, ch = crop
+            if not (0 <= x < 1 and 0 <= y < 1 and 0 < cw and 0 < ch
+                    and x + cw <= 1 + 1e-6 and y + ch <= 1 + 1e-6):
+                raise ValueError("crop must lie within 0..1")
+            if crop == (0.0, 0.0, 1.0, 1.0):
+                crop = None
+        return cls(_round_up(width) if width else 0,
+                   _round_up(height) if height else 0,
+                   round(scale, 3), crop)
+
+    def apply(self, frame):
+        if self.crop is not None:
+            fh, fw = frame.shape[:2]
+            x, y, cw, ch = self.crop
+            x0, y0 = int(x * fw), int(y * fh)
+            frame = frame[y0:y0 + max(1, int(ch * fh)), x0:x0 + max(1, int(cw * fw))]
+        fh, fw = frame.shape[:2]
+        factor = self.scale
+        if self.width:
+            factor = min(factor, self.width / fw)
+        if self.height:
+            factor = min(factor, self.height / fh)
+        if factor >= 1:
+            # Never upscale: the browser does that for free.
+            return frame
+        size = (max(1, round(fw * factor)), max(1, round(fh * factor)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+FULL_FRAME = FrameView()
+
+
+def multipart_chunk(jpg, seq: int = None) -> bytes:
+    """One multipart part around ``jpg`` (any buffer), in a single allocation."""
+    # Content-Length and the frame sequence let non-browser clients (and
+    # bench_pipeline.py) split parts without scanning for the boundary.
+    headers = b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n" % len(jpg)
+    if seq is not None:
+        headers += b"X-Frame-Seq: %d\r\n" % seq
+    return b"".join((headers, b"\r\n", jpg, b"\r\n"))
+
+
+class EncodedFrame:
+    """One encode of a frame, shared by every viewer of that (quality, view).
+
+    ``chunk`` is the multipart part, built straight from the encoder's
+    output; ``jpg`` is a view into it rather than a second copy. APIs that
+    insist on ``bytes`` (WebSocket libraries, response bodies) get one copy
+    from jpeg_bytes(), made the first time it is asked for.
+    """
+
+    __slots__ = ("seq", "chunk", "jpg", "_bytes")
+
+    def __init__(self, seq: int, chunk: bytes, size: int):
+        self.seq = seq
+        self.chunk = chunk
+        self.jpg = memoryview(chunk)[len(chunk) - 2 - size:-2]
+        self._bytes = None
+
+    @classmethod
+    def from_jpeg(cls, seq: int, jpg) -> "EncodedFrame":
+        return cls(seq, multipart_chunk(jpg, seq), len(jpg))
+
+    def jpeg_bytes(self) -> bytes:
+        if self._bytes is None:
+            self._bytes = bytes(self.jpg)  # racing callers at worst copy it twice
+        return self._bytes
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    if parts.password is None:
+        return url
+    netloc = f"{parts.username}:***@{parts.hostname}"
+    if parts.port:
+        netloc += f":{parts.port}"
+    return urlunsplit(parts._replace(netloc=netloc))
+
+
+_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+FRAMES_READ = metrics.REGISTRY.counter(
+    "rtsp_frames_read_total", "Frames decoded from the source.", ("source",))
+READ_FAILURES = metrics.REGISTRY.counter(
+    "rtsp_read_failures_total", "Failed opens or reads of the source.", ("source",))
+RECONNECTS = metrics.REGISTRY.counter(
+    "rtsp_reconnects_total", "Times the source was reopened after a failure.", ("source",))
+DECODE_SECONDS = metrics.REGISTRY.histogram(
+    "rtsp_decode_seconds", "Time in cap.read(), i.e. waiting for and decoding a frame.",
+    ("source",), _SECONDS_BUCKETS)
+ENCODE_SECONDS = metrics.REGISTRY.histogram(
+    "rtsp_encode_seconds", "Time to crop/resize and JPEG-encode one frame variant.",
+    ("source",), _SECONDS_BUCKETS)
+ENCODED_BYTES = metrics.REGISTRY.counter(
+    "rtsp_encoded_bytes_total", "JPEG bytes produced by the shared encoder.", ("source",))
+SOURCE_FPS = metrics.REGISTRY.gauge(
+    "rtsp_source_fps", "Frames per second currently decoded from the source.", ("source",))
+ACTIVE_VIEWERS = metrics.REGISTRY.gauge(
+    "rtsp_active_viewers", "Connected /video_feed viewers.", ("source",))
+FRAMES_DROPPED = metrics.REGISTRY.counter(
+    "rtsp_frames_dropped_total", "Frames viewers skipped to stay on the newest frame.", ("source",))
+VIEWER_FRAMES_SENT = metrics.REGISTRY.gauge(
+    "rtsp_viewer_frames_sent", "Frames sent to one connected viewer.", ("source", "viewer", "client"))
+VIEWER_FRAMES_DROPPED = metrics.REGISTRY.gauge(
+    "rtsp_viewer_frames_dropped", "Frames skipped for one connected viewer to stay live.",
+    ("source", "viewer", "client"))
+FRAMES_SUPPRESSED = metrics.REGISTRY.counter(
+    "rtsp_frames_suppressed_total", "Decoded frames not published because the scene didn't change.",
+    ("source",))
+MOTION_SCORE = metrics.REGISTRY.gauge(
+    "rtsp_motion_score", "Percent of thumbnail pixels changed in the latest frame.", ("source",))
+MP4_BYTES = metrics.REGISTRY.counter(
+    "rtsp_mp4_bytes_total", "Fragmented MP4 bytes remuxed from the source.", ("source",))
+RECORDED_BYTES = metrics.REGISTRY.counter(
+    "rtsp_recorded_bytes_total", "Bytes written to finished recording segments.", ("source",))
+SNAPSHOTS = metrics.REGISTRY.counter(
+    "rtsp_snapshots_total", "/snapshot.jpg requests by response status.", ("source", "status"))
+TIME_TO_FIRST_FRAME = metrics.REGISTRY.histogram(
+    "rtsp_time_to_first_frame_seconds",
+    "Time from a viewer connecting to its first image: the cached last frame or the first live one.",
+    ("source", "frame"), (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+# Counted where sources are decoded and encoded; in worker mode that is a
+# worker process, which ships them back every WORKER_METRICS_SEC.
+WORKER_METRICS = {m.name: m for m in (FRAMES_READ, READ_FAILURES, RECONNECTS, DECODE_SECONDS,
+                                      ENCODE_SECONDS, ENCODED_BYTES, FRAMES_SUPPRESSED)}
+
+
+class ViewerStats:
+    """Per-client delivery counters for one /video_feed connection."""
+
+    _ids = iter(range(1, 1 << 62))
+
+    def __init__(self, client: str):
+        self.id = next(self._ids)
+        self.client = client
+        self.connected_at = time.time()
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.quality = JPEG_QUALITY
+        self.fps = 0.0
+        self.drain_ms = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "client": self.client,
+            "connected_sec": round(time.time() - self.connected_at, 1),
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "quality": self.quality,
+            "fps": self.fps,
+            "drain_ms": round(self.drain_ms, 1),
         }
-      }
-      if ($frame && $main && !frameTouched) {
-        const mainRect = $main.getBoundingClientRect();
-        const ratio = $frame.offsetHeight / Math.max($frame.offsetWidth, 1);
-        const targetFactor = collapsed ? 0.9 : 0.75;
-        const maxWidth = collapsed ? 1400 : 1100;
-        let width = Math.max(320, Math.min(mainRect.width * targetFactor, maxWidth));
-        let height = Math.max(200, width * (ratio || 0.5625));
-        const maxHeight = Math.max(240, mainRect.height - 48);
-        if (height > maxHeight) {
-          height = maxHeight;
-          width = Math.max(320, height / (ratio || 0.5625));
+
+
+class AdaptiveRate:
+    """Picks quality and fps for one viewer from how long its chunks take to drain.
+
+    The time between yielding a chunk and the server asking for the next one
+    is the time spent writing it to the socket. When that eats most of the
+    frame interval the link is saturated: step quality down first, then fps.
+    When it stays well under budget, step fps back up first, then quality.
+    """
+
+    SLOW = 0.8          # fraction of the frame interval that counts as congested
+    FAST = 0.25         # fraction that counts as headroom
+    UP_AFTER = 30       # consecutive fast frames before stepping up
+    HOLD = 10           # frames to ignore after a change while queues settle
+
+    def __init__(self, max_quality: int, max_fps: float):
+        self.qualities = [q for q in ADAPTIVE_QUALITY_STEPS if q < max_quality] + [max_quality]
+        self.fps_steps = [f for f in ADAPTIVE_FPS_STEPS if f < max_fps] + [max_fps]
+        self._q = len(self.qualities) - 1
+        self._f = len(self.fps_steps) - 1
+        self.drain = 0.0
+        self._fast = 0
+        self._hold = 0
+
+    @property
+    def quality(self) -> int:
+        return self.qualities[self._q]
+
+    @property
+    def fps(self) -> float:
+        return self.fps_steps[self._f]
+
+    def update(self, drain_sec: float):
+        self.drain = drain_sec if not self.drain else 0.8 * self.drain + 0.2 * drain_sec
+        if self._hold:
+            self._hold -= 1
+            return
+        budget = 1.0 / self.fps
+        if self.drain > self.SLOW * budget:
+            self._fast = 0
+            if self._q > 0:
+                self._q -= 1
+            elif self._f > 0:
+                self._f -= 1
+            else:
+                return
+            self._hold = self.HOLD
+        elif self.drain < self.FAST * budget:
+            self._fast += 1
+            if self._fast < self.UP_AFTER:
+                return
+            self._fast = 0
+            if self._f < len(self.fps_steps) - 1:
+                self._f += 1
+            elif self._q < len(self.qualities) - 1:
+                self._q += 1
+            else:
+                return
+            self._hold = self.HOLD
+        else:
+            self._fast = 0
+
+
+def stream_params(args) -> tuple:
+    """``(quality, fps, adaptive)`` from /video_feed query arguments."""
+    quality = int(args.get("quality", JPEG_QUALITY))
+    if not 1 <= quality <= 100:
+        raise ValueError("quality must be in 1..100")
+    fps = float(args.get("fps", 0) or 0)
+    if not math.isfinite(fps) or fps < 0:
+        raise ValueError("fps must be a finite number >= 0")
+    adaptive = str(args.get("adaptive", "0")).lower() in ("1", "true", "yes", "on")
+    return quality, fps, adaptive
+
+
+PLACEHOLDER_MESSAGES = {
+    "connecting": "Connecting...",
+    "reconnecting": "Reconnecting...",
+    "failed": "Source unavailable",
+}
+
+
+@lru_cache(maxsize=None)
+def placeholder_chunk(state: str) -> bytes:
+    """Status card shown while a source has no live frames, encoded once."""
+    frame = np.zeros((360, 640, 3), np.uint8)
+    frame[:] = (24, 20, 16)
+    text = PLACEHOLDER_MESSAGES.get(state, state)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    (tw, th), _ = cv2.getTextSize(text, font, 1.0, 2)
+    cv2.putText(frame, text, ((640 - tw) // 2, (360 + th) // 2), font, 1.0,
+                (232, 232, 232), 2, cv2.LINE_AA)
+    return multipart_chunk(JPEG_ENCODER.encode(frame, 70))
+
+
+def _parse_color(value: str) -> tuple:
+    """``#rrggbb`` to a BGR tuple."""
+    value = str(value).lstrip("#")
+    if not re.fullmatch(r"[0-9a-fA-F]{6}", value):
+        raise ValueError("color must be #rrggbb")
+    r, g, b = (int(value[i:i + 2], 16) for i in (0, 2, 4))
+    return b, g, r
+
+
+def _percent(value, name: str) -> float:
+    """A position in percent of the frame, clamped to 0..100."""
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number")
+    return min(100.0, max(0.0, value))
+
+
+def _decode_sticker(data_url: str):
+    """BGRA image from a ``data:image/...;base64,`` URL (or bare base64)."""
+    try:
+        raw = base64.b64decode(str(data_url).split(",", 1)[-1], validate=True)
+    except ValueError:
+        raise ValueError("sticker image must be base64") from None
+    if not raw:
+        raise ValueError("sticker image is missing")
+    image = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("sticker image could not be decoded")
+    if image.dtype != np.uint8:
+        image = (image // 257).astype(np.uint8)
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+    if image.shape[2] == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+    return image
+
+
+class Overlay:
+    """Text and stickers burned into a source's frames before they are published.
+
+    Everything is rasterised once per frame size into tiles holding the
+    premultiplied colour and inverse alpha (uint16), so each frame only pays
+    for an integer blend over the tiles' own rectangles.
+    """
+
+    def __init__(self, text: str = "", color: tuple = (255, 255, 255), x: float = 50.0,
+                 y: float = 50.0, stickers: tuple = ()):
+        self.text = text
+        self.color = color
+        self.x, self.y = x, y          # centre, percent of the frame
+        self.stickers = stickers       # (bgra, x, y, width as a fraction of the frame)
+        self._tiles = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Sent to worker processes without the lock or the cached tiles.
+        state = dict(self.__dict__)
+        del state["_tiles"], state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _tiles={}, _lock=threading.Lock())
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "Overlay":
+        stickers = values.get("stickers") or []
+        if not isinstance(stickers, list):
+            raise ValueError("stickers must be a list")
+        if len(stickers) > OVERLAY_MAX_STICKERS:
+            raise ValueError(f"at most {OVERLAY_MAX_STICKERS} stickers")
+        parsed = []
+        for item in stickers:
+            if not isinstance(item, dict):
+                raise ValueError("each sticker must be an object")
+            width = float(item.get("width", 0.2))
+            if not 0 < width <= 1:
+                raise ValueError("sticker width must be a fraction of the frame in (0, 1]")
+            parsed.append((_decode_sticker(item.get("image", "")), _percent(item.get("x", 50), "sticker x"),
+                           _percent(item.get("y", 50), "sticker y"), width))
+        return cls(str(values.get("text", ""))[:500], _parse_color(values.get("color", "#ffffff")),
+                   _percent(values.get("x", 50), "x"), _percent(values.get("y", 50), "y"), tuple(parsed))
+
+    def as_dict(self) -> dict:
+        b, g, r = self.color
+        return {
+            "text": self.text,
+            "color": f"#{r:02x}{g:02x}{b:02x}",
+            "x": self.x,
+            "y": self.y,
+            "stickers": [{"x": x, "y": y, "width": w, "size": [img.shape[1], img.shape[0]]}
+                         for img, x, y, w in self.stickers],
         }
-        $frame.style.width = `${width}px`;
-        $frame.style.height = `${height}px`;
-        $frame.style.left = `${Math.max(12, (mainRect.width - width) / 2)}px`;
-        $frame.style.top = `${Math.max(24, (mainRect.height - height) / 2)}px`;
-      }
-      setTimeout(() => clampFrameWithinMain(), 50);
-    };
-
-    if ($menuToggle) {
-      $menuToggle.addEventListener('click', () => {
-        const collapsed = document.body.classList.contains('panel-collapsed');
-        setPanelCollapsed(!collapsed, { fromUser: true });
-        if (!document.body.classList.contains('panel-collapsed') && $u && typeof $u.focus === 'function') {
-          setTimeout(() => {
-            try {
-              $u.focus({ preventScroll: true });
-            } catch (_) {
-              $u.focus();
+
+    def apply(self, frame):
+        """Blend the overlay into ``frame`` in place."""
+        height, width = frame.shape[:2]
+        with self._lock:
+            tiles = self._tiles.get((width, height))
+            if tiles is None:
+                tiles = self._tiles[(width, height)] = self._rasterize(width, height)
+        for x, y, premult, inverse in tiles:
+            roi = frame[y:y + premult.shape[0], x:x + premult.shape[1]]
+            roi[:] = (roi * inverse + premult + 127) // 255
+
+    def _rasterize(self, width: int, height: int) -> list:
+        tiles = []
+        for image, x, y, frac in self.stickers:
+            tw = max(1, int(width * frac))
+            th = max(1, round(image.shape[0] * tw / image.shape[1]))
+            image = cv2.resize(image, (tw, th), interpolation=cv2.INTER_AREA)
+            alpha = image[..., 3]
+            tiles.append(self._tile(image[..., :3] * (alpha[..., None] / 255.0), alpha,
+                                    x, y, width, height))
+        if self.text:
+            tiles.append(self._text_tile(width, height))
+        return [t for t in tiles if t is not None]
+
+    def _text_tile(self, width: int, height: int):
+        font = cv2.FONT_HERSHEY_DUPLEX
+        line_px = max(8, int(height * OVERLAY_TEXT_HEIGHT))
+        thickness = max(1, line_px // 12)
+        scale = cv2.getFontScaleFromHeight(font, line_px, thickness)
+        lines = self.text.split("\n")
+        sizes = [cv2.getTextSize(line, font, scale, thickness)[0] for line in lines]
+        pad = max(2, line_px // 4)  # room for the shadow
+        gap = line_px // 3
+        tw = max(w for w, _ in sizes) + 2 * pad
+        th = len(lines) * (line_px + gap) + 2 * pad
+        mask = np.zeros((th, tw), np.uint8)
+        for i, (line, (lw, _)) in enumerate(zip(lines, sizes)):
+            baseline = pad + i * (line_px + gap) + line_px
+            cv2.putText(mask, line, ((tw - lw) // 2, baseline), font, scale, 255, thickness, cv2.LINE_AA)
+        # Soft dark shadow under the text, like the page's text-shadow.
+        offset = max(1, line_px // 24)
+        shadow = np.zeros_like(mask)
+        shadow[offset:, :] = mask[:-offset, :]
+        shadow = (cv2.GaussianBlur(shadow, (0, 0), max(1.0, line_px / 10)) * 0.65).astype(np.uint16)
+        alpha = mask + shadow * (255 - mask.astype(np.uint16)) // 255
+        colour = np.empty((th, tw, 3), np.float64)
+        colour[:] = self.color
+        return self._tile(colour * (mask[..., None] / 255.0), alpha, self.x, self.y, width, height)
+
+    @staticmethod
+    def _tile(premult, alpha, x: float, y: float, width: int, height: int):
+        """Place a tile centred at (x%, y%), clipped to the frame."""
+        th, tw = alpha.shape[:2]
+        x0 = int(width * x / 100 - tw / 2)
+        y0 = int(height * y / 100 - th / 2)
+        cx0, cy0 = max(0, x0), max(0, y0)
+        cx1, cy1 = min(width, x0 + tw), min(height, y0 + th)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return None
+        sl = (slice(cy0 - y0, cy1 - y0), slice(cx0 - x0, cx1 - x0))
+        premult = np.ascontiguousarray(np.rint(premult[sl] * 255).astype(np.uint16))
+        inverse = np.ascontiguousarray(255 - alpha[sl].astype(np.uint16))[..., None]
+        return cx0, cy0, premult, inverse
+
+
+# rtsp_url -> Overlay burned into that source's frames (set through /overlay).
+overlays = {}
+
+
+def set_overlay(rtsp_url: str, overlay):
+    """Set (or with None, remove) a source's overlay, in worker processes too."""
+    if overlay is None:
+        overlays.pop(rtsp_url, None)
+    else:
+        overlays[rtsp_url] = overlay
+    if _worker_pool is not None:
+        _worker_pool.broadcast(("overlay", rtsp_url, overlay))
+
+
+class LastFrames:
+    """Newest JPEG of each source, in memory and (optionally) on disk."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._frames = {}  # rtsp_url -> jpeg, b"" once known to be missing
+
+    def _path(self, rtsp_url: str) -> str:
+        return os.path.join(self.directory, recording_slug(rtsp_url) + ".jpg")
+
+    def get(self, rtsp_url: str):
+        with self._lock:
+            jpg = self._frames.get(rtsp_url)
+        if jpg is None:
+            jpg = b""
+            if self.directory:
+                try:
+                    with open(self._path(rtsp_url), "rb") as fh:
+                        jpg = fh.read()
+                except OSError:
+                    pass
+            with self._lock:
+                jpg = self._frames.setdefault(rtsp_url, jpg)
+        return jpg or None
+
+    def forget(self, rtsp_url: str):
+        """Drop the in-memory copy, e.g. after another process saved a newer one."""
+        with self._lock:
+            self._frames.pop(rtsp_url, None)
+
+    def put(self, rtsp_url: str, jpg: bytes):
+        with self._lock:
+            self._frames[rtsp_url] = jpg
+        if not self.directory:
+            return
+        path = self._path(rtsp_url)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + ".tmp", "wb") as fh:
+                fh.write(jpg)
+            os.replace(path + ".tmp", path)
+        except OSError as exc:
+            print(f"[warn] Unable to save last frame {path}: {exc}")
+
+
+last_frames = LastFrames(LAST_FRAME_DIR)
+
+
+class FrameRing:
+    """Recent JPEGs packed into one preallocated buffer, oldest overwritten first.
+
+    Frames are numbered in arrival order. Readers look frames up by number
+    and get None once a frame has been overwritten, so playback never holds
+    a lock while it streams.
+    """
+
+    def __init__(self, max_bytes: int, max_frames: int, max_age: float):
+        self.max_age = max_age
+        self._buf = np.empty(max_bytes, np.uint8)
+        self._offsets = np.zeros(max_frames, np.int64)
+        self._sizes = np.zeros(max_frames, np.int64)
+        self._times = np.zeros(max_frames, np.float64)
+        self._first = 0  # number of the oldest frame still held
+        self._next = 0   # number the next frame gets
+        self._write = 0  # byte offset for the next frame
+        self._recorder = None  # the reader feeding the ring, see claim()
+        self._lock = threading.Lock()
+
+    def claim(self, reader) -> bool:
+        """Whether ``reader`` is the one that feeds this ring.
+
+        Readers of the same source with different capture options (or
+        sub-streams) share a ring; the first to ask records until it stops,
+        then the next one takes over, so frames are never interleaved.
+        """
+        with self._lock:
+            current = self._recorder
+            if current is None or current is reader or current.state in ("failed", "stopped"):
+                self._recorder = reader
+                return True
+            return False
+
+    def append(self, jpg: bytes, timestamp: float):
+        size = len(jpg)
+        capacity = len(self._buf)
+        if size > capacity:
+            return
+        with self._lock:
+            start = self._write
+            wrapped = start + size > capacity
+            if wrapped:
+                start = 0  # frames are stored contiguously; skip the tail
+            end = start + size
+            # The oldest frames sit just ahead of the write position, so
+            # evicting in order frees exactly the space we are about to use.
+            while self._first < self._next:
+                slot = self._first % len(self._offsets)
+                offset = self._offsets[slot]
+                in_way = offset >= self._write if wrapped else False
+                in_way = in_way or (offset < end and offset + self._sizes[slot] > start)
+                if not (in_way or self._next - self._first >= len(self._offsets)
+                        or self._times[slot] < timestamp - self.max_age):
+                    break
+                self._first += 1
+            self._buf[start:end] = np.frombuffer(jpg, np.uint8)
+            slot = self._next % len(self._offsets)
+            self._offsets[slot], self._sizes[slot], self._times[slot] = start, size, timestamp
+            self._next += 1
+            self._write = end
+
+    def since(self, timestamp: float) -> list:
+        """``[(number, timestamp)]`` for held frames at or after ``timestamp``."""
+        with self._lock:
+            numbers = range(self._first, self._next)
+            times = [float(self._times[n % len(self._times)]) for n in numbers]
+        return [(n, t) for n, t in zip(numbers, times) if t >= timestamp]
+
+    def get(self, number: int):
+        """JPEG bytes of frame ``number``, or None if it has been overwritten."""
+        with self._lock:
+            if not self._first <= number < self._next:
+                return None
+            slot = number % len(self._offsets)
+            offset, size = self._offsets[slot], self._sizes[slot]
+            return self._buf[offset:offset + size].tobytes()
+
+    def chunk(self, number: int):
+        """Frame ``number`` as a multipart part copied straight out of the ring, or None."""
+        with self._lock:
+            if not self._first <= number < self._next:
+                return None
+            slot = number % len(self._offsets)
+            offset, size = self._offsets[slot], self._sizes[slot]
+            return multipart_chunk(self._buf[offset:offset + size])
+
+    def info(self) -> dict:
+        with self._lock:
+            count = self._next - self._first
+            if not count:
+                return {"frames": 0, "seconds": 0.0, "bytes": 0, "oldest": None, "newest": None}
+            slots = [n % len(self._offsets) for n in range(self._first, self._next)]
+            oldest, newest = float(self._times[slots[0]]), float(self._times[slots[-1]])
+            return {
+                "frames": count,
+                "seconds": round(newest - oldest, 1),
+                "bytes": int(sum(self._sizes[s] for s in slots)),
+                "oldest": oldest,
+                "newest": newest,
             }
-          }, 120);
-        }
-      });
-    }
 
-    // ---- Frame dragging ----
-    if ($frameHandle && $frame) {
-      let draggingFrame = false;
-      let startX = 0, startY = 0, frameStartLeft = 0, frameStartTop = 0;
-      $frameHandle.addEventListener('pointerdown', event => {
-        if (!$main) return;
-        draggingFrame = true;
-        startX = event.clientX;
-        startY = event.clientY;
-        const rect = $frame.getBoundingClientRect();
-        const mainRect = $main.getBoundingClientRect();
-        frameStartLeft = rect.left - mainRect.left;
-        frameStartTop = rect.top - mainRect.top;
-        try { $frameHandle.setPointerCapture(event.pointerId); } catch (_) {}
-        event.preventDefault();
-      });
-      const stopDragging = event => {
-        if (!draggingFrame) return;
-        draggingFrame = false;
-        try { $frameHandle.releasePointerCapture(event.pointerId); } catch (_) {}
-        clampFrameWithinMain();
-      };
-      $frameHandle.addEventListener('pointermove', event => {
-        if (!draggingFrame) return;
-        const deltaX = event.clientX - startX;
-        const deltaY = event.clientY - startY;
-        $frame.style.left = `${frameStartLeft + deltaX}px`;
-        $frame.style.top = `${frameStartTop + deltaY}px`;
-        frameTouched = true;
-      });
-      $frameHandle.addEventListener('pointerup', stopDragging);
-      $frameHandle.addEventListener('pointercancel', stopDragging);
-    }
 
-    if ($frameResizer && $frame) {
-      let resizing = false;
-      let startX = 0, startY = 0, startWidth = 0, startHeight = 0;
-      $frameResizer.addEventListener('pointerdown', event => {
-        resizing = true;
-        startX = event.clientX;
-        startY = event.clientY;
-        const rect = $frame.getBoundingClientRect();
-        startWidth = rect.width;
-        startHeight = rect.height;
-        try { $frameResizer.setPointerCapture(event.pointerId); } catch (_) {}
-        event.preventDefault();
-      });
-      const stopResizing = event => {
-        if (!resizing) return;
-        resizing = false;
-        try { $frameResizer.releasePointerCapture(event.pointerId); } catch (_) {}
-        clampFrameWithinMain();
-      };
-      $frameResizer.addEventListener('pointermove', event => {
-        if (!resizing) return;
-        const deltaX = event.clientX - startX;
-        const deltaY = event.clientY - startY;
-        const minWidth = 240;
-        const minHeight = 160;
-        const newWidth = Math.max(minWidth, startWidth + deltaX);
-        const newHeight = Math.max(minHeight, startHeight + deltaY);
-        $frame.style.width = `${newWidth}px`;
-        $frame.style.height = `${newHeight}px`;
-        frameTouched = true;
-      });
-      $frameResizer.addEventListener('pointerup', stopResizing);
-      $frameResizer.addEventListener('pointercancel', stopResizing);
-    }
+class FrameSlots:
+    """Preallocated frames a capture decodes into, reused round-robin.
 
-    window.addEventListener('resize', () => {
-      clampFrameWithinMain();
-    });
-
-    // ---- RTSP state ----
-    const buildRtsp = (u, p, ip, port, path) => {
-      const auth = (u && p) ? `${encodeURIComponent(u)}:${encodeURIComponent(p)}@` : '';
-      const cleanPath = path.startsWith('/') ? path : `/${path}`;
-      return `rtsp://${auth}${ip}:${port}${cleanPath}`;
-    };
-    const loadRtsp = () => {
-      let hasSource = false;
-      try {
-        const r = JSON.parse(localStorage.getItem('rtsp_viewer_rtsp') || '{}');
-        if (r.u) $u.value = r.u;
-        if (r.p) $p.value = r.p;
-        if (r.ip) $ip.value = r.ip;
-        if (r.port) $port.value = r.port;
-        if (r.path) $path.value = r.path;
-        if (r.src) {
-          $feed.src = `/video_feed?src=${encodeURIComponent(r.src)}`;
-          hasSource = true;
-        }
-      } catch (_) {}
-      setPanelCollapsed(hasSource);
-    };
-    const saveRtsp = () => {
-      const src = buildRtsp($u.value.trim(), $p.value.trim(), $ip.value.trim(), $port.value.trim(), $path.value.trim());
-      const r = { u: $u.value, p: $p.value, ip: $ip.value, port: $port.value, path: $path.value, src };
-      localStorage.setItem('rtsp_viewer_rtsp', JSON.stringify(r));
-      $feed.src = `/video_feed?src=${encodeURIComponent(src)}`;
-      setPanelCollapsed(true);
-    };
-    $('#saveRtsp').addEventListener('click', saveRtsp);
-
-    // Init
-    loadBranding();
-    loadStickers();
-    loadStyle();
-    updateFullscreenState();
-    loadRtsp();
-    positionFrameInitially();
-    clampFrameWithinMain();
-  </script>
-</body>
-</html>
-"""
-
-
-def open_capture(rtsp_url: str):
-    cap = None
-    while cap is None or not cap.isOpened():
+    A 4K BGR frame is about 25 MB, so allocating one per read churns the
+    allocator and page-faults fresh memory 30 times a second. Ownership is
+    explicit: a slot is read into again only when it is not the published
+    frame and nobody holds it. Everything that reads a frame's pixels off
+    the capture thread holds it first (SourceReader._encode and image), and
+    a hold on a slot that was reused for a newer frame meanwhile fails.
+    When every slot is busy the read allocates as before.
+    """
+
+    def __init__(self, count: int):
+        self._slots = [None] * count
+        self._seqs = [0] * count   # the seq each slot was published as; -1 while unpublished
+        self._holds = [0] * count
+        self._published = None     # index of the published slot
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _index(self, frame):
+        # Called with self._lock held.
+        return next((i for i, slot in enumerate(self._slots) if slot is frame), None)
+
+    def read(self, cap):
+        """``cap.read()``, into a free slot when there is one."""
+        with self._lock:
+            index = None
+            for _ in range(len(self._slots)):
+                i = self._next
+                self._next = (i + 1) % len(self._slots)
+                if self._slots[i] is None or (i != self._published and not self._holds[i]):
+                    index = i
+                    self._seqs[i] = -1  # holds on its old frame fail from now on
+                    break
+        if index is None:
+            return cap.read()
+        slot = self._slots[index]
+        ok, frame = cap.read(slot) if slot is not None else cap.read()
+        if ok and frame is not None:
+            with self._lock:
+                self._slots[index] = frame  # a new array if the size changed
+        return ok, frame
+
+    def publish(self, frame, seq: int):
+        """``frame`` (from read) is now the reader's current frame, numbered ``seq``."""
+        with self._lock:
+            index = self._index(frame)
+            self._published = index
+            if index is not None:
+                self._seqs[index] = seq
+
+    def hold(self, frame, seq: int) -> bool:
+        """Keep ``frame`` from being read into until release(); False if it no longer is frame ``seq``."""
+        with self._lock:
+            index = self._index(frame)
+            if index is None:
+                return True  # not a slot (allocated, or replaced after a size change): never reused
+            if self._seqs[index] != seq:
+                return False
+            self._holds[index] += 1
+            return True
+
+    def release(self, frame):
+        with self._lock:
+            index = self._index(frame)
+            if index is not None and self._holds[index]:
+                self._holds[index] -= 1
+
+
+class SourceReader:
+    """Background reader that decodes one RTSP source and publishes the latest frame."""
+
+    keeps_last_frame = True  # save the newest frame to last_frames for new viewers
+
+    def __init__(self, rtsp_url: str, options: CaptureOptions, replay: FrameRing = None):
+        self.rtsp_url = rtsp_url
+        self.key = (rtsp_url, options)
+        self.label = redact_url(rtsp_url)
+        self.options = options
+        self.capture_info = asdict(options)
+        self.fps = 0.0
+        self.motion_score = None  # % of thumbnail pixels changed, when detecting
+        self._motion_ref = None
+        self._motion_sent_at = 0.0
+        self.frame_time = 0.0  # wall clock of the newest frame, for Last-Modified
+        self.started_at = time.time()
+        self._last_frame_at = 0.0
+        self.viewers = 0
+        self.viewer_stats = set()
+        self.state = "connecting"
+        self.status = {"state": self.state}
+        self._status_version = 0
+        self._cond = threading.Condition()
+        self._listeners = []
+        self._frame = None
+        self._seq = 0
+        self._stop = threading.Event()
+        self._reopen = False
+        self.open_url = None  # what to open instead of rtsp_url (set by worker processes)
+        self._last_saved_at = 0.0
+        # (quality, view) -> EncodedFrame of the most recently encoded frame.
+        self._encoded = {}
+        self._encode_locks = {}
+        self._encode_lock = threading.Lock()
+        self._slots = FrameSlots(FRAME_SLOTS)
+        self._thread = threading.Thread(target=self._run, name="rtsp-reader", daemon=True)
+        self.replay = replay
+
+    def start(self):
+        self._thread.start()
+        if self.replay is not None:
+            threading.Thread(target=self._record, name="rtsp-replay", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def reopen(self):
+        """Reconnect after the current frame, e.g. because the camera's URL changed."""
+        self._reopen = True
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the newest published frame."""
+        return self._seq
+
+    def add_listener(self, callback):
+        """Call ``callback()`` from the reader thread after every frame or state change."""
+        with self._cond:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._cond:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify_listeners(self):
+        for callback in list(self._listeners):
+            callback()
+
+    def _publish(self, frame):
+        now = time.monotonic()
+        if self._last_frame_at:
+            interval = now - self._last_frame_at
+            if interval > 0:
+                self.fps = 1.0 / interval if not self.fps else 0.9 * self.fps + 0.1 / interval
+        self._last_frame_at = now
+        FRAMES_READ.inc(self.label)
+        if self.options.motion_threshold and not self._changed_enough(frame, now):
+            FRAMES_SUPPRESSED.inc(self.label)
+            return
+        key = main_source(self.rtsp_url)
+        overlay = overlays.get(key)
+        if overlay is not None:
+            try:
+                overlay.apply(frame)
+            except Exception as exc:
+                # A broken overlay must not take the capture down with it.
+                print(f"[warn] Dropping overlay for {self.label}: {exc}")
+                if overlays.get(key) is overlay:
+                    overlays.pop(key, None)
+        with self._cond:
+            self._frame = frame
+            self.frame_time = time.time()
+            self._seq += 1
+            self._slots.publish(frame, self._seq)
+            self._cond.notify_all()
+        self._notify_listeners()
+        if self.keeps_last_frame and now - self._last_saved_at >= LAST_FRAME_SAVE_SEC:
+            self._last_saved_at = now
+            self._save_last_frame()
+
+    def _save_last_frame(self):
+        _, jpg = self.encode_jpeg(self._seq, self._frame, JPEG_QUALITY)
+        if jpg is not None:
+            last_frames.put(self.rtsp_url, jpg)
+
+    def _changed_enough(self, frame, now: float) -> bool:
+        """Whether ``frame`` differs enough from the last published one (or is due anyway)."""
+        thumb = cv2.cvtColor(cv2.resize(frame, MOTION_THUMB_SIZE, interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY)
+        ref = self._motion_ref
+        if ref is None:
+            score = 100.0
+        else:
+            delta = np.abs(thumb.astype(np.int16) - ref)
+            score = np.count_nonzero(delta > MOTION_PIXEL_DELTA) * 100.0 / delta.size
+        self.motion_score = score
+        if score < self.options.motion_threshold and now - self._motion_sent_at < MOTION_KEEPALIVE_SEC:
+            return False
+        self._motion_ref = thumb
+        self._motion_sent_at = now
+        return True
+
+    def _set_state(self, state: str, **info):
+        with self._cond:
+            self.state = state
+            self.status = {"state": state, **info}
+            self._status_version += 1
+            self._cond.notify_all()
+        self._notify_listeners()
+
+    def _run(self):
+        cap = None
+        failures = 0
+        while not self._stop.is_set():
+            if cap is not None and self._reopen:
+                try: cap.release()
+                except Exception: pass
+                cap = None
+            if cap is None:
+                self._reopen = False
+                if failures:
+                    RECONNECTS.inc(self.label)
+                cap = open_capture(self.open_url or self.rtsp_url, self.options)
+                if cap is not None:
+                    self.capture_info = capture_info(cap, self.options)
+                    self._motion_ref = None  # always publish the first frame after (re)opening
+                    self._set_state("live")
+            if cap is not None:
+                started = time.perf_counter()
+                ok, frame = self._slots.read(cap)
+                if ok and frame is not None:
+                    DECODE_SECONDS.observe(time.perf_counter() - started, self.label)
+                    failures = 0
+                    self._publish(frame)
+                    continue
+                try: cap.release()
+                except Exception: pass
+                cap = None
+                print(f"[warn] Frame read failed: {redact_url(self.rtsp_url)}")
+            # Open or read failed: back off before the next attempt.
+            self.fps, self._last_frame_at = 0.0, 0.0
+            failures += 1
+            if not self._retry_after_failure(failures):
+                break
         if cap is not None:
             try: cap.release()
             except Exception: pass
-        cap = cv2.VideoCapture(rtsp_url)
-        if not cap.isOpened():
-            print(f"[warn] Unable to open RTSP source, retrying in {CAPTURE_RETRY_DELAY_SEC}s: {rtsp_url}")
-            time.sleep(CAPTURE_RETRY_DELAY_SEC)
-        else:
-            print("[info] RTSP capture opened.")
-            break
-    return cap
+        self._finish()
+
+    def _record(self):
+        """Feed the replay ring at REPLAY_FPS from the encode cache."""
+        view = FrameView(width=REPLAY_WIDTH)
+        interval = 1.0 / REPLAY_FPS
+        seq, next_due = 0, 0.0
+        while not self._stop.is_set():
+            wait = next_due - time.monotonic()
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+            new_seq, frame = self.wait_frame(seq)
+            if frame is None or new_seq == seq:
+                continue
+            seq, next_due = new_seq, time.monotonic() + interval
+            if not self.replay.claim(self):
+                continue
+            timestamp = self.frame_time
+            encoded = self._encode(seq, frame, REPLAY_QUALITY, view)
+            if encoded is not None:
+                self.replay.append(encoded.jpg, timestamp)
+
+    def _retry_after_failure(self, failures: int) -> bool:
+        """Back off after ``failures`` in a row; False once it is time to give up."""
+        READ_FAILURES.inc(self.label)
+        if CAPTURE_MAX_ATTEMPTS and failures >= CAPTURE_MAX_ATTEMPTS:
+            print(f"[warn] Giving up after {failures} attempts: {redact_url(self.rtsp_url)}")
+            self._set_state("failed", attempts=failures)
+            return False
+        delay = backoff_delay(failures)
+        print(f"[warn] Unable to read RTSP source, retrying in {delay:.1f}s: {redact_url(self.rtsp_url)}")
+        self._set_state("reconnecting", attempt=failures, retry_in=round(delay, 1))
+        self._stop.wait(delay)
+        return True
+
+    def _finish(self):
+        if self.keeps_last_frame and self._frame is not None:
+            self._save_last_frame()
+        if self.state != "failed":
+            self._set_state("stopped")
+        print(f"[info] Reader stopped: {self.label}")
+
+    def wait_status(self, last_version: int, timeout: float = 15.0):
+        """Block until the status changes from ``last_version`` (or timeout)."""
+        with self._cond:
+            if self._status_version == last_version:
+                self._cond.wait_for(lambda: self._status_version != last_version, timeout)
+            return self._status_version, dict(self.status)
+
+    def wait_frame(self, last_seq: int, timeout: float = 1.0):
+        """Block until a frame newer than ``last_seq`` is available (or timeout)."""
+        with self._cond:
+            if self._seq == last_seq and not self._stop.is_set():
+                self._cond.wait(timeout)
+            return self._seq, self._frame
+
+    def stats(self) -> dict:
+        return {
+            "source": self.label,
+            "seq": self._seq,
+            "fps": round(self.fps, 1),
+            "motion_score": None if self.motion_score is None else round(self.motion_score, 2),
+            "status": self.status,
+            "capture": self.capture_info,
+            "viewers": [v.as_dict() for v in list(self.viewer_stats)],
+            "replay": self.replay.info() if self.replay is not None else None,
+        }
+
+    def image(self, seq: int, frame, view: FrameView):
+        """Decoded image for a frame from wait_frame, at least ``view``'s size.
+
+        The caller's own copy, or None if the frame was replaced meanwhile.
+        """
+        if not self._slots.hold(frame, seq):
+            return None
+        try:
+            image = view.apply(frame)
+            return image.copy() if np.shares_memory(image, frame) else image
+        finally:
+            self._slots.release(frame)
+
+    def next_chunk(self, last_seq: int, quality: int, view: FrameView = FULL_FRAME,
+                   timeout: float = 1.0):
+        """Return ``(seq, chunk)`` for the newest frame after ``last_seq``.
+
+        ``chunk`` is the complete multipart part, encoded once per frame and
+        shared by every viewer asking for the same ``(quality, view)``. It is
+        ``None`` when no newer frame arrived before the timeout.
+        """
+        seq, frame = self.wait_frame(last_seq, timeout)
+        if frame is None or seq == last_seq:
+            return last_seq, None
+        return self.encode(seq, frame, quality, view)
+
+    def encode(self, seq: int, frame, quality: int, view: FrameView = FULL_FRAME):
+        """``(seq, chunk)`` for ``frame``, reusing the cached encode when current."""
+        encoded = self._encode(seq, frame, quality, view)
+        return (seq, None) if encoded is None else (encoded.seq, encoded.chunk)
+
+    def encode_jpeg(self, seq: int, frame, quality: int, view: FrameView = FULL_FRAME):
+        """``(seq, jpeg_bytes)`` from the same cache the multipart feeds use."""
+        encoded = self._encode(seq, frame, quality, view)
+        return (seq, None) if encoded is None else (encoded.seq, encoded.jpeg_bytes())
+
+    def _encode(self, seq: int, frame, quality: int, view: FrameView):
+        """The cached EncodedFrame for (quality, view), encoding ``frame`` if it is newer."""
+        key = (quality, view)
+        with self._encode_lock:
+            lock = self._encode_locks.get(key)
+            if lock is None:
+                lock = self._encode_locks[key] = threading.Lock()
+        with lock:
+            cached = self._encoded.get(key)
+            if cached is not None and cached.seq >= seq:
+                return cached
+            if not self._slots.hold(frame, seq):
+                return None  # its slot was read into for a newer frame meanwhile
+            started = time.perf_counter()
+            try:
+                buf = JPEG_ENCODER.encode(view.apply(frame), quality)
+            finally:
+                self._slots.release(frame)
+            if buf is None:
+                return None
+            ENCODE_SECONDS.observe(time.perf_counter() - started, self.label)
+            ENCODED_BYTES.inc(self.label, amount=len(buf))
+            cached = self._encoded[key] = EncodedFrame.from_jpeg(seq, buf)
+            return cached
+
+
+def grid_layout(spec: str, count: int) -> tuple:
+    """``(cols, rows)`` from "auto" or "CxR", checked against ``count`` tiles."""
+    if spec in ("", "auto"):
+        cols = math.ceil(math.sqrt(count))
+        return cols, math.ceil(count / cols)
+    try:
+        cols, rows = (int(v) for v in spec.lower().split("x"))
+    except ValueError:
+        raise ValueError("layout must be 'auto' or COLSxROWS") from None
+    if cols < 1 or rows < 1 or cols * rows > GRID_MAX_TILES:
+        raise ValueError(f"layout must have 1..{GRID_MAX_TILES} cells")
+    if cols * rows < count:
+        raise ValueError(f"layout {cols}x{rows} has fewer cells than sources")
+    return cols, rows
+
 
-def mjpeg_generator(rtsp_url: str):
-    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), int(JPEG_QUALITY)]
-    cap = open_capture(rtsp_url)
+class GridReader(SourceReader):
+    """Composites several sources into one canvas and publishes it like a camera.
+
+    Each source is still decoded once by its shared SourceReader; the grid
+    only redraws tiles whose source published a new frame, and its output is
+    encoded once per (quality, view) for every grid viewer like any feed.
+    """
+
+    keeps_last_frame = False
+
+    def __init__(self, sources: tuple, layout: tuple, size: tuple):
+        super().__init__("grid:" + "|".join(sources), CaptureOptions())
+        self.key = ("grid", sources, layout, size)
+        self.label = f"grid {layout[0]}x{layout[1]} [" + ", ".join(redact_url(u) for u in sources) + "]"
+        self.sources = sources
+        self.layout = layout
+        self.size = size
+        self.capture_info = {"layout": f"{layout[0]}x{layout[1]}", "width": size[0],
+                             "height": size[1], "sources": [redact_url(u) for u in sources]}
+        self._changed = threading.Event()
+
+    def _cells(self) -> list:
+        cols, rows = self.layout
+        width, height = self.size
+        cw, ch = width // cols, height // rows
+        return [(c * cw + GRID_GAP // 2, r * ch + GRID_GAP // 2, cw - GRID_GAP, ch - GRID_GAP)
+                for r in range(rows) for c in range(cols)]
+
+    @staticmethod
+    def _draw_tile(canvas, cell: tuple, frame, state: str):
+        x, y, w, h = cell
+        tile = canvas[y:y + h, x:x + w]
+        tile[:] = 0
+        if frame is None:
+            text = PLACEHOLDER_MESSAGES.get(state, state)
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            scale = max(0.4, min(1.0, w / 640))
+            (tw, th), _ = cv2.getTextSize(text, font, scale, 1)
+            cv2.putText(tile, text, ((w - tw) // 2, (h + th) // 2), font, scale,
+                        (200, 200, 200), 1, cv2.LINE_AA)
+            return
+        fh, fw = frame.shape[:2]
+        factor = min(w / fw, h / fh)
+        tw, th = max(1, int(fw * factor)), max(1, int(fh * factor))
+        ox, oy = (w - tw) // 2, (h - th) // 2
+        tile[oy:oy + th, ox:ox + tw] = cv2.resize(frame, (tw, th), interpolation=cv2.INTER_AREA)
+
+    def _restart_failed(self, readers: list, sources: list):
+        """Swap sub-readers that gave up for fresh ones, like warm cameras."""
+        for i, reader in enumerate(readers):
+            if reader.state != "failed":
+                continue
+            print(f"[info] Restarting grid source: {reader.label}")
+            fresh = capture_hub.acquire(sources[i], capture_options_for(sources[i]))
+            fresh.add_listener(self._changed.set)
+            reader.remove_listener(self._changed.set)
+            capture_hub.release(reader)
+            readers[i] = fresh
+        self._changed.set()
+
+    def _run(self):
+        # Sub-readers are acquired here, not in __init__, because the hub
+        # starts readers while holding its lock.
+        cells = self._cells()
+        # Tiles are small: cameras with a ladder are read from the sub-stream
+        # that fits their cell.
+        sources = [pick_source(url, FrameView(cell[2], cell[3]))[0] for url, cell in zip(self.sources, cells)]
+        readers = [capture_hub.acquire(src, capture_options_for(src)) for src in sources]
+        for reader in readers:
+            reader.add_listener(self._changed.set)
+        width, height = self.size
+        canvas = np.zeros((height, width, 3), np.uint8)
+        drawn = [None] * len(readers)
+        interval = 1.0 / GRID_MAX_FPS
+        next_restart = time.monotonic() + GRID_RESTART_SEC
+        self._set_state("live")
+        self._changed.set()
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_restart:
+                    next_restart = time.monotonic() + GRID_RESTART_SEC
+                    self._restart_failed(readers, sources)
+                if not self._changed.wait(1.0):
+                    continue
+                self._changed.clear()
+                started = time.monotonic()
+                dirty = False
+                for i, (reader, cell) in enumerate(zip(readers, cells)):
+                    seq, frame = reader.wait_frame(-1, timeout=0)
+                    mark = (seq, reader.state)
+                    if drawn[i] == mark:
+                        continue
+                    drawn[i] = mark
+                    if reader.state == "live" and frame is not None:
+                        frame = reader.image(seq, frame, FrameView(width=cell[2], height=cell[3]))
+                        if frame is None:
+                            drawn[i] = None  # superseded while we got to it; the next one follows
+                            continue
+                    self._draw_tile(canvas, cell, frame if reader.state == "live" else None,
+                                    reader.state)
+                    dirty = True
+                if dirty:
+                    # Viewers encode the published array concurrently, so
+                    # hand out a snapshot and keep drawing on our canvas.
+                    self._publish(canvas.copy())
+                self._stop.wait(max(0.0, interval - (time.monotonic() - started)))
+        finally:
+            for reader in readers:
+                reader.remove_listener(self._changed.set)
+                capture_hub.release(reader)
+            self._finish()
+
+
+class RemuxReader(SourceReader):
+    """Repackages a source's compressed video as fragmented MP4, without decoding.
+
+    FFmpeg copies the camera's packets into ``ftyp moov (moof mdat)*`` on a
+    pipe; the init segment and the fragments since the last keyframe are
+    kept so every viewer shares one FFmpeg process per source.
+    """
+
+    def __init__(self, rtsp_url: str, options: CaptureOptions):
+        super().__init__(rtsp_url, options)
+        self.key = ("mp4", rtsp_url, options)
+        self.label = f"{redact_url(rtsp_url)} (mp4)"
+        self.init = None
+        self.init_version = 0
+        self.codec = None
+        self._default_flags = 0
+        self._gop = []  # (seq, fragment) since the last keyframe
+        self._gop_bytes = 0
+        self._gop_keyed = False
+        self._proc = None
+
+    def stop(self):
+        super().stop()
+        self.reopen()
+
+    def reopen(self):
+        proc = self._proc
+        if proc is not None:
+            try: proc.kill()
+            except OSError: pass
+
+    def command(self) -> list:
+        return [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-nostdin",
+                *self.options.ffmpeg_args(), "-i", source_url(self.rtsp_url),
+                "-map", "0:v:0", "-c:v", "copy", "-an",
+                "-f", "mp4", "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+                "-frag_duration", str(MP4_FRAGMENT_USEC), "pipe:1"]
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            if failures:
+                RECONNECTS.inc(self.label)
+            try:
+                self._proc = subprocess.Popen(self.command(), stdin=subprocess.DEVNULL,
+                                              stdout=subprocess.PIPE)
+            except OSError as exc:
+                print(f"[warn] Unable to start {FFMPEG_BIN}: {exc}")
+                self._set_state("failed", error="ffmpeg not available")
+                break
+            try:
+                if self._pump(self._proc.stdout):
+                    failures = 0
+            finally:
+                try: self._proc.kill()
+                except OSError: pass
+                self._proc.wait()
+                self._proc.stdout.close()
+            if self._stop.is_set():
+                break
+            failures += 1
+            if not self._retry_after_failure(failures):
+                break
+        self._finish()
+
+    def _pump(self, stdout) -> bool:
+        """Split FFmpeg's output into init segment and fragments until it ends."""
+        published = False
+        ftyp = moof = b""
+        while not self._stop.is_set():
+            try:
+                box = fmp4.read_box(stdout)
+            except ValueError as exc:
+                print(f"[warn] Unexpected MP4 output from {self.label}: {exc}")
+                break
+            if box is None:
+                break
+            kind, data = box
+            if kind == b"ftyp":
+                ftyp = data
+            elif kind == b"moov":
+                self._set_init(ftyp + data)
+            elif kind == b"moof":
+                moof = data
+            elif kind == b"mdat" and moof:
+                self._publish_fragment(moof + data, fmp4.starts_with_keyframe(moof, self._default_flags))
+                moof = b""
+                published = True
+        return published
+
+    def _set_init(self, init: bytes):
+        with self._cond:
+            self.init = init
+            self.init_version += 1
+            self.codec = fmp4.codec_string(init)
+            self._default_flags = fmp4.default_sample_flags(init)
+            self._gop, self._gop_bytes, self._gop_keyed = [], 0, False
+        self.capture_info = {**asdict(self.options), "mode": "mp4 passthrough", "codec": self.codec}
+        print(f"[info] MP4 remux started: {self.label} ({self.codec})")
+        self._set_state("live")
+
+    def _publish_fragment(self, fragment: bytes, keyframe: bool):
+        now = time.monotonic()
+        if self._last_frame_at:
+            interval = now - self._last_frame_at
+            if interval > 0:
+                self.fps = 1.0 / interval if not self.fps else 0.9 * self.fps + 0.1 / interval
+        self._last_frame_at = now
+        MP4_BYTES.inc(self.label, amount=len(fragment))
+        with self._cond:
+            if keyframe:
+                self._gop, self._gop_bytes, self._gop_keyed = [], 0, True
+            self._seq += 1
+            self._gop.append((self._seq, fragment))
+            self._gop_bytes += len(fragment)
+            while self._gop_bytes > MP4_GOP_MAX_BYTES and len(self._gop) > 1:
+                # Too long since a keyframe to keep it all: newcomers wait
+                # for the next one, existing viewers carry on.
+                self._gop_bytes -= len(self._gop.pop(0)[1])
+                self._gop_keyed = False
+            self.frame_time = time.time()
+            self._cond.notify_all()
+        self._notify_listeners()
+
+    def wait_init(self, timeout: float) -> bool:
+        """Block until the init segment is known; False if the source gave up first."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.init is not None or self.state in ("failed", "stopped"), timeout)
+            return self.init is not None
+
+    def wait_fragments(self, last_seq: int, timeout: float = 1.0) -> list:
+        """``[(seq, fragment)]`` a viewer at ``last_seq`` should append next.
+
+        A viewer that is new (``last_seq`` 0) or fell behind what is kept
+        restarts from the last keyframe, or waits for the next one.
+        """
+        with self._cond:
+            if self._seq == last_seq and not self._stop.is_set():
+                self._cond.wait(timeout)
+            newer = [f for f in self._gop if f[0] > last_seq]
+            if newer and (last_seq <= 0 or newer[0][0] != last_seq + 1):
+                return list(self._gop) if self._gop_keyed else []
+            return newer
+
+
+def recording_slug(rtsp_url: str) -> str:
+    """Directory name for a source: readable, credential-free and unique."""
+    parts = urlsplit(rtsp_url)
+    readable = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{parts.hostname or ''}{parts.port or ''}{parts.path}")
+    return f"{readable.strip('_')[:60]}-{sha1(rtsp_url.encode()).hexdigest()[:8]}"
+
+
+class SegmentRecorder(SourceReader):
+    """Writes a source to rotating MP4 segments with FFmpeg stream copy.
+
+    Runs its own FFmpeg process next to the live readers, so recording never
+    decodes and never competes with viewers. FFmpeg reports each finished
+    segment on stdout; those reports build the seek index in index.csv.
+    """
+
+    INDEX_FILE = "index.csv"
+    NAME_FORMAT = "%Y%m%d-%H%M%S"
+
+    def __init__(self, rtsp_url: str, options: CaptureOptions, directory: str):
+        super().__init__(rtsp_url, options)
+        self.key = ("record", rtsp_url)
+        self.label = f"{redact_url(rtsp_url)} (recording)"
+        self.directory = directory
+        self.capture_info = {"directory": directory, "segment_sec": RECORD_SEGMENT_SEC}
+        self._proc = None
+        self._index_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.segments = self._load_index()
+
+    def stop(self):
+        super().stop()
+        self.reopen()
+
+    def reopen(self):
+        proc = self._proc
+        if proc is not None:
+            # SIGTERM lets FFmpeg finish the open segment and report it.
+            try: proc.terminate()
+            except OSError: pass
+
+    def command(self) -> list:
+        return [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-nostdin",
+                *self.options.ffmpeg_args(), "-i", source_url(self.rtsp_url),
+                "-map", "0:v:0", "-map", "0:a:0?", "-c", "copy",
+                "-f", "segment", "-segment_time", str(RECORD_SEGMENT_SEC),
+                "-segment_atclocktime", "1", "-reset_timestamps", "1", "-strftime", "1",
+                "-segment_format", "mp4",
+                # Fragmented, so a segment cut short by a crash still plays.
+                "-segment_format_options", "movflags=+frag_keyframe+empty_moov+default_base_moof",
+                "-segment_list", "pipe:1", "-segment_list_type", "csv",
+                os.path.join(self.directory, f"{self.NAME_FORMAT}.mp4")]
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            if failures:
+                RECONNECTS.inc(self.label)
+            try:
+                self._proc = subprocess.Popen(self.command(), stdin=subprocess.DEVNULL,
+                                              stdout=subprocess.PIPE, text=True)
+            except OSError as exc:
+                print(f"[warn] Unable to start {FFMPEG_BIN}: {exc}")
+                self._set_state("failed", error="ffmpeg not available")
+                break
+            if self._stop.is_set():
+                self._proc.terminate()  # stop() ran before the process existed
+            print(f"[info] Recording started: {self.label} -> {self.directory}")
+            self._set_state("live")
+            started = time.monotonic()
+            try:
+                for line in self._proc.stdout:
+                    self._add_segment(line.strip())
+            finally:
+                try:
+                    self._proc.wait(RECORD_STOP_TIMEOUT_SEC)
+                except subprocess.TimeoutExpired:
+                    self._proc.kill()
+                    self._proc.wait()
+                self._proc.stdout.close()
+            if self._stop.is_set():
+                break
+            if time.monotonic() - started > RECORD_SEGMENT_SEC:
+                failures = 0  # it recorded for a while before dropping
+            failures += 1
+            if not self._retry_after_failure(failures):
+                break
+        self._finish()
+
+    def _add_segment(self, line: str):
+        """Record one ``name,start,end`` line from FFmpeg's segment list."""
+        try:
+            name, start, end = line.rsplit(",", 2)
+            wall_start = time.mktime(time.strptime(os.path.splitext(name)[0], self.NAME_FORMAT))
+            duration = round(float(end) - float(start), 3)
+        except ValueError:
+            return
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return
+        segment = {"file": name, "start": wall_start, "duration": duration,
+                   "bytes": os.path.getsize(path)}
+        RECORDED_BYTES.inc(self.label, amount=segment["bytes"])
+        with self._index_lock:
+            self.segments.append(segment)
+            self._enforce_retention()
+            self._write_index()
+
+    def _enforce_retention(self):
+        cutoff = time.time() - RECORD_RETENTION_SEC
+        total = sum(s["bytes"] for s in self.segments)
+        while len(self.segments) > 1:
+            oldest = self.segments[0]
+            expired = oldest["start"] + oldest["duration"] < cutoff
+            if not (expired or (RECORD_MAX_BYTES and total > RECORD_MAX_BYTES)):
+                break
+            try: os.remove(os.path.join(self.directory, oldest["file"]))
+            except OSError: pass
+            total -= oldest["bytes"]
+            self.segments.pop(0)
+
+    def _load_index(self) -> list:
+        segments = []
+        try:
+            with open(os.path.join(self.directory, self.INDEX_FILE), "r", encoding="utf-8") as fh:
+                for line in fh:
+                    name, start, duration, size = line.strip().split(",")
+                    if os.path.exists(os.path.join(self.directory, name)):
+                        segments.append({"file": name, "start": float(start),
+                                         "duration": float(duration), "bytes": int(size)})
+        except (OSError, ValueError):
+            pass
+        return sorted(segments, key=lambda s: s["start"])
+
+    def _write_index(self):
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            for s in self.segments:
+                fh.write(f"{s['file']},{s['start']},{s['duration']},{s['bytes']}\n")
+        os.replace(path + ".tmp", path)
+
+    def find_segments(self, start: float = None, end: float = None) -> list:
+        """Segments overlapping ``[start, end]`` (epoch seconds), oldest first."""
+        with self._index_lock:
+            segments = list(self.segments)
+        return [s for s in segments
+                if (start is None or s["start"] + s["duration"] >= start)
+                and (end is None or s["start"] <= end)]
+
+    def stats(self) -> dict:
+        info = super().stats()
+        segments = self.find_segments()
+        info["segments"] = len(segments)
+        info["bytes"] = sum(s["bytes"] for s in segments)
+        info["oldest"] = segments[0]["start"] if segments else None
+        return info
+
+
+class WorkerReader(SourceReader):
+    """A source decoded and encoded in a worker process (worker mode).
+
+    No pixels live here: the ``frame`` from wait_frame is only a token, and
+    encode() hands out the JPEG the worker made for that (quality, view),
+    asking the worker for the variant the first time it is wanted.
+    """
+
+    def __init__(self, rtsp_url: str, options: CaptureOptions, replay: FrameRing = None):
+        super().__init__(rtsp_url, options, replay)
+        self.id = None
+        self.worker = None
+        self._ring = None
+        self._variants = {}  # (quality, view) -> EncodedFrame
+        self._wanted = {}    # (quality, view) -> monotonic time it was last asked for
+
+    def reopen(self):
+        if self.worker is not None:
+            self.worker.send(("reopen", self.id, source_url(self.rtsp_url)))
+
+    def _run(self):
+        pool = worker_pool()
+        pool.open(self)
+        while not self._stop.wait(WORKER_VARIANT_IDLE_SEC / 2):
+            cutoff = time.monotonic() - WORKER_VARIANT_IDLE_SEC
+            with self._cond:
+                idle = [key for key, used in self._wanted.items() if used < cutoff]
+                for key in idle:
+                    del self._wanted[key]
+                    self._variants.pop(key, None)
+            for key in idle:
+                self.worker.send(("drop", self.id, key))
+        pool.close(self)
+        self._finish()
+        if self._ring is not None:
+            self._ring.close()
+
+    def _save_last_frame(self):
+        # The worker saved it; make sure we don't serve an older copy.
+        last_frames.forget(self.rtsp_url)
+
+    def _encode(self, seq: int, frame, quality: int, view: FrameView):
+        key = (quality, view)
+        with self._cond:
+            wanted = key in self._wanted
+            self._wanted[key] = time.monotonic()
+        if not wanted:
+            self.worker.send(("want", self.id, key))
+        with self._cond:
+            self._cond.wait_for(lambda: self._variant_seq(key) >= seq or self._stop.is_set(),
+                                WORKER_ENCODE_WAIT_SEC)
+            return self._variants.get(key)
+
+    def _variant_seq(self, key) -> int:
+        variant = self._variants.get(key)
+        return 0 if variant is None else variant.seq
+
+    def image(self, seq: int, frame, view: FrameView):
+        encoded = self._encode(seq, frame, JPEG_QUALITY, view)
+        if encoded is None:
+            return None
+        return cv2.imdecode(np.frombuffer(encoded.jpg, np.uint8), cv2.IMREAD_COLOR)
+
+    # Called from the pool's receiver thread.
+
+    def on_ring(self, name: str):
+        # Spawned workers share our resource tracker, so attaching just
+        # re-registers a name the worker already owns and unlinks on close.
+        old, self._ring = self._ring, shared_memory.SharedMemory(name=name)
+        if old is not None:
+            # Reopened after its worker died, which left the old ring behind.
+            old.close()
+            try:
+                old.unlink()
+            except FileNotFoundError:
+                pass
+
+    def on_status(self, status: dict, capture: dict):
+        self.capture_info = capture
+        if status["state"] != "live":
+            self.fps = 0.0
+        self._set_state(**status)
+
+    def on_frame(self, seq: int, frame_time: float, fps: float, motion_score, variants: list):
+        ring = self._ring
+        encoded = {}
+        for key, pos, length, jpg_size in variants:
+            size = ring.size - 8
+            start = 8 + pos % size
+            # The worker wrote the whole multipart part: one copy makes it ours.
+            chunk = bytes(ring.buf[start:start + length])
+            # The ring may have lapped us while copying: the worker reserves
+            # space (the header) before writing into it.
+            if struct.unpack_from("<Q", ring.buf, 0)[0] - pos > size:
+                continue
+            encoded[key] = EncodedFrame(seq, chunk, jpg_size)
+        with self._cond:
+            for key, variant in encoded.items():
+                # A variant sent on request can arrive after a newer frame.
+                if self._variant_seq(key) <= seq:
+                    self._variants[key] = variant
+            self.fps, self.motion_score = fps, motion_score
+            if seq > self._seq:
+                self._frame = self._seq = seq
+                self.frame_time = frame_time
+            self._cond.notify_all()
+        self._notify_listeners()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "worker": None if self.worker is None else self.worker.index}
+
+
+class _Worker:
+    """The web process's end of one worker process."""
+
+    def __init__(self, index: int, cpus):
+        self.index = index
+        self.cpus = cpus
+        self.readers = {}  # id -> WorkerReader
+        self._lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child, self.cpus),
+                                       name=f"rtsp-worker-{self.index}", daemon=True)
+        self.process.start()
+        child.close()
+        print(f"[info] Worker {self.index} started (pid {self.process.pid}, cpus {self.cpus or 'any'})")
+
+    def send(self, message):
+        with self._lock:
+            try:
+                self.conn.send(message)
+            except (OSError, ValueError):
+                pass  # the receiver notices the dead worker and restarts it
+
+
+class WorkerPool:
+    """Worker processes that decode and encode sources for WorkerReaders."""
+
+    _ids = iter(range(1, 1 << 62))
+
+    def __init__(self, processes: int, cpus: list):
+        self._lock = threading.Lock()
+        self._stopping = False
+        self.workers = [_Worker(i, cpus[i % len(cpus)] if cpus else None) for i in range(processes)]
+        # Registered after the first start, so it runs before multiprocessing
+        # terminates the workers at exit.
+        atexit.register(self.stop)
+        for worker in self.workers:
+            threading.Thread(target=self._receive, args=(worker,), name="rtsp-worker-rx",
+                             daemon=True).start()
+
+    def open(self, reader: WorkerReader):
+        # Sent under the lock so a restarting worker gets each open exactly once.
+        with self._lock:
+            worker = min(self.workers, key=lambda w: len(w.readers))
+            reader.id, reader.worker = next(self._ids), worker
+            worker.readers[reader.id] = reader
+            worker.send(self._open_message(reader))
+
+    @staticmethod
+    def _open_message(reader: WorkerReader) -> tuple:
+        # Frame numbers continue from the reader's, so a reopened source's
+        # frames are not mistaken for old ones.
+        return ("open", reader.id, reader.rtsp_url, source_url(reader.rtsp_url), reader.options, reader.seq)
+
+    def close(self, reader: WorkerReader):
+        with self._lock:
+            reader.worker.readers.pop(reader.id, None)
+        reader.worker.send(("close", reader.id))
+
+    def broadcast(self, message):
+        for worker in self.workers:
+            worker.send(message)
+
+    def stop(self):
+        """Let the workers unlink their rings and exit."""
+        self._stopping = True
+        self.broadcast(("stop",))
+        for worker in self.workers:
+            worker.process.join(WORKER_STOP_SEC)
+
+    def _receive(self, worker: _Worker):
+        while True:
+            try:
+                kind, *args = worker.conn.recv()
+            except (EOFError, OSError):
+                if self._stopping:
+                    return
+                self._restart(worker)
+                continue
+            if kind == "metrics":
+                for name, values in args[0].items():
+                    WORKER_METRICS[name].add(values)
+                continue
+            reader = worker.readers.get(args[0])
+            if reader is None:
+                continue  # closed meanwhile
+            if kind == "frame":
+                reader.on_frame(*args[1:])
+            elif kind == "status":
+                reader.on_status(*args[1:])
+            elif kind == "ring":
+                reader.on_ring(*args[1:])
+
+    def _restart(self, worker: _Worker):
+        worker.process.join(1.0)
+        print(f"[warn] Worker {worker.index} exited (code {worker.process.exitcode}); restarting")
+        with self._lock:
+            readers = list(worker.readers.values())
+        for reader in readers:
+            reader._set_state("reconnecting", error="worker exited")
+        time.sleep(CAPTURE_RETRY_DELAY_SEC)
+        with self._lock:
+            worker.start()
+            for rtsp_url, overlay in list(overlays.items()):
+                worker.send(("overlay", rtsp_url, overlay))
+            # Reopen every source it had (and any opened meanwhile, whose
+            # messages went nowhere), with the variants their viewers want.
+            for reader in worker.readers.values():
+                worker.send(self._open_message(reader))
+                with reader._cond:
+                    wanted = list(reader._wanted)
+                for key in wanted:
+                    worker.send(("want", reader.id, key))
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+def worker_pool() -> WorkerPool:
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = WorkerPool(WORKER_PROCESSES, WORKER_CPUS)
+            for rtsp_url, overlay in list(overlays.items()):
+                _worker_pool.broadcast(("overlay", rtsp_url, overlay))
+        return _worker_pool
+
+
+class _WorkerSource:
+    """One source inside a worker process: its reader and the ring it fills."""
+
+    def __init__(self, source_id: int, rtsp_url: str, open_url: str, options: CaptureOptions,
+                 seq: int, send):
+        self.id = source_id
+        self.send = send
+        self.reader = SourceReader(rtsp_url, options)
+        self.reader.open_url = open_url
+        self.reader._seq = seq
+        self.ring = shared_memory.SharedMemory(create=True, size=WORKER_RING_BYTES)
+        struct.pack_into("<Q", self.ring.buf, 0, 0)
+        self._pos = 0
+        self._wanted = set()
+        self._lock = threading.Lock()
+        self._seq = seq
+        self._status_version = -1
+        send(("ring", source_id, self.ring.name))
+        self.reader.add_listener(self._changed)
+        self.reader.start()
+
+    def _changed(self):
+        # Runs on the reader thread after every frame or state change.
+        reader = self.reader
+        if reader._status_version != self._status_version:
+            self._status_version = reader._status_version
+            self.send(("status", self.id, reader.status, reader.capture_info))
+        seq, frame = reader.wait_frame(-1, timeout=0)
+        if frame is not None and seq != self._seq:
+            self._seq = seq
+            with self._lock:
+                keys = list(self._wanted)
+            self._send_frame(seq, frame, keys)
+
+    def _send_frame(self, seq: int, frame, keys: list):
+        with self._lock:
+            variants = []
+            for key in keys:
+                encoded = self.reader._encode(seq, frame, *key)
+                pos = None if encoded is None else self._write(encoded.chunk)
+                if pos is not None:
+                    variants.append((key, pos, len(encoded.chunk), len(encoded.jpg)))
+        reader = self.reader
+        self.send(("frame", self.id, seq, reader.frame_time, reader.fps, reader.motion_score, variants))
+
+    def _write(self, data: bytes):
+        """Copy ``data`` into the ring; returns its position (total bytes before it)."""
+        size = self.ring.size - 8
+        if len(data) > size:
+            return None
+        pos = self._pos
+        if pos % size + len(data) > size:
+            pos += size - pos % size  # never split a frame across the end
+        # Reserve before writing, so a reader that sees an older header
+        # after copying knows its bytes were intact.
+        struct.pack_into("<Q", self.ring.buf, 0, pos + len(data))
+        start = 8 + pos % size
+        self.ring.buf[start:start + len(data)] = data
+        self._pos = pos + len(data)
+        return pos
+
+    def want(self, key):
+        with self._lock:
+            self._wanted.add(key)
+        seq, frame = self.reader.wait_frame(-1, timeout=0)
+        if frame is not None:
+            self._send_frame(seq, frame, [key])  # don't make the first viewer wait a frame
+
+    def drop(self, key):
+        with self._lock:
+            self._wanted.discard(key)
+
+    def reopen(self, open_url: str):
+        self.reader.open_url = open_url
+        self.reader.reopen()
+
+    def close(self, wait: bool = True):
+        # Unlink first: the name must go even if the process dies mid-join,
+        # while the web process's mapping stays valid until it closes it.
+        self.ring.unlink()
+        self.reader.remove_listener(self._changed)
+        self.reader.stop()
+        if wait:
+            self.reader._thread.join(self.reader.options.read_timeout_ms / 1000 + 1)
+            self.ring.close()
+
+
+def _ship_worker_metrics(send):
     while True:
-        ok, frame = cap.read()
-        if not ok or frame is None:
-            try: cap.release()
-            except Exception: pass
-            print("[warn] Frame read failed, attempting to reopen...")
-            time.sleep(CAPTURE_RETRY_DELAY_SEC)
-            cap = open_capture(rtsp_url)
+        time.sleep(WORKER_METRICS_SEC)
+        # Only the counts since the last message, which the web process adds
+        # up: several workers (or a restarted one) may report the same source.
+        send(("metrics", {name: metric.take() for name, metric in WORKER_METRICS.items()}))
+
+
+def worker_main(conn, cpus):
+    """Worker process: run the sources the web process opens here."""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    # The web process terminates its workers on exit; still unlink the rings.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    lock = threading.Lock()
+
+    def send(message):
+        with lock:
+            try:
+                conn.send(message)
+            except (OSError, ValueError):
+                pass
+
+    threading.Thread(target=_ship_worker_metrics, args=(send,), name="rtsp-metrics", daemon=True).start()
+    sources = {}
+    try:
+        while True:
+            try:
+                kind, *args = conn.recv()
+            except (EOFError, OSError, KeyboardInterrupt):
+                break
+            if kind == "stop":
+                break
+            if kind == "open":
+                sources[args[0]] = _WorkerSource(*args, send)
+            elif kind == "overlay":
+                rtsp_url, overlay = args
+                if overlay is None:
+                    overlays.pop(rtsp_url, None)
+                else:
+                    overlays[rtsp_url] = overlay
+            elif kind == "close":
+                source = sources.pop(args[0], None)
+                if source is not None:
+                    threading.Thread(target=source.close, daemon=True).start()
+            elif args[0] in sources:
+                getattr(sources[args[0]], kind)(*args[1:])  # want, drop, reopen
+    finally:
+        for source in sources.values():
+            source.close(wait=False)
+
+
+class CaptureHub:
+    """One SourceReader per RTSP URL, shared by every viewer and reference counted."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._readers = {}
+        self._lingering = {}  # reader -> monotonic deadline
+        # Replay rings outlive their readers (the last viewer leaving to
+        # watch a replay must not discard it) and are reused on restart,
+        # until REPLAY_KEEP_SEC after the last reader of the source stops.
+        # Keyed by camera, so sub-streams share it.
+        self._replays = {}
+        self._replays_idle = {}  # key -> monotonic time its last reader stopped
+
+    def acquire(self, rtsp_url: str, options: CaptureOptions = CaptureOptions()) -> SourceReader:
+        # Keyed by URL and options: viewers asking for a different transport
+        # or buffering get their own capture rather than silently sharing.
+        cls = WorkerReader if WORKER_PROCESSES > 0 else SourceReader
+        return self._acquire((rtsp_url, options),
+                             lambda: cls(rtsp_url, options, self._replay_ring(rtsp_url)))
+
+    def _replay_ring(self, rtsp_url: str):
+        # Called with self._lock held.
+        if REPLAY_SECONDS <= 0:
+            return None
+        key = main_source(rtsp_url)
+        self._replays_idle.pop(key, None)
+        ring = self._replays.get(key)
+        if ring is None:
+            ring = self._replays[key] = FrameRing(
+                REPLAY_MAX_BYTES, int(REPLAY_SECONDS * REPLAY_FPS) + 1, REPLAY_SECONDS)
+        return ring
+
+    def replay(self, rtsp_url: str):
+        """The replay ring recorded for ``rtsp_url`` (or its camera), or None."""
+        with self._lock:
+            return self._replays.get(main_source(rtsp_url))
+
+    def _replay_released(self, ring: FrameRing):
+        # Called with self._lock held, after a reader using ``ring`` left.
+        if any(r.replay is ring for r in self._readers.values()):
+            return
+        key = next((k for k, r in self._replays.items() if r is ring), None)
+        if key is not None and key not in self._replays_idle:
+            self._replays_idle[key] = time.monotonic()
+            self._schedule_replay_expiry(key, REPLAY_KEEP_SEC)
+
+    def _schedule_replay_expiry(self, key: str, delay: float):
+        timer = threading.Timer(delay, self._replay_expired, (key,))
+        timer.daemon = True
+        timer.start()
+
+    def _replay_expired(self, key: str):
+        with self._lock:
+            idle_since = self._replays_idle.get(key)
+            if idle_since is None:
+                return  # a reader picked it up again
+            remaining = idle_since + REPLAY_KEEP_SEC - time.monotonic()
+            if remaining <= 0:
+                del self._replays_idle[key]
+                del self._replays[key]
+        if remaining > 0:
+            self._schedule_replay_expiry(key, remaining)
+
+    def acquire_grid(self, sources: tuple, layout: tuple, size: tuple) -> "GridReader":
+        return self._acquire(("grid", sources, layout, size),
+                             lambda: GridReader(sources, layout, size))
+
+    def acquire_mp4(self, rtsp_url: str, options: CaptureOptions = CaptureOptions()) -> "RemuxReader":
+        return self._acquire(("mp4", rtsp_url, options), lambda: RemuxReader(rtsp_url, options))
+
+    def _acquire(self, key, factory) -> SourceReader:
+        with self._lock:
+            reader = self._readers.get(key)
+            if reader is None or reader.state == "failed":
+                # A reader that gave up stays with its remaining viewers;
+                # a new viewer gets a fresh set of attempts.
+                reader = factory()
+                self._readers[key] = reader
+                reader.start()
+                print(f"[info] Reader started: {reader.label}")
+            reader.viewers += 1
+            return reader
+
+    def linger(self, reader: SourceReader, seconds: float):
+        """Keep ``reader`` open for ``seconds`` more, as if one viewer stayed."""
+        with self._lock:
+            deadline = time.monotonic() + seconds
+            if reader in self._lingering:
+                self._lingering[reader] = max(self._lingering[reader], deadline)
+                return
+            self._lingering[reader] = deadline
+            reader.viewers += 1
+        self._schedule_linger(reader, seconds)
+
+    def _schedule_linger(self, reader: SourceReader, delay: float):
+        timer = threading.Timer(delay, self._linger_expired, (reader,))
+        timer.daemon = True
+        timer.start()
+
+    def _linger_expired(self, reader: SourceReader):
+        with self._lock:
+            remaining = self._lingering[reader] - time.monotonic()
+            if remaining <= 0:
+                del self._lingering[reader]
+        if remaining > 0:
+            self._schedule_linger(reader, remaining)
+        else:
+            self.release(reader)
+
+    def find(self, rtsp_url: str):
+        """Any running reader for ``rtsp_url``, regardless of capture options.
+
+        Failing that, a reader of one of its sub-streams: the camera is
+        reachable when any of its streams is.
+        """
+        readers = self.readers()
+        for reader in readers:
+            if reader.rtsp_url == rtsp_url:
+                return reader
+        return next((r for r in readers if main_source(r.rtsp_url) == rtsp_url), None)
+
+    def readers(self) -> list:
+        with self._lock:
+            return list(self._readers.values())
+
+    def stats(self) -> list:
+        return [reader.stats() for reader in self.readers()]
+
+    def release(self, reader: SourceReader):
+        with self._lock:
+            reader.viewers -= 1
+            if reader.viewers > 0:
+                return
+            if self._readers.get(reader.key) is reader:
+                del self._readers[reader.key]
+            if reader.replay is not None:
+                self._replay_released(reader.replay)
+        reader.stop()
+
+
+capture_hub = CaptureHub()
+
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+def start_recording(rtsp_url: str) -> SegmentRecorder:
+    """Start (or return the running) recorder for ``rtsp_url``."""
+    with _recorders_lock:
+        recorder = _recorders.get(rtsp_url)
+        if recorder is None or recorder.state in ("failed", "stopped"):
+            recorder = SegmentRecorder(rtsp_url, capture_options_for(rtsp_url),
+                                       os.path.join(RECORDINGS_DIR, recording_slug(rtsp_url)))
+            _recorders[rtsp_url] = recorder
+            recorder.start()
+        return recorder
+
+def stop_recording(rtsp_url: str) -> bool:
+    with _recorders_lock:
+        recorder = _recorders.pop(rtsp_url, None)
+    if recorder is None:
+        return False
+    recorder.stop()
+    return True
+
+def recorder_for(rtsp_url: str):
+    """The recorder for ``rtsp_url``, or a stopped one over its files on disk."""
+    with _recorders_lock:
+        recorder = _recorders.get(rtsp_url)
+    if recorder is not None:
+        return recorder
+    directory = os.path.join(RECORDINGS_DIR, recording_slug(rtsp_url))
+    if not os.path.isdir(directory):
+        return None
+    return SegmentRecorder(rtsp_url, CaptureOptions(), directory)
+
+def start_configured_recordings():
+    for rtsp_url in _recording.get("sources", []):
+        start_recording(rtsp_url)
+
+
+CAMERA_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+@dataclass
+class Camera:
+    """A named source. Viewers ask for it by name; the URL and login stay on the server."""
+
+    name: str
+    url: str
+    username: str = ""
+    password: str = ""
+    title: str = ""
+    capture: dict = field(default_factory=dict)  # CaptureOptions overrides
+    warm: bool = False                           # keep open without viewers
+    ladder: list = field(default_factory=list)   # smaller variants, see pick_source()
+
+    @classmethod
+    def from_dict(cls, name: str, values: dict, previous: "Camera" = None) -> "Camera":
+        """Validate ``values``; fields left out keep their ``previous`` value."""
+        if not CAMERA_NAME.fullmatch(name or ""):
+            raise ValueError("camera names are letters, digits, '.', '_' and '-'")
+        keep = previous or cls(name, "")
+        url = str(values.get("url", keep.url)).strip()
+        if not url:
+            raise ValueError("url is required")
+        username, password = keep.username, keep.password
+        parts = urlsplit(url)
+        if parts.username is not None:
+            # Credentials embedded in the URL are moved out of it.
+            username, password = unquote(parts.username), unquote(parts.password or "")
+            url = urlunsplit(parts._replace(netloc=parts.netloc.rsplit("@", 1)[1]))
+        capture = dict(values.get("capture", keep.capture))
+        CaptureOptions.from_dict(capture)  # fail now rather than at the first open
+        warm = values.get("warm", keep.warm)
+        if not isinstance(warm, bool):
+            warm = str(warm).lower() in ("1", "true", "yes", "on")
+        return cls(name, url, str(values.get("username", username)), str(values.get("password", password)),
+                   str(values.get("title", keep.title)), capture, warm,
+                   parse_ladder(values.get("ladder", keep.ladder)))
+
+    def connect_url(self, url: str = None) -> str:
+        """``url`` (the main stream by default) with the camera's login."""
+        url = url or self.url
+        if not self.username or not urlsplit(url).netloc:
+            return url
+        auth = quote(self.username, safe="")
+        if self.password:
+            auth += ":" + quote(self.password, safe="")
+        parts = urlsplit(url)
+        return urlunsplit(parts._replace(netloc=f"{auth}@{parts.netloc}"))
+
+    def substream(self, width: int):
+        """The ladder sub-stream ``width`` pixels wide, or None."""
+        return next((r for r in self.ladder if "url" in r and r["width"] == width), None)
+
+    def public(self) -> dict:
+        """Everything but the password, for clients."""
+        return {"name": self.name, "title": self.title or self.name, "url": self.url,
+                "username": self.username, "has_password": bool(self.password),
+                "capture": self.capture, "warm": self.warm, "ladder": self.ladder}
+
+
+def parse_ladder(rungs) -> list:
+    """Validated ladder entries, narrowest first.
+
+    An entry with a ``url`` is a sub-stream the camera sends at ``width`` x
+    ``height`` (many send /stream2 next to /stream1); one without is the
+    main stream downscaled here to ``width`` (and ``height``, if given).
+    Sub-streams use the camera's login, so credentials in their URL are dropped.
+    """
+    if not isinstance(rungs, list) or len(rungs) > LADDER_MAX_RUNGS:
+        raise ValueError(f"ladder must be a list of at most {LADDER_MAX_RUNGS} entries")
+    ladder = []
+    for rung in rungs:
+        if not isinstance(rung, dict):
+            raise ValueError("ladder entries must be objects")
+        width, height = int(rung.get("width") or 0), int(rung.get("height") or 0)
+        if width <= 0 or height < 0:
+            raise ValueError("ladder entries need a width > 0")
+        url = str(rung.get("url") or "").strip()
+        if not url:
+            ladder.append({"width": width, "height": height})
+            continue
+        if not height:
+            raise ValueError("sub-streams need a width and a height")
+        if any("url" in r and r["width"] == width for r in ladder):
+            raise ValueError("each sub-stream needs its own width")
+        parts = urlsplit(url)
+        if parts.username is not None:
+            url = urlunsplit(parts._replace(netloc=parts.netloc.rsplit("@", 1)[1]))
+        ladder.append({"url": url, "width": width, "height": height})
+    return sorted(ladder, key=lambda r: r["width"])
+
+
+class SourceRegistry:
+    """Cameras from config "cameras" (read-only) plus those managed through /sources.
+
+    Managed cameras are saved to ``path``, which is written owner-only
+    because it holds their passwords.
+    """
+
+    def __init__(self, configured: dict, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cameras = {}
+        self._warm = {}  # name -> reader we hold a reference on
+        self._watchdog = None
+        self.configured = frozenset(configured)
+        for name, values in [*configured.items(), *self._load().items()]:
+            if name in self._cameras:
+                continue
+            try:
+                self._cameras[name] = Camera.from_dict(name, values)
+            except (TypeError, ValueError, AttributeError) as exc:
+                print(f"[warn] Ignoring camera {name}: {exc}")
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                return json.load(fh).get("cameras", {})
+        except (OSError, ValueError, AttributeError) as exc:
+            print(f"[warn] Ignoring saved cameras {self.path}: {exc}")
+            return {}
+
+    def _save(self):
+        # Called with self._lock held.
+        saved = {name: asdict(c) for name, c in self._cameras.items() if name not in self.configured}
+        for values in saved.values():
+            del values["name"]
+        tmp = f"{self.path}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump({"cameras": saved}, fh, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, name: str):
+        return self._cameras.get(name)
+
+    def list(self) -> list:
+        with self._lock:
+            return list(self._cameras.values())
+
+    def put(self, name: str, values: dict) -> Camera:
+        """Add or update a managed camera; viewers of it reconnect if its URL changed."""
+        with self._lock:
+            previous = self._cameras.get(name)
+            camera = Camera.from_dict(name, values, previous)
+            self._cameras[name] = camera
+            self._save()
+        if previous is not None and (previous.connect_url() != camera.connect_url()
+                                     or previous.ladder != camera.ladder):
+            for reader in capture_hub.readers() + list(_recorders.values()):
+                if main_source(reader.rtsp_url) == name:
+                    reader.reopen()
+        self._rewarm(name)
+        return camera
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            if self._cameras.pop(name, None) is None:
+                return False
+            self._save()
+        self._rewarm(name)
+        return True
+
+    def _rewarm(self, name: str):
+        """Hold a reader for ``name`` if it is warm (with its current options), else let go."""
+        camera = self._cameras.get(name)
+        reader = None
+        if camera is not None and camera.warm:
+            reader = capture_hub.acquire(name, capture_options_for(name))
+        with self._lock:
+            old = self._warm.pop(name, None)
+            if reader is not None:
+                self._warm[name] = reader
+        # Acquire before releasing so an unchanged reader is never stopped.
+        if old is not None:
+            capture_hub.release(old)
+
+    def start_warm(self):
+        """Open every warm camera and keep them open."""
+        for camera in self.list():
+            if camera.warm:
+                self._rewarm(camera.name)
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._keep_warm, name="rtsp-warm", daemon=True)
+            self._watchdog.start()
+
+    def _keep_warm(self):
+        while True:
+            time.sleep(WARM_CHECK_SEC)
+            with self._lock:
+                failed = [name for name, reader in self._warm.items() if reader.state == "failed"]
+            for name in failed:
+                print(f"[info] Restarting warm source: {name}")
+                self._rewarm(name)
+
+
+cameras = SourceRegistry(CONFIG.get("cameras", {}), SOURCES_PATH)
+
+
+def source_url(src: str) -> str:
+    """What to open for ``src``: a registered camera's URL (or sub-stream) with its login, else ``src``."""
+    camera = cameras.get(src)
+    if camera is not None:
+        return camera.connect_url()
+    name, _, width = src.rpartition("@")
+    camera = cameras.get(name) if width.isdigit() else None
+    rung = camera.substream(int(width)) if camera is not None else None
+    return camera.connect_url(rung["url"]) if rung is not None else src
+
+
+def main_source(src: str) -> str:
+    """The camera a sub-stream source belongs to (``door@640`` -> ``door``), else ``src``."""
+    # Purely by name, so worker processes agree without the registry.
+    name, sep, width = src.rpartition("@")
+    return name if sep and width.isdigit() and CAMERA_NAME.fullmatch(name) else src
+
+
+def pick_source(src: str, view: FrameView) -> tuple:
+    """``(src, view)`` that serves ``view`` of ``src`` from the camera's ladder.
+
+    The narrowest entry that still fills the requested box (in either
+    dimension, since fitting keeps the aspect ratio) wins. A sub-stream is
+    opened as a source of its own, ``name@width``; a downscale entry replaces
+    the box with its own, so viewers of similar sizes share one encode.
+    Without a ladder or a requested size the main stream serves as before.
+    """
+    camera = cameras.get(src)
+    if camera is None or not camera.ladder or not (view.width or view.height):
+        return src, view
+    # A crop only gets its share of the entry's pixels.
+    share_w, share_h = view.crop[2:] if view.crop else (1.0, 1.0)
+    for rung in camera.ladder:
+        width, height = rung["width"] * share_w, rung["height"] * share_h
+        if not ((view.width and width >= view.width) or (view.height and height >= view.height)):
             continue
-        ok, buf = cv2.imencode('.jpg', frame, encode_param)
-        if not ok:
+        if "url" in rung:
+            return f"{camera.name}@{rung['width']}", view
+        return src, replace(view, width=_round_up(math.ceil(width)),
+                            height=_round_up(math.ceil(height)) if height else 0)
+    return src, view
+
+
+def sources_response(method: str, args, body: bytes = b"") -> tuple:
+    """``(status, payload)`` for /sources, shared by both servers.
+
+    GET lists cameras (or one, with ``name``) without their passwords; POST
+    adds or updates one from a JSON body; DELETE ``?name=`` removes one.
+    """
+    if method == "POST":
+        try:
+            values = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "body must be JSON"}
+        if not isinstance(values, dict):
+            return 400, {"error": "body must be a JSON object"}
+        name = args.get("name") or values.get("name")
+        if name in cameras.configured:
+            return 409, {"error": "camera is defined in the config file"}
+        camera = cameras.put(name, values)
+        print(f"[info] Camera saved: {name} ({redact_url(camera.url)})")
+        return 200, _camera_status(camera)
+    name = args.get("name")
+    if method == "DELETE":
+        if name in cameras.configured:
+            return 409, {"error": "camera is defined in the config file"}
+        return (200, {"removed": True}) if cameras.remove(name) else (404, {"error": "no such camera"})
+    if name:
+        camera = cameras.get(name)
+        return (200, _camera_status(camera)) if camera else (404, {"error": "no such camera"})
+    return 200, {"default": DEFAULT_RTSP_URL if cameras.get(DEFAULT_RTSP_URL) else redact_url(DEFAULT_RTSP_URL),
+                 "sources": [_camera_status(c) for c in cameras.list()]}
+
+
+def _camera_status(camera: Camera) -> dict:
+    reader = capture_hub.find(camera.name)
+    return {**camera.public(), "configured": camera.name in cameras.configured,
+            "state": reader.state if reader is not None else "idle"}
+
+
+def recordings_response(method: str, args) -> tuple:
+    """``(status, payload)`` for /recordings, shared by both servers.
+
+    GET lists recorders, or with ``src`` that source's segments (optionally
+    ``from``/``to`` epoch seconds); POST starts and DELETE stops recording.
+    """
+    src = args.get("src")
+    if method == "GET" and not src:
+        with _recorders_lock:
+            recorders = list(_recorders.values())
+        return 200, {"recordings": [r.stats() for r in recorders]}
+    if not src:
+        return 400, {"error": "src is required"}
+    if method == "POST":
+        if shutil.which(FFMPEG_BIN) is None:
+            return 501, {"error": f"{FFMPEG_BIN} not found"}
+        return 200, start_recording(src).stats()
+    if method == "DELETE":
+        return (200, {"stopped": True}) if stop_recording(src) else (404, {"error": "not recording"})
+    recorder = recorder_for(src)
+    if recorder is None:
+        return 404, {"error": "no recordings for this source"}
+    start = float(args["from"]) if args.get("from") else None
+    end = float(args["to"]) if args.get("to") else None
+    slug = os.path.basename(recorder.directory)
+    segments = [{**s, "url": f"/recordings/{slug}/{s['file']}"}
+                for s in recorder.find_segments(start, end)]
+    return 200, {"source": recorder.label, "recording": src in _recorders, "segments": segments}
+
+
+def recording_file(slug: str, name: str):
+    """Path of a recorded segment, or None if the name is not one of ours."""
+    if (not re.fullmatch(r"[A-Za-z0-9._-]+", slug) or slug in (".", "..")
+            or not re.fullmatch(r"[0-9-]+\.mp4", name)):
+        return None
+    root = os.path.realpath(RECORDINGS_DIR)
+    path = os.path.realpath(os.path.join(root, slug, name))
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def overlay_response(method: str, src: str, body: bytes = b"") -> tuple:
+    """``(status, payload)`` for /overlay, shared by both servers.
+
+    POST takes ``{"text", "color", "x", "y", "stickers": [{"image", "x", "y",
+    "width"}]}`` (positions in percent, sticker width as a fraction of the
+    frame) and burns it into every frame of ``src``; DELETE removes it.
+    """
+    if method == "POST":
+        if len(body) > OVERLAY_MAX_BYTES:
+            return 413, {"error": "overlay too large"}
+        try:
+            values = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "body must be JSON"}
+        if not isinstance(values, dict):
+            return 400, {"error": "body must be a JSON object"}
+        set_overlay(src, Overlay.from_dict(values))
+        print(f"[info] Overlay burn-in set for {redact_url(src)}")
+    elif method == "DELETE":
+        if src not in overlays:
+            return 404, {"error": "no overlay for this source"}
+        set_overlay(src, None)
+        return 200, {"removed": True}
+    overlay = overlays.get(src)
+    if overlay is None:
+        return 404, {"error": "no overlay for this source"}
+    return 200, overlay.as_dict()
+
+
+def _collect_hub_metrics():
+    fps, viewers, sent, dropped, motion = {}, {}, {}, {}, {}
+    for reader in capture_hub.readers():
+        fps[(reader.label,)] = round(reader.fps, 2)
+        if reader.motion_score is not None:
+            motion[(reader.label,)] = round(reader.motion_score, 2)
+        viewers[(reader.label,)] = viewers.get((reader.label,), 0) + len(reader.viewer_stats)
+        for v in list(reader.viewer_stats):
+            key = (reader.label, v.id, v.client)
+            sent[key] = v.frames_sent
+            dropped[key] = v.frames_dropped
+    SOURCE_FPS.replace(fps)
+    ACTIVE_VIEWERS.replace(viewers)
+    VIEWER_FRAMES_SENT.replace(sent)
+    VIEWER_FRAMES_DROPPED.replace(dropped)
+    MOTION_SCORE.replace(motion)
+
+
+metrics.REGISTRY.add_collector(_collect_hub_metrics)
+
+class FeedSession:
+    """Pacing and bookkeeping for one viewer of a SourceReader.
+
+    Holds everything except the waiting, so the threaded generator below and
+    the asyncio streamer in rtsp_viewer_asgi drive the same logic.
+    """
+
+    def __init__(self, reader: SourceReader, client: str = "",
+                 view: FrameView = FULL_FRAME, quality: int = JPEG_QUALITY,
+                 fps: float = 0.0, adaptive: bool = False):
+        self.reader = reader
+        self.view = view
+        self.seq = 0
+        self.finished = False
+        self.viewer = ViewerStats(client)
+        self.rate = AdaptiveRate(quality, fps or ADAPTIVE_MAX_FPS) if adaptive else None
+        if self.rate is not None:
+            quality, fps = self.rate.quality, self.rate.fps
+        self.viewer.quality, self.viewer.fps = quality, fps
+        self._next_due = 0.0
+        self._placeholder_at = 0.0
+        self._started = 0.0
+        self._last_status = None
+        self._connected = time.monotonic()
+        self._cached = None
+        self._shown_cached = False
+        reader.viewer_stats.add(self.viewer)
+
+    def status_chunk(self):
+        """Placeholder to send while the source isn't live, else None."""
+        state = self.reader.state
+        if state in ("failed", "stopped"):
+            self.finished = True
+            return placeholder_chunk("failed")
+        if state == "live":
+            return None
+        # Keep the viewer informed (and the connection alive) while the
+        # shared reader reconnects; never touch the camera here.
+        now = time.monotonic()
+        if now - self._placeholder_at < PLACEHOLDER_INTERVAL_SEC:
+            return None
+        self._placeholder_at = now
+        if state == "connecting":
+            # Until the first live frame, show the last one we have instead
+            # of a status card; the page's status line says it's connecting.
+            jpg = self.cached_jpeg() if not self._shown_cached else self._cached
+            if jpg is not None:
+                return multipart_chunk(jpg)
+        return placeholder_chunk(state)
+
+    def cached_jpeg(self):
+        """The source's last saved frame, once, if nothing live has been sent yet."""
+        if self.seq or self._shown_cached:
+            return None
+        self._shown_cached = True
+        jpg = last_frames.get(self.reader.rtsp_url) if self.reader.keeps_last_frame else None
+        if jpg is None:
+            return None
+        if self.view != FULL_FRAME:
+            frame = cv2.imdecode(np.frombuffer(jpg, np.uint8), cv2.IMREAD_COLOR)
+            buf = JPEG_ENCODER.encode(self.view.apply(frame), self.viewer.quality)
+            jpg = None if buf is None else bytes(buf)
+        if jpg is not None:
+            self._cached = jpg
+            TIME_TO_FIRST_FRAME.observe(time.monotonic() - self._connected, self.reader.label, "cached")
+        return jpg
+
+    def status_update(self):
+        """Reader status for message-based clients when it changed, else None."""
+        status = self.reader.status
+        if status == self._last_status:
+            return None
+        self._last_status = status
+        if status["state"] in ("failed", "stopped"):
+            self.finished = True
+        return status
+
+    def pace(self) -> float:
+        """Seconds to wait before taking the next frame (fps cap)."""
+        if not self.viewer.fps:
+            return 0.0
+        return self._next_due - time.monotonic()
+
+    def frame_chunk(self, seq: int, frame):
+        """Encoded chunk for a frame from ``wait_frame``, or None if nothing new."""
+        return self._take(seq, frame, self.reader.encode)
+
+    def frame_jpeg(self, seq: int, frame):
+        """Like frame_chunk, but the bare JPEG for message-based transports."""
+        return self._take(seq, frame, self.reader.encode_jpeg)
+
+    def _take(self, seq: int, frame, encode):
+        if frame is None or seq == self.seq:
+            return None
+        new_seq, chunk = encode(seq, frame, self.viewer.quality, self.view)
+        if chunk is None:
+            self.seq = new_seq
+            return None
+        # The reader never waits for us: anything published while we were
+        # busy writing the previous frame is skipped, not queued.
+        skipped = max(0, new_seq - self.seq - 1) if self.seq else 0
+        if skipped:
+            self.viewer.frames_dropped += skipped
+            FRAMES_DROPPED.inc(self.reader.label, amount=skipped)
+        if not self.seq:
+            TIME_TO_FIRST_FRAME.observe(time.monotonic() - self._connected, self.reader.label, "live")
+        self.seq = new_seq
+        self._started = time.monotonic()
+        if self.viewer.fps:
+            self._next_due = self._started + 1.0 / self.viewer.fps
+        return chunk
+
+    def sent(self):
+        """Record that the last frame finished writing (or, over WebSocket, was drawn)."""
+        viewer = self.viewer
+        viewer.frames_sent += 1
+        viewer.drain_ms = (time.monotonic() - self._started) * 1000.0
+        if self.rate is not None:
+            self.rate.update(viewer.drain_ms / 1000.0)
+            viewer.quality, viewer.fps = self.rate.quality, self.rate.fps
+
+    def close(self):
+        self.reader.viewer_stats.discard(self.viewer)
+        viewer = self.viewer
+        print(f"[info] Viewer {viewer.client or '?'} left: sent {viewer.frames_sent}, dropped {viewer.frames_dropped}")
+
+
+class Mp4Session:
+    """One /video_mp4 viewer: the init segment, then fragments in order."""
+
+    def __init__(self, reader: RemuxReader, client: str = ""):
+        self.reader = reader
+        self.seq = 0
+        with reader._cond:
+            self.init, self.version = reader.init, reader.init_version
+        self.viewer = ViewerStats(client)
+        self.viewer.quality = self.viewer.fps = None  # passthrough: the camera's own
+        reader.viewer_stats.add(self.viewer)
+
+    @property
+    def finished(self) -> bool:
+        # A new init segment (FFmpeg restarted) can't be spliced into this
+        # stream; ending it lets the page reconnect and start over.
+        reader = self.reader
+        return reader.state in ("failed", "stopped") or reader.init_version != self.version
+
+    def take(self, timeout: float = 1.0) -> list:
+        """Fragments to send next (empty on timeout)."""
+        fragments = self.reader.wait_fragments(self.seq, timeout)
+        if not fragments:
+            return []
+        skipped = fragments[0][0] - self.seq - 1 if self.seq else 0
+        if skipped > 0:
+            self.viewer.frames_dropped += skipped
+            FRAMES_DROPPED.inc(self.reader.label, amount=skipped)
+        self.seq = fragments[-1][0]
+        self.viewer.frames_sent += len(fragments)
+        return [data for _, data in fragments]
+
+    def close(self):
+        self.reader.viewer_stats.discard(self.viewer)
+
+
+def mp4_content_type(reader: RemuxReader) -> str:
+    return f'video/mp4; codecs="{reader.codec}"' if reader.codec else "video/mp4"
+
+
+def mp4_generator(session: Mp4Session):
+    try:
+        yield session.init
+        while not session.finished:
+            yield from session.take()
+    finally:
+        session.close()
+
+
+def stream_session(session: FeedSession):
+    """Yield multipart chunks for ``session`` until its source gives up."""
+    reader = session.reader
+    while True:
+        chunk = session.status_chunk()
+        if chunk is not None:
+            yield chunk
+        if session.finished:
+            return
+        delay = session.pace()
+        if delay > 0:
+            time.sleep(delay)
+        seq, frame = reader.wait_frame(session.seq)
+        chunk = session.frame_chunk(seq, frame)
+        if chunk is None:
             continue
-        jpg = buf.tobytes()
-        yield (b"--frame\r\n"
-               b"Content-Type: image/jpeg\r\n\r\n" + jpg + b"\r\n")
+        yield chunk
+        session.sent()
+
+
+def mjpeg_generator(rtsp_url: str, client: str = "",
+                    options: CaptureOptions = CaptureOptions(),
+                    view: FrameView = FULL_FRAME,
+                    quality: int = JPEG_QUALITY, fps: float = 0.0,
+                    adaptive: bool = False):
+    # Acquired inside the generator body so a client that never starts
+    # reading cannot leak a reference.
+    reader = capture_hub.acquire(rtsp_url, options)
+    session = FeedSession(reader, client, view, quality, fps, adaptive)
+    try:
+        yield from stream_session(session)
+    finally:
+        session.close()
+        capture_hub.release(reader)
+
+
+def grid_generator(sources: tuple, layout: tuple, size: tuple, client: str = "",
+                   quality: int = JPEG_QUALITY, fps: float = 0.0, adaptive: bool = False):
+    reader = capture_hub.acquire_grid(sources, layout, size)
+    session = FeedSession(reader, client, FULL_FRAME, quality, fps, adaptive)
+    try:
+        yield from stream_session(session)
+    finally:
+        session.close()
+        capture_hub.release(reader)
+
+
+def parse_replay_args(args) -> tuple:
+    """``(seconds, speed)``: how far back to start and the playback rate."""
+    seconds = float(args.get("seconds", REPLAY_SECONDS))
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise ValueError("seconds must be a finite number > 0")
+    speed = float(args.get("speed", 1.0))
+    if not 0.1 <= speed <= 16:
+        raise ValueError("speed must be in 0.1..16")
+    return seconds, speed
+
+
+def replay_plan(ring: FrameRing, seconds: float, speed: float) -> list:
+    """``[(offset_sec, number)]``: when to send each frame held from ``seconds`` ago."""
+    frames = ring.since(time.time() - seconds)
+    if not frames:
+        return []
+    first = frames[0][1]
+    return [((t - first) / speed, n) for n, t in frames]
+
+
+def replay_generator(ring: FrameRing, plan: list):
+    started = time.monotonic()
+    for offset, number in plan:
+        delay = started + offset - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        chunk = ring.chunk(number)
+        if chunk is not None:  # overwritten while we were playing slowly
+            yield chunk
+
+
+def parse_feed_args(args) -> dict:
+    """Validated /video_feed arguments as keyword arguments for a feed.
+
+    Raises ValueError with a client-facing message on bad input.
+    """
+    quality, fps, adaptive = stream_params(args)
+    return {
+        "options": capture_options_for(args.get("src", DEFAULT_RTSP_URL), args),
+        "view": FrameView.from_args(args),
+        "quality": quality,
+        "fps": fps,
+        "adaptive": adaptive,
+    }
+
+def parse_grid_args(args) -> dict:
+    """Validated /grid_feed arguments; ``args`` needs ``getlist`` for repeated src."""
+    sources = tuple(u for u in args.getlist("src") if u)
+    if not sources:
+        raise ValueError("at least one src is required")
+    if len(sources) > GRID_MAX_TILES:
+        raise ValueError(f"at most {GRID_MAX_TILES} sources")
+    width = _round_up(int(args.get("w", GRID_DEFAULT_SIZE[0])))
+    height = _round_up(int(args.get("h", GRID_DEFAULT_SIZE[1])))
+    if not (0 < width <= GRID_MAX_SIZE[0] and 0 < height <= GRID_MAX_SIZE[1]):
+        raise ValueError(f"grid size must be within {GRID_MAX_SIZE[0]}x{GRID_MAX_SIZE[1]}")
+    layout = grid_layout(args.get("layout", "auto"), len(sources))
+    if width // layout[0] - GRID_GAP < GRID_MIN_CELL or height // layout[1] - GRID_GAP < GRID_MIN_CELL:
+        raise ValueError(f"tiles must be at least {GRID_MIN_CELL}px; use a larger w/h or fewer columns/rows")
+    quality, fps, adaptive = stream_params(args)
+    return {
+        "sources": sources,
+        "layout": layout,
+        "size": (width, height),
+        "quality": quality,
+        "fps": fps,
+        "adaptive": adaptive,
+    }
+
+def snapshot(args, if_none_match: str = "", if_modified_since: str = "") -> tuple:
+    """``(status, body, headers)`` for /snapshot.jpg, shared by both servers.
+
+    Serves the reader's newest frame through the shared encode cache, so a
+    poll while the source is streaming usually costs no encode at all, and
+    answers 304 before encoding when the client already has this frame.
+    Raises ValueError on bad parameters.
+    """
+    src = args.get("src", DEFAULT_RTSP_URL)
+    options = capture_options_for(src, args)
+    src, view = pick_source(src, FrameView.from_args(args))
+    quality = stream_params(args)[0]
+    reader = capture_hub.acquire(src, options)
+    try:
+        deadline = time.monotonic() + SNAPSHOT_WAIT_SEC
+        seq, frame = reader.wait_frame(-1, timeout=0)
+        while frame is None and reader.state not in ("failed", "stopped"):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            seq, frame = reader.wait_frame(0, timeout=remaining)
+        capture_hub.linger(reader, SNAPSHOT_LINGER_SEC)
+    finally:
+        capture_hub.release(reader)
+    if frame is None:
+        SNAPSHOTS.inc(reader.label, "503")
+        return 503, b"No frame available yet\n", {
+            "Content-Type": "text/plain", "Retry-After": str(int(CAPTURE_RETRY_DELAY_SEC) or 1)}
+
+    variant = zlib.crc32(repr((quality, view)).encode())
+    etag = f'"{int(reader.started_at * 1000):x}-{seq}-{variant:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(reader.frame_time, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if if_none_match:
+        not_modified = assets.etag_matches(if_none_match, etag)
+    elif if_modified_since:
+        try:
+            not_modified = int(reader.frame_time) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            not_modified = False
+    else:
+        not_modified = False
+    if not_modified:
+        SNAPSHOTS.inc(reader.label, "304")
+        return 304, b"", headers
+
+    _, jpg = reader.encode_jpeg(seq, frame, quality, view)
+    if jpg is None:
+        SNAPSHOTS.inc(reader.label, "500")
+        return 500, b"Encoding failed\n", {"Content-Type": "text/plain"}
+    SNAPSHOTS.inc(reader.label, "200")
+    return 200, jpg, {**headers, "Content-Type": "image/jpeg"}
+
+# Rendered, hashed and compressed once: the page only changes on restart.
+STATIC_ASSETS = assets.AssetBundle(STATIC_DIR)
+PAGE = assets.Asset(
+    app.jinja_env.get_template("index.html").render(asset_url=STATIC_ASSETS.url).encode("utf-8"),
+    "text/html; charset=utf-8")
 
 @app.route("/")
 def index():
-    return render_template_string(HTML)
+    status, body, headers = PAGE.response(request.headers.get("Accept-Encoding", ""),
+                                          request.headers.get("If-None-Match", ""))
+    return Response(body, status=status, headers=headers)
+
+@app.route("/static/<name>")
+def static_file(name):
+    status, body, headers = STATIC_ASSETS.response(name, request.headers.get("Accept-Encoding", ""),
+                                                   request.headers.get("If-None-Match", ""))
+    return Response(body, status=status, headers=headers)
 
 @app.route("/video_feed")
 def video_feed():
     src = request.args.get("src", DEFAULT_RTSP_URL)
+    try:
+        feed = parse_feed_args(request.args)
+    except ValueError as exc:
+        return Response(f"Invalid parameter: {exc}\n", status=400, mimetype="text/plain")
+    src, feed["view"] = pick_source(src, feed["view"])
     print(f"[info] /video_feed using: {src}")
-    return Response(mjpeg_generator(src),
+    resp = Response(mjpeg_generator(src, request.remote_addr or "", **feed),
+                    mimetype="multipart/x-mixed-replace; boundary=frame")
+    # Effective settings after config and query overrides; /stats adds what
+    # the backend actually accepted once the capture is open.
+    resp.headers["X-Capture-Options"] = capture_options_header(feed["options"])
+    return resp
+
+@app.route("/grid_feed")
+def grid_feed():
+    try:
+        grid = parse_grid_args(request.args)
+    except ValueError as exc:
+        return Response(f"Invalid parameter: {exc}\n", status=400, mimetype="text/plain")
+    print(f"[info] /grid_feed with {len(grid['sources'])} sources")
+    return Response(grid_generator(client=request.remote_addr or "", **grid),
+                    mimetype="multipart/x-mixed-replace; boundary=frame")
+
+@app.route("/snapshot.jpg")
+def snapshot_jpg():
+    try:
+        status, body, headers = snapshot(request.args, request.headers.get("If-None-Match", ""),
+                                         request.headers.get("If-Modified-Since", ""))
+    except ValueError as exc:
+        return Response(f"Invalid parameter: {exc}\n", status=400, mimetype="text/plain")
+    return Response(body, status=status, headers=headers)
+
+@app.route("/video_mp4")
+def video_mp4():
+    """The camera's own H.264/H.265 as fragmented MP4, for Media Source Extensions."""
+    src = request.args.get("src", DEFAULT_RTSP_URL)
+    try:
+        options = capture_options_for(src, request.args)
+    except ValueError as exc:
+        return Response(f"Invalid parameter: {exc}\n", status=400, mimetype="text/plain")
+    if shutil.which(FFMPEG_BIN) is None:
+        return Response(f"{FFMPEG_BIN} not found; use /video_feed\n", status=501, mimetype="text/plain")
+    print(f"[info] /video_mp4 using: {src}")
+    reader = capture_hub.acquire_mp4(src, options)
+    if not reader.wait_init(MP4_INIT_WAIT_SEC):
+        capture_hub.release(reader)
+        return Response("Source not available\n", status=503, mimetype="text/plain",
+                        headers={"Retry-After": "5"})
+    resp = Response(mp4_generator(Mp4Session(reader, request.remote_addr or "")),
+                    content_type=mp4_content_type(reader),
+                    headers={"Cache-Control": "no-cache"})
+    resp.call_on_close(lambda: capture_hub.release(reader))
+    return resp
+
+def ws_feed(ws):
+    """Binary JPEG per message; the next frame waits for the page's ack.
+
+    With one frame in flight the socket never queues stale frames, and the
+    send-to-ack time (which includes decoding and drawing) drives adaptive.
+    """
+    try:
+        feed = parse_feed_args(request.args)
+    except ValueError as exc:
+        ws.close(1008, f"Invalid parameter: {exc}")
+        return
+    src, feed["view"] = pick_source(request.args.get("src", DEFAULT_RTSP_URL), feed["view"])
+    print(f"[info] /ws_feed using: {src}")
+    reader = capture_hub.acquire(src, feed["options"])
+    session = FeedSession(reader, request.remote_addr or "", feed["view"], feed["quality"],
+                          feed["fps"], feed["adaptive"])
+    try:
+        if reader.state == "connecting":
+            jpg = session.cached_jpeg()
+            if jpg is not None:
+                ws.send(jpg)
+                ws.receive()
+        while True:
+            status = session.status_update()
+            if status is not None:
+                ws.send(json.dumps(status))
+            if session.finished:
+                break
+            delay = session.pace()
+            if delay > 0:
+                time.sleep(delay)
+            seq, frame = reader.wait_frame(session.seq)
+            jpg = session.frame_jpeg(seq, frame)
+            if jpg is None:
+                continue
+            ws.send(jpg)
+            ws.receive()
+            session.sent()
+        ws.close()
+    except ConnectionClosed:
+        pass
+    finally:
+        session.close()
+        capture_hub.release(reader)
+
+if Sock is not None:
+    Sock(app).route("/ws_feed")(ws_feed)
+
+@app.route("/replay")
+def replay():
+    """The last ``seconds`` of a running source as MJPEG, at ``speed``."""
+    src = request.args.get("src", DEFAULT_RTSP_URL)
+    try:
+        seconds, speed = parse_replay_args(request.args)
+    except ValueError as exc:
+        return Response(f"Invalid parameter: {exc}\n", status=400, mimetype="text/plain")
+    ring = capture_hub.replay(src)
+    plan = replay_plan(ring, seconds, speed) if ring is not None else []
+    if not plan:
+        return Response("Nothing recorded for this source\n", status=404, mimetype="text/plain")
+    return Response(replay_generator(ring, plan),
                     mimetype="multipart/x-mixed-replace; boundary=frame")
 
+@app.route("/replay_info")
+def replay_info():
+    ring = capture_hub.replay(request.args.get("src", DEFAULT_RTSP_URL))
+    info = ring.info() if ring is not None else {"frames": 0, "seconds": 0.0}
+    return jsonify(max_seconds=REPLAY_SECONDS, **info)
+
+@app.route("/recordings", methods=["GET", "POST", "DELETE"])
+def recordings():
+    try:
+        status, payload = recordings_response(request.method, request.args)
+    except ValueError as exc:
+        status, payload = 400, {"error": f"Invalid parameter: {exc}"}
+    return jsonify(payload), status
+
+@app.route("/recordings/<slug>/<name>")
+def recording_segment(slug, name):
+    path = recording_file(slug, name)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype="video/mp4", conditional=True)
+
+@app.route("/sources", methods=["GET", "POST", "DELETE"])
+def sources():
+    try:
+        status, payload = sources_response(request.method, request.args, request.get_data())
+    except (TypeError, ValueError) as exc:
+        status, payload = 400, {"error": f"Invalid parameter: {exc}"}
+    return jsonify(payload), status
+
+@app.route("/overlay", methods=["GET", "POST", "DELETE"])
+def overlay():
+    try:
+        status, payload = overlay_response(request.method, request.args.get("src", DEFAULT_RTSP_URL),
+                                           request.get_data())
+    except (TypeError, ValueError) as exc:
+        status, payload = 400, {"error": f"Invalid parameter: {exc}"}
+    return jsonify(payload), status
+
+@app.route("/status_stream")
+def status_stream():
+    """Server-sent events with the source's reader state (live, reconnecting, ...)."""
+    src = request.args.get("src", DEFAULT_RTSP_URL)
+
+    def events():
+        version, last = -1, None
+        while True:
+            reader = capture_hub.find(src)
+            if reader is None:
+                version, status = -1, {"state": "idle"}
+                time.sleep(PLACEHOLDER_INTERVAL_SEC)
+            else:
+                version, status = reader.wait_status(version)
+            if status != last:
+                last = status
+                yield f"data: {json.dumps(status)}\n\n"
+            else:
+                yield ": keepalive\n\n"
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route("/stats")
+def stats():
+    return jsonify(encoder=JPEG_ENCODER.describe(), sources=capture_hub.stats())
+
 if __name__ == "__main__":
     print("Starting server at http://127.0.0.1:5000/")
     print(f"Default RTSP source: {DEFAULT_RTSP_URL}")
+    start_configured_recordings()
+    cameras.start_warm()
     app.run(host="127.0.0.1", port=5000, debug=False, threaded=True)
@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""Asyncio (ASGI) serving mode for the RTSP viewer.
+
+Serves the same routes as the Flask app, but every MJPEG client is a
+coroutine waiting on the shared capture layer instead of a pinned OS
+thread. Decoding stays in the per-source reader threads; JPEG encoding runs
+in a bounded thread pool.
+
+    pip install uvicorn
+    python rtsp_viewer_asgi.py            # or: uvicorn rtsp_viewer_asgi:app
+"""
+import asyncio
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+import metrics
+import rtsp_viewer as viewer
+
+ENCODE_WORKERS = int(os.environ.get("RTSP_VIEWER_ENCODE_WORKERS", min(8, os.cpu_count() or 1)))
+FRAME_WAIT_SEC = 1.0
+FILE_CHUNK_BYTES = 256 * 1024
+
+_encode_pool = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="encode")
+
+
+class ReaderSignal:
+    """Wakes every coroutine watching one SourceReader.
+
+    The reader thread schedules a single callback on the loop per frame or
+    state change, however many clients are waiting.
+    """
+
+    def __init__(self, reader: viewer.SourceReader, loop: asyncio.AbstractEventLoop):
+        self.reader = reader
+        self.users = 0
+        self._loop = loop
+        self._future = loop.create_future()
+        reader.add_listener(self._notify_threadsafe)
+
+    def _notify_threadsafe(self):
+        try:
+            self._loop.call_soon_threadsafe(self._fire)
+        except RuntimeError:
+            pass  # loop already closed during shutdown
+
+    def _fire(self):
+        if not self._future.done():
+            self._future.set_result(None)
+        self._future = self._loop.create_future()
+
+    async def wait(self, timeout: float):
+        try:
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def close(self):
+        self.reader.remove_listener(self._notify_threadsafe)
+
+
+_signals = {}
+
+def _subscribe(reader: viewer.SourceReader) -> ReaderSignal:
+    signal = _signals.get(reader)
+    if signal is None:
+        signal = _signals[reader] = ReaderSignal(reader, asyncio.get_running_loop())
+    signal.users += 1
+    return signal
+
+def _unsubscribe(signal: ReaderSignal):
+    signal.users -= 1
+    if signal.users <= 0:
+        signal.close()
+        _signals.pop(signal.reader, None)
+
+
+class QueryArgs(dict):
+    """First value per key plus ``getlist``: enough of Flask's request.args for the parsers."""
+
+    def __init__(self, scope):
+        super().__init__()
+        self._lists = {}
+        for key, value in parse_qsl(scope.get("query_string", b"").decode("latin-1"),
+                                    keep_blank_values=True):
+            self.setdefault(key, value)
+            self._lists.setdefault(key, []).append(value)
+
+    def getlist(self, key: str) -> list:
+        return list(self._lists.get(key, ()))
+
+
+async def _send_response(send, status: int, body: bytes, content_type: str, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()),
+                    (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _until_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _stream_until_disconnect(receive, stream, watcher=None):
+    """Run ``stream`` until it finishes or the client goes away.
+
+    ``watcher`` replaces the default disconnect watcher when the handler
+    also needs the client's messages.
+    """
+    streamer = asyncio.ensure_future(stream)
+    watcher = asyncio.ensure_future(watcher or _until_disconnect(receive))
+    done, pending = await asyncio.wait({streamer, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if streamer in done:
+        streamer.result()
+
+
+async def _mjpeg_stream(send, session: viewer.FeedSession, signal: ReaderSignal):
+    loop = asyncio.get_running_loop()
+    reader = session.reader
+    body = {"type": "http.response.body", "more_body": True}
+    if reader.state == "connecting":
+        # Load (and maybe re-encode) the cached frame off the event loop;
+        # status_chunk() then sends it straight away.
+        await loop.run_in_executor(_encode_pool, session.cached_jpeg)
+    while True:
+        chunk = session.status_chunk()
+        if chunk is not None:
+            await send({**body, "body": chunk})
+        if session.finished:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        delay = session.pace()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        seq, frame = reader.wait_frame(session.seq, timeout=0)
+        if seq == session.seq:
+            await signal.wait(FRAME_WAIT_SEC)
+            seq, frame = reader.wait_frame(session.seq, timeout=0)
+        if frame is None or seq == session.seq:
+            continue
+        chunk = await loop.run_in_executor(_encode_pool, session.frame_chunk, seq, frame)
+        if chunk is None:
+            continue
+        # send() waits on the transport's flow control, so this is the
+        # drain time the adaptive mode feeds on.
+        await send({**body, "body": chunk})
+        session.sent()
+
+
+async def _serve_feed(receive, send, reader: viewer.SourceReader,
+                      session: viewer.FeedSession, headers=()):
+    """Stream ``session`` to the client, then drop our reference to ``reader``."""
+    signal = _subscribe(reader)
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"multipart/x-mixed-replace; boundary=frame"), *headers],
+        })
+        await _stream_until_disconnect(receive, _mjpeg_stream(send, session, signal))
+    finally:
+        session.close()
+        _unsubscribe(signal)
+        viewer.capture_hub.release(reader)
+
+
+async def video_feed(scope, receive, send):
+    args = QueryArgs(scope)
+    src = args.get("src", viewer.DEFAULT_RTSP_URL)
+    try:
+        feed = viewer.parse_feed_args(args)
+    except ValueError as exc:
+        await _send_response(send, 400, f"Invalid parameter: {exc}\n".encode(), "text/plain")
+        return
+    src, feed["view"] = viewer.pick_source(src, feed["view"])
+    print(f"[info] /video_feed using: {src}")
+    client = (scope.get("client") or ("",))[0]
+    reader = viewer.capture_hub.acquire(src, feed["options"])
+    session = viewer.FeedSession(reader, client, feed["view"], feed["quality"],
+                                 feed["fps"], feed["adaptive"])
+    header = viewer.capture_options_header(feed["options"]).encode()
+    await _serve_feed(receive, send, reader, session, [(b"x-capture-options", header)])
+
+
+async def grid_feed(scope, receive, send):
+    try:
+        grid = viewer.parse_grid_args(QueryArgs(scope))
+    except ValueError as exc:
+        await _send_response(send, 400, f"Invalid parameter: {exc}\n".encode(), "text/plain")
+        return
+    print(f"[info] /grid_feed with {len(grid['sources'])} sources")
+    client = (scope.get("client") or ("",))[0]
+    reader = viewer.capture_hub.acquire_grid(grid["sources"], grid["layout"], grid["size"])
+    session = viewer.FeedSession(reader, client, viewer.FULL_FRAME, grid["quality"],
+                                 grid["fps"], grid["adaptive"])
+    await _serve_feed(receive, send, reader, session)
+
+
+async def _ws_receiver(receive, acks: asyncio.Queue):
+    """Queue the page's acks; return when the socket closes."""
+    while True:
+        message = await receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        if message["type"] == "websocket.receive":
+            acks.put_nowait(None)
+
+
+async def _ws_stream(send, session: viewer.FeedSession, signal: ReaderSignal, acks: asyncio.Queue):
+    loop = asyncio.get_running_loop()
+    reader = session.reader
+    if reader.state == "connecting":
+        jpg = await loop.run_in_executor(_encode_pool, session.cached_jpeg)
+        if jpg is not None:
+            await send({"type": "websocket.send", "bytes": jpg})
+            await acks.get()
+    while True:
+        status = session.status_update()
+        if status is not None:
+            await send({"type": "websocket.send", "text": json.dumps(status)})
+        if session.finished:
+            await send({"type": "websocket.close", "code": 1000})
+            return
+        delay = session.pace()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        seq, frame = reader.wait_frame(session.seq, timeout=0)
+        if seq == session.seq:
+            await signal.wait(FRAME_WAIT_SEC)
+            seq, frame = reader.wait_frame(session.seq, timeout=0)
+        jpg = await loop.run_in_executor(_encode_pool, session.frame_jpeg, seq, frame)
+        if jpg is None:
+            continue
+        await send({"type": "websocket.send", "bytes": jpg})
+        # One frame in flight: wait until the page has drawn it.
+        await acks.get()
+        session.sent()
+
+
+async def ws_feed(scope, receive, send):
+    """Binary JPEG per message; the next frame waits for the page's ack."""
+    if (await receive())["type"] != "websocket.connect":
+        return
+    args = QueryArgs(scope)
+    src = args.get("src", viewer.DEFAULT_RTSP_URL)
+    try:
+        feed = viewer.parse_feed_args(args)
+    except ValueError as exc:
+        await send({"type": "websocket.close", "code": 1008, "reason": f"Invalid parameter: {exc}"})
+        return
+    await send({"type": "websocket.accept"})
+    src, feed["view"] = viewer.pick_source(src, feed["view"])
+    print(f"[info] /ws_feed using: {src}")
+    reader = viewer.capture_hub.acquire(src, feed["options"])
+    session = viewer.FeedSession(reader, (scope.get("client") or ("",))[0], feed["view"],
+                                 feed["quality"], feed["fps"], feed["adaptive"])
+    signal = _subscribe(reader)
+    acks = asyncio.Queue()
+    try:
+        await _stream_until_disconnect(receive, _ws_stream(send, session, signal, acks),
+                                       _ws_receiver(receive, acks))
+    finally:
+        session.close()
+        _unsubscribe(signal)
+        viewer.capture_hub.release(reader)
+
+
+async def _mp4_stream(send, session: viewer.Mp4Session, signal: ReaderSignal):
+    body = {"type": "http.response.body", "more_body": True}
+    await send({**body, "body": session.init})
+    while not session.finished:
+        fragments = session.take(timeout=0)
+        if not fragments:
+            await signal.wait(FRAME_WAIT_SEC)
+            continue
+        await send({**body, "body": b"".join(fragments)})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def video_mp4(scope, receive, send):
+    args = QueryArgs(scope)
+    src = args.get("src", viewer.DEFAULT_RTSP_URL)
+    try:
+        options = viewer.capture_options_for(src, args)
+    except ValueError as exc:
+        await _send_response(send, 400, f"Invalid parameter: {exc}\n".encode(), "text/plain")
+        return
+    if shutil.which(viewer.FFMPEG_BIN) is None:
+        await _send_response(send, 501, f"{viewer.FFMPEG_BIN} not found; use /video_feed\n".encode(),
+                             "text/plain")
+        return
+    print(f"[info] /video_mp4 using: {src}")
+    reader = viewer.capture_hub.acquire_mp4(src, options)
+    try:
+        ready = await asyncio.get_running_loop().run_in_executor(
+            None, reader.wait_init, viewer.MP4_INIT_WAIT_SEC)
+        if not ready:
+            await _send_response(send, 503, b"Source not available\n", "text/plain",
+                                 [(b"retry-after", b"5")])
+            return
+        session = viewer.Mp4Session(reader, (scope.get("client") or ("",))[0])
+        signal = _subscribe(reader)
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", viewer.mp4_content_type(reader).encode()),
+                            (b"cache-control", b"no-cache")],
+            })
+            await _stream_until_disconnect(receive, _mp4_stream(send, session, signal))
+        finally:
+            session.close()
+            _unsubscribe(signal)
+    finally:
+        viewer.capture_hub.release(reader)
+
+
+async def snapshot_jpg(scope, receive, send):
+    headers = dict(scope.get("headers") or ())
+    try:
+        # Blocks while a cold source opens, so keep it off the loop and out
+        # of the encode pool.
+        status, body, extra = await asyncio.get_running_loop().run_in_executor(
+            None, viewer.snapshot, QueryArgs(scope),
+            headers.get(b"if-none-match", b"").decode("latin-1"),
+            headers.get(b"if-modified-since", b"").decode("latin-1"))
+    except ValueError as exc:
+        await _send_response(send, 400, f"Invalid parameter: {exc}\n".encode(), "text/plain")
+        return
+    content_type = extra.pop("Content-Type", "application/octet-stream")
+    await _send_response(send, status, body, content_type,
+                         [(k.lower().encode(), v.encode()) for k, v in extra.items()])
+
+
+async def _replay_stream(send, ring: viewer.FrameRing, plan: list):
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    body = {"type": "http.response.body", "more_body": True}
+    for offset, number in plan:
+        delay = started + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        chunk = ring.chunk(number)
+        if chunk is not None:
+            await send({**body, "body": chunk})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def replay(scope, receive, send):
+    args = QueryArgs(scope)
+    try:
+        seconds, speed = viewer.parse_replay_args(args)
+    except ValueError as exc:
+        await _send_response(send, 400, f"Invalid parameter: {exc}\n".encode(), "text/plain")
+        return
+    ring = viewer.capture_hub.replay(args.get("src", viewer.DEFAULT_RTSP_URL))
+    plan = viewer.replay_plan(ring, seconds, speed) if ring is not None else []
+    if not plan:
+        await _send_response(send, 404, b"Nothing recorded for this source\n", "text/plain")
+        return
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"multipart/x-mixed-replace; boundary=frame")],
+    })
+    await _stream_until_disconnect(receive, _replay_stream(send, ring, plan))
+
+
+async def replay_info(scope, receive, send):
+    ring = viewer.capture_hub.replay(QueryArgs(scope).get("src", viewer.DEFAULT_RTSP_URL))
+    info = ring.info() if ring is not None else {"frames": 0, "seconds": 0.0}
+    body = json.dumps({"max_seconds": viewer.REPLAY_SECONDS, **info}).encode()
+    await _send_response(send, 200, body, "application/json")
+
+
+async def recordings(scope, receive, send):
+    try:
+        status, payload = viewer.recordings_response(scope["method"], QueryArgs(scope))
+    except ValueError as exc:
+        status, payload = 400, {"error": f"Invalid parameter: {exc}"}
+    await _send_response(send, status, json.dumps(payload).encode(), "application/json")
+
+
+async def _read_body(receive, limit: int) -> bytes:
+    """Request body, truncated just past ``limit`` so callers can reject it."""
+    body = b""
+    while len(body) <= limit:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    return body
+
+
+async def overlay(scope, receive, send):
+    src = QueryArgs(scope).get("src", viewer.DEFAULT_RTSP_URL)
+    body = await _read_body(receive, viewer.OVERLAY_MAX_BYTES) if scope["method"] == "POST" else b""
+    try:
+        status, payload = viewer.overlay_response(scope["method"], src, body)
+    except (TypeError, ValueError) as exc:
+        status, payload = 400, {"error": f"Invalid parameter: {exc}"}
+    await _send_response(send, status, json.dumps(payload).encode(), "application/json")
+
+
+async def sources(scope, receive, send):
+    body = await _read_body(receive, viewer.OVERLAY_MAX_BYTES) if scope["method"] == "POST" else b""
+    try:
+        status, payload = viewer.sources_response(scope["method"], QueryArgs(scope), body)
+    except (TypeError, ValueError) as exc:
+        status, payload = 400, {"error": f"Invalid parameter: {exc}"}
+    await _send_response(send, status, json.dumps(payload).encode(), "application/json")
+
+
+async def recording_segment(scope, receive, send):
+    parts = scope["path"].split("/")
+    path = viewer.recording_file(parts[2], parts[3]) if len(parts) == 4 else None
+    if path is None:
+        await _send_response(send, 404, b"Not found\n", "text/plain")
+        return
+    loop = asyncio.get_running_loop()
+    with open(path, "rb") as fh:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"video/mp4"),
+                        (b"content-length", str(os.fstat(fh.fileno()).st_size).encode())],
+        })
+        while True:
+            chunk = await loop.run_in_executor(None, fh.read, FILE_CHUNK_BYTES)
+            await send({"type": "http.response.body", "body": chunk, "more_body": bool(chunk)})
+            if not chunk:
+                return
+
+
+async def _status_events(send, src: str):
+    version, last = -1, None
+    while True:
+        reader = viewer.capture_hub.find(src)
+        if reader is None:
+            version, status = -1, {"state": "idle"}
+            await asyncio.sleep(viewer.PLACEHOLDER_INTERVAL_SEC)
+        else:
+            signal = _subscribe(reader)
+            try:
+                version, status = reader.wait_status(version, timeout=0)
+                if status == last:
+                    await signal.wait(15.0)
+                    version, status = reader.wait_status(version, timeout=0)
+            finally:
+                _unsubscribe(signal)
+        if status != last:
+            last = status
+            event = f"data: {json.dumps(status)}\n\n"
+        else:
+            event = ": keepalive\n\n"
+        await send({"type": "http.response.body", "body": event.encode(), "more_body": True})
+
+
+async def status_stream(scope, receive, send):
+    src = QueryArgs(scope).get("src", viewer.DEFAULT_RTSP_URL)
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+    })
+    await _stream_until_disconnect(receive, _status_events(send, src))
+
+
+async def _send_asset(send, scope, respond):
+    """Send ``respond(accept_encoding, if_none_match)`` (an assets response)."""
+    headers = dict(scope.get("headers") or ())
+    status, body, extra = respond(headers.get(b"accept-encoding", b"").decode("latin-1"),
+                                  headers.get(b"if-none-match", b"").decode("latin-1"))
+    content_type = extra.pop("Content-Type", "application/octet-stream")
+    await _send_response(send, status, body, content_type,
+                         [(k.lower().encode(), v.encode()) for k, v in extra.items()])
+
+
+async def index(scope, receive, send):
+    await _send_asset(send, scope, viewer.PAGE.response)
+
+
+async def static_file(scope, receive, send):
+    name = scope["path"][len("/static/"):]
+    await _send_asset(send, scope, lambda *a: viewer.STATIC_ASSETS.response(name, *a))
+
+
+async def stats(scope, receive, send):
+    body = json.dumps({"encoder": viewer.JPEG_ENCODER.describe(), "sources": viewer.capture_hub.stats()}).encode()
+    await _send_response(send, 200, body, "application/json")
+
+
+async def metrics_endpoint(scope, receive, send):
+    await _send_response(send, 200, metrics.REGISTRY.render().encode(), metrics.CONTENT_TYPE)
+
+
+ROUTES = {
+    "/": index,
+    "/video_feed": video_feed,
+    "/grid_feed": grid_feed,
+    "/video_mp4": video_mp4,
+    "/snapshot.jpg": snapshot_jpg,
+    "/replay": replay,
+    "/replay_info": replay_info,
+    "/recordings": recordings,
+    "/overlay": overlay,
+    "/sources": sources,
+    "/status_stream": status_stream,
+    "/stats": stats,
+    "/metrics": metrics_endpoint,
+}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                viewer.start_configured_recordings()
+                viewer.cameras.start_warm()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                _encode_pool.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] == "websocket":
+        if scope["path"] == "/ws_feed":
+            await ws_feed(scope, receive, send)
+        else:
+            await send({"type": "websocket.close", "code": 1008})
+        return
+    if scope["type"] != "http":
+        return
+    handler = ROUTES.get(scope["path"])
+    if handler is None and scope["path"].startswith("/recordings/"):
+        handler = recording_segment
+    if handler is None and scope["path"].startswith("/static/"):
+        handler = static_file
+    if handler is None:
+        await _send_response(send, 404, b"Not found\n", "text/plain")
+        return
+    await handler(scope, receive, send)
+
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("ASGI mode needs an ASGI server: pip install uvicorn")
+    print("Starting ASGI server at http://127.0.0.1:5000/")
+    print(f"Default RTSP source: {viewer.DEFAULT_RTSP_URL}")
+    uvicorn.run(app, host="127.0.0.1", port=5000, log_level="warning")
@@ -0,0 +1,1106 @@
+const $ = sel => document.querySelector(sel);
+const $bg = $('#bg'), $fg = $('#fg'), $text = $('#text'), $pos = $('#pos');
+const $overlay = $('#overlay'), $inner = $('#overlayInner');
+const $stage = $('#stage');
+const $expand = $('#expandToggle');
+const $rtspPanel = $('#rtspPanel');
+const $menuToggle = $('#menuToggle');
+const $menuHint = $('#menuHint');
+const $brandEmoji = $('#brandEmoji');
+const $brandSuffixEl = $('#brandSuffix');
+const $brandName = $('#brandName');
+const $headerSuffix = $('#headerSuffix');
+const $showEmoji = $('#showEmoji');
+const $stickerUpload = $('#stickerUpload');
+const $stickerLayer = $('#stickerLayer');
+const $clearStickers = $('#clearStickers');
+const $u = $('#u'), $p = $('#p'), $ip = $('#ip'), $port = $('#port'), $path = $('#path');
+const $camera = $('#camera'), $cameraName = $('#cameraName'), $cameraWarm = $('#cameraWarm');
+const $cameraSubPath = $('#cameraSubPath'), $cameraSubSize = $('#cameraSubSize');
+const $quality = $('#quality'), $fps = $('#fps'), $playback = $('#playback');
+const $playbackHint = $('#playbackHint');
+const $gridSources = $('#gridSources'), $gridLayout = $('#gridLayout');
+const $replayBack = $('#replayBack'), $replayBackLabel = $('#replayBackLabel');
+const $replaySpeed = $('#replaySpeed'), $replayHint = $('#replayHint');
+const $feed = $('#feed');
+const $video = $('#feedVideo');
+const $canvas = $('#feedCanvas');
+const $streamStatus = $('#streamStatus');
+const $frame = $('#streamFrame');
+const $frameHandle = $('#frameHandle');
+const $frameResizer = $('#frameResizer');
+const $main = document.querySelector('main');
+const root = document.documentElement;
+
+const DEFAULTS = { bg: '#101418', fg: '#ffffff', posX: 50, posY: 50 };
+const BRANDING_DEFAULTS = { suffix: '', showEmoji: true };
+const BRANDING_KEY = 'rtsp_viewer_branding';
+const HINT_KEY = 'rtsp_viewer_hint_dismissed';
+const STICKER_KEY = 'rtsp_viewer_stickers';
+const overlayArea = $main || document.body;
+let brandingState = { ...BRANDING_DEFAULTS };
+let hintDismissed = false;
+let stickers = [];
+
+try {
+  hintDismissed = localStorage.getItem(HINT_KEY) === '1';
+} catch (_) {}
+if ($menuHint && hintDismissed) {
+  $menuHint.classList.add('is-hidden');
+}
+
+const presetPositions = {
+  'center': { x: 50, y: 50 },
+  'top-left': { x: 12, y: 12 },
+  'top-right': { x: 88, y: 12 },
+  'bottom-left': { x: 12, y: 88 },
+  'bottom-right': { x: 88, y: 88 }
+};
+
+let overlayPos = { x: DEFAULTS.posX, y: DEFAULTS.posY };
+
+const applyOverlayPosition = () => {
+  root.style.setProperty('--overlay-x', `${overlayPos.x}%`);
+  root.style.setProperty('--overlay-y', `${overlayPos.y}%`);
+};
+
+const setOverlayFromPreset = value => {
+  if (presetPositions[value]) {
+    overlayPos = { ...presetPositions[value] };
+    applyOverlayPosition();
+  }
+};
+
+const clamp = (value, min, max) => Math.min(Math.max(value, min), max);
+
+const updateOverlayFromPointer = (clientX, clientY) => {
+  if (!overlayArea) return;
+  const rect = overlayArea.getBoundingClientRect();
+  if (!rect.width || !rect.height) return;
+  const x = ((clientX - rect.left) / rect.width) * 100;
+  const y = ((clientY - rect.top) / rect.height) * 100;
+  overlayPos = {
+    x: clamp(x, 1, 99),
+    y: clamp(y, 1, 99)
+  };
+  applyOverlayPosition();
+  if ($pos.value !== 'custom') {
+    $pos.value = 'custom';
+  }
+};
+
+if ($overlay) {
+  let dragging = false;
+  $overlay.addEventListener('pointerdown', event => {
+    dragging = true;
+    try { $overlay.setPointerCapture(event.pointerId); } catch (_) {}
+    $overlay.dataset.dragging = 'true';
+    updateOverlayFromPointer(event.clientX, event.clientY);
+    event.preventDefault();
+  });
+  const endDrag = event => {
+    if (!dragging) return;
+    dragging = false;
+    try { $overlay.releasePointerCapture(event.pointerId); } catch (_) {}
+    delete $overlay.dataset.dragging;
+  };
+  $overlay.addEventListener('pointermove', event => {
+    if (!dragging) return;
+    updateOverlayFromPointer(event.clientX, event.clientY);
+  });
+  $overlay.addEventListener('pointerup', endDrag);
+  $overlay.addEventListener('pointercancel', endDrag);
+}
+
+// ---- Branding ----
+const applyBranding = () => {
+  const suffix = (brandingState.suffix || '').trim();
+  if ($brandSuffixEl) {
+    $brandSuffixEl.textContent = suffix;
+    $brandSuffixEl.dataset.prefix = suffix ? ' ' : '';
+  }
+  if ($headerSuffix && $headerSuffix.value !== brandingState.suffix) {
+    $headerSuffix.value = brandingState.suffix;
+  }
+  if ($showEmoji) {
+    $showEmoji.checked = Boolean(brandingState.showEmoji);
+  }
+  if ($brandEmoji) {
+    $brandEmoji.style.display = brandingState.showEmoji ? '' : 'none';
+  }
+  if ($menuToggle) {
+    const ariaLabel = suffix ? `Toggle setup panel for Lettuce Stream ${suffix}` : 'Toggle setup panel for Lettuce Stream';
+    $menuToggle.setAttribute('aria-label', ariaLabel);
+  }
+  if (suffix) {
+    document.title = `Lettuce Stream ${suffix}`;
+  } else {
+    document.title = 'Lettuce Stream';
+  }
+};
+
+const saveBranding = () => {
+  try {
+    localStorage.setItem(BRANDING_KEY, JSON.stringify(brandingState));
+  } catch (_) {}
+};
+
+const loadBranding = () => {
+  brandingState = { ...BRANDING_DEFAULTS };
+  try {
+    const stored = JSON.parse(localStorage.getItem(BRANDING_KEY) || '{}');
+    if (typeof stored.suffix === 'string') brandingState.suffix = stored.suffix;
+    if (typeof stored.showEmoji === 'boolean') brandingState.showEmoji = stored.showEmoji;
+  } catch (_) {}
+  applyBranding();
+};
+
+if ($headerSuffix) {
+  $headerSuffix.addEventListener('input', event => {
+    brandingState.suffix = event.target.value;
+    applyBranding();
+    saveBranding();
+  });
+}
+if ($showEmoji) {
+  $showEmoji.addEventListener('change', event => {
+    brandingState.showEmoji = event.target.checked;
+    applyBranding();
+    saveBranding();
+  });
+}
+
+// ---- Server-side burn-in ----
+// The server draws the text and stickers into the frames themselves, so
+// snapshots, replay and every other viewer of the source see them too.
+const BURN_IN_KEY = 'rtsp_viewer_burn_in';
+const $burnIn = $('#burnIn');
+let burnTimer = null;
+// Passthrough sends the camera's own stream, which has nothing burned in.
+const burnInActive = () => Boolean($burnIn && $burnIn.checked);
+const overlayUrl = () => {
+  const params = new URLSearchParams();
+  if (feedSource) params.set('src', feedSource);
+  return `/overlay?${params.toString()}`;
+};
+const syncBurnIn = () => {
+  clearTimeout(burnTimer);
+  if (!$burnIn || !$burnIn.checked) return;
+  const rect = overlayArea ? overlayArea.getBoundingClientRect() : null;
+  const areaWidth = rect && rect.width ? rect.width : 1000;
+  const body = {
+    text: $text.value,
+    color: $fg.value,
+    x: overlayPos.x,
+    y: overlayPos.y,
+    stickers: stickers.map(s => ({
+      image: s.src,
+      x: s.x,
+      y: s.y,
+      width: Math.min(1, (s.width || 200) / areaWidth)
+    }))
+  };
+  fetch(overlayUrl(), {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  }).catch(() => {});
+};
+const scheduleBurnIn = () => {
+  clearTimeout(burnTimer);
+  burnTimer = setTimeout(syncBurnIn, 400);
+};
+const setBurnIn = enabled => {
+  document.body.classList.toggle('burn-in', enabled);
+  try { localStorage.setItem(BURN_IN_KEY, enabled ? '1' : ''); } catch (_) {}
+  if (enabled) {
+    syncBurnIn();
+  } else {
+    fetch(overlayUrl(), { method: 'DELETE' }).catch(() => {});
+  }
+  updateFeed();
+};
+if ($burnIn) {
+  try { $burnIn.checked = localStorage.getItem(BURN_IN_KEY) === '1'; } catch (_) {}
+  document.body.classList.toggle('burn-in', $burnIn.checked);
+  $burnIn.addEventListener('change', () => setBurnIn($burnIn.checked));
+}
+
+// ---- Sticker helpers ----
+const positionStickerEl = (el, sticker) => {
+  if (!el || !sticker) return;
+  el.style.left = `${sticker.x}%`;
+  el.style.top = `${sticker.y}%`;
+  if (sticker.width) {
+    el.style.width = `${sticker.width}px`;
+  }
+};
+
+const saveStickers = () => {
+  try {
+    localStorage.setItem(STICKER_KEY, JSON.stringify(stickers));
+  } catch (_) {}
+  scheduleBurnIn();
+};
+
+const removeSticker = id => {
+  stickers = stickers.filter(item => item.id !== id);
+  if ($stickerLayer) {
+    const existing = $stickerLayer.querySelector(`.sticker[data-id="${id}"]`);
+    if (existing) existing.remove();
+  }
+  saveStickers();
+};
+
+const updateStickerPosition = (clientX, clientY, sticker, el) => {
+  if (!overlayArea) return;
+  const rect = overlayArea.getBoundingClientRect();
+  if (!rect.width || !rect.height) return;
+  const x = clamp(((clientX - rect.left) / rect.width) * 100, 1, 99);
+  const y = clamp(((clientY - rect.top) / rect.height) * 100, 1, 99);
+  sticker.x = x;
+  sticker.y = y;
+  positionStickerEl(el, sticker);
+  saveStickers();
+};
+
+const attachStickerDrag = (el, sticker) => {
+  if (!el) return;
+  let dragging = false;
+  el.addEventListener('pointerdown', event => {
+    const target = event.target;
+    if (target && target.classList && target.classList.contains('sticker-remove')) {
+      return;
+    }
+    dragging = true;
+    try { el.setPointerCapture(event.pointerId); } catch (_) {}
+    event.preventDefault();
+  });
+  const stopDrag = event => {
+    if (!dragging) return;
+    dragging = false;
+    try { el.releasePointerCapture(event.pointerId); } catch (_) {}
+  };
+  el.addEventListener('pointermove', event => {
+    if (!dragging) return;
+    updateStickerPosition(event.clientX, event.clientY, sticker, el);
+  });
+  el.addEventListener('pointerup', stopDrag);
+  el.addEventListener('pointercancel', stopDrag);
+};
+
+const stickerBaseWidth = () => {
+  if (!overlayArea) return 200;
+  const rect = overlayArea.getBoundingClientRect();
+  if (!rect.width) return 200;
+  return Math.max(120, Math.min(rect.width * 0.22, 280));
+};
+
+const createStickerElement = sticker => {
+  if (!$stickerLayer) return null;
+  const el = document.createElement('div');
+  el.className = 'sticker';
+  el.dataset.id = sticker.id;
+  const img = document.createElement('img');
+  img.src = sticker.src;
+  img.alt = 'Custom sticker';
+  const remove = document.createElement('button');
+  remove.type = 'button';
+  remove.className = 'sticker-remove';
+  remove.textContent = '×';
+  remove.addEventListener('click', event => {
+    event.stopPropagation();
+    removeSticker(sticker.id);
+  });
+  el.appendChild(img);
+  el.appendChild(remove);
+  sticker.width = sticker.width || Math.round(stickerBaseWidth());
+  positionStickerEl(el, sticker);
+  attachStickerDrag(el, sticker);
+  $stickerLayer.appendChild(el);
+  return el;
+};
+
+const renderStickers = () => {
+  if (!$stickerLayer) return;
+  $stickerLayer.innerHTML = '';
+  stickers.forEach(sticker => createStickerElement(sticker));
+};
+
+const addSticker = src => {
+  if (!src) return;
+  const sticker = {
+    id: `s_${Date.now()}_${Math.floor(Math.random() * 1000)}`,
+    src,
+    x: 50,
+    y: 50,
+    width: Math.round(stickerBaseWidth())
+  };
+  stickers.push(sticker);
+  createStickerElement(sticker);
+  saveStickers();
+};
+
+const loadStickers = () => {
+  stickers = [];
+  try {
+    const stored = JSON.parse(localStorage.getItem(STICKER_KEY) || '[]');
+    if (Array.isArray(stored)) {
+      stickers = stored.filter(item => item && typeof item.src === 'string').map(item => ({
+        id: item.id || `s_${Date.now()}_${Math.floor(Math.random() * 1000)}`,
+        src: item.src,
+        x: typeof item.x === 'number' ? item.x : 50,
+        y: typeof item.y === 'number' ? item.y : 50,
+        width: typeof item.width === 'number' ? item.width : Math.round(stickerBaseWidth())
+      }));
+    }
+  } catch (_) {}
+  renderStickers();
+};
+
+if ($stickerUpload) {
+  $stickerUpload.addEventListener('change', event => {
+    const input = event.target;
+    if (!input || !input.files || !input.files[0]) return;
+    const file = input.files[0];
+    const reader = new FileReader();
+    reader.addEventListener('load', () => {
+      if (typeof reader.result === 'string') {
+        addSticker(reader.result);
+      }
+      $stickerUpload.value = '';
+    });
+    reader.readAsDataURL(file);
+  });
+}
+
+if ($clearStickers) {
+  $clearStickers.addEventListener('click', () => {
+    stickers = [];
+    if ($stickerLayer) {
+      $stickerLayer.innerHTML = '';
+    }
+    saveStickers();
+  });
+}
+
+// ---- Frame layout helpers ----
+let frameTouched = false;
+
+function clampFrameWithinMain() {
+  if (!$frame || !$main) return;
+  const mainRect = $main.getBoundingClientRect();
+  const frameRect = $frame.getBoundingClientRect();
+  if (!mainRect.width || !mainRect.height) return;
+  let left = frameRect.left;
+  let top = frameRect.top;
+  let width = frameRect.width;
+  let height = frameRect.height;
+  const minWidth = 240;
+  const minHeight = 160;
+  if (width < minWidth) width = minWidth;
+  if (height < minHeight) height = minHeight;
+  left = Math.max(mainRect.left + 12, Math.min(left, mainRect.right - width - 12));
+  top = Math.max(mainRect.top + 12, Math.min(top, mainRect.bottom - height - 12));
+  $frame.style.width = `${width}px`;
+  $frame.style.height = `${height}px`;
+  $frame.style.left = `${left - mainRect.left}px`;
+  $frame.style.top = `${top - mainRect.top}px`;
+}
+
+function positionFrameInitially() {
+  if (!$frame || !$main) return;
+  const mainRect = $main.getBoundingClientRect();
+  if (!mainRect.width || !mainRect.height) return;
+  const collapsed = document.body.classList.contains('panel-collapsed');
+  const factor = collapsed ? 0.9 : 0.75;
+  const maxWidth = collapsed ? 1400 : 1100;
+  const maxHeightBase = collapsed ? 0.82 : 0.7;
+  const baseWidth = Math.min(mainRect.width * factor, maxWidth);
+  const baseHeight = Math.min(mainRect.height * maxHeightBase, collapsed ? 720 : 660);
+  const finalWidth = Math.max(baseWidth, 320);
+  const finalHeight = Math.max(baseHeight, 200);
+  $frame.style.width = `${finalWidth}px`;
+  $frame.style.height = `${finalHeight}px`;
+  $frame.style.left = `${Math.max(12, (mainRect.width - finalWidth) / 2)}px`;
+  $frame.style.top = `${Math.max(24, (mainRect.height - finalHeight) / 2)}px`;
+  frameTouched = false;
+}
+
+// ---- Style state ----
+const loadStyle = () => {
+  overlayPos = { x: DEFAULTS.posX, y: DEFAULTS.posY };
+  $bg.value = DEFAULTS.bg;
+  $fg.value = DEFAULTS.fg;
+  $text.value = '';
+  $pos.value = 'center';
+  try {
+    const s = JSON.parse(localStorage.getItem('rtsp_viewer_style') || '{}');
+    if (s.bg) $bg.value = s.bg;
+    if (s.fg) $fg.value = s.fg;
+    if ('text' in s) $text.value = s.text || '';
+    if (s.pos === 'custom' && typeof s.posX === 'number' && typeof s.posY === 'number') {
+      overlayPos = { x: s.posX, y: s.posY };
+      $pos.value = 'custom';
+    } else if (s.pos && presetPositions[s.pos]) {
+      $pos.value = s.pos;
+      overlayPos = { ...presetPositions[s.pos] };
+    }
+    if (typeof s.posX === 'number' && typeof s.posY === 'number' && $pos.value === 'custom') {
+      overlayPos = { x: s.posX, y: s.posY };
+    }
+  } catch (_) {}
+  document.body.style.setProperty('--bg', $bg.value);
+  document.body.style.setProperty('--text', $fg.value);
+  $inner.textContent = $text.value;
+  applyOverlayPosition();
+};
+const saveStyle = () => {
+  const s = {
+    bg: $bg.value,
+    fg: $fg.value,
+    text: $text.value,
+    pos: $pos.value,
+    posX: overlayPos.x,
+    posY: overlayPos.y
+  };
+  localStorage.setItem('rtsp_viewer_style', JSON.stringify(s));
+  loadStyle();
+  syncBurnIn();
+};
+const clearStyle = () => {
+  localStorage.removeItem('rtsp_viewer_style');
+  overlayPos = { x: DEFAULTS.posX, y: DEFAULTS.posY };
+  $bg.value = DEFAULTS.bg;
+  $fg.value = DEFAULTS.fg;
+  $text.value = '';
+  $pos.value = 'center';
+  document.body.style.setProperty('--bg', DEFAULTS.bg);
+  document.body.style.setProperty('--text', DEFAULTS.fg);
+  $inner.textContent = '';
+  applyOverlayPosition();
+};
+
+// live preview
+$bg.addEventListener('input', () => document.body.style.setProperty('--bg', $bg.value));
+$fg.addEventListener('input', () => document.body.style.setProperty('--text', $fg.value));
+$text.addEventListener('input', () => $inner.textContent = $text.value);
+$pos.addEventListener('change', () => {
+  if ($pos.value === 'custom') return;
+  setOverlayFromPreset($pos.value);
+});
+$('#saveStyle').addEventListener('click', () => {
+  saveStyle();
+  setPanelCollapsed(true);
+});
+$('#clearStyle').addEventListener('click', clearStyle);
+
+// ---- Fullscreen control ----
+const updateFullscreenState = () => {
+  if (!$stage || !$expand) return;
+  const fullscreenEl = document.fullscreenElement || document.webkitFullscreenElement;
+  const isFullscreen = fullscreenEl === $stage;
+  $stage.classList.toggle('fullscreen-active', isFullscreen);
+  if ($frame) {
+    $frame.classList.toggle('fullscreen-mode', isFullscreen);
+  }
+  $expand.textContent = isFullscreen ? '⤡' : '⤢';
+  $expand.setAttribute('aria-label', isFullscreen ? 'Exit fullscreen' : 'Enter fullscreen');
+  scheduleFeedResize();
+};
+const toggleFullscreen = () => {
+  if (!$stage) return;
+  const fullscreenEl = document.fullscreenElement || document.webkitFullscreenElement;
+  if (fullscreenEl === $stage) {
+    if (document.exitFullscreen) {
+      document.exitFullscreen();
+    } else if (document.webkitExitFullscreen) {
+      document.webkitExitFullscreen();
+    }
+  } else {
+    if ($stage.requestFullscreen) {
+      $stage.requestFullscreen();
+    } else if ($stage.webkitRequestFullscreen) {
+      $stage.webkitRequestFullscreen();
+    }
+  }
+};
+if ($expand) {
+  $expand.addEventListener('click', toggleFullscreen);
+}
+document.addEventListener('fullscreenchange', updateFullscreenState);
+document.addEventListener('webkitfullscreenchange', updateFullscreenState);
+
+// ---- Panel visibility ----
+const setPanelCollapsed = (collapsed, options = {}) => {
+  const { fromUser = false } = options;
+  if (!$rtspPanel) return;
+  $rtspPanel.classList.toggle('collapsed', collapsed);
+  document.body.classList.toggle('panel-collapsed', collapsed);
+  if ($menuToggle) {
+    $menuToggle.setAttribute('aria-expanded', String(!collapsed));
+  }
+  if ($menuHint) {
+    if (collapsed && fromUser && !hintDismissed) {
+      hintDismissed = true;
+      $menuHint.classList.add('is-hidden');
+      try { localStorage.setItem(HINT_KEY, '1'); } catch (_) {}
+    } else if (!hintDismissed) {
+      $menuHint.classList.remove('is-hidden');
+    }
+  }
+  if ($frame && $main && !frameTouched) {
+    const mainRect = $main.getBoundingClientRect();
+    const ratio = $frame.offsetHeight / Math.max($frame.offsetWidth, 1);
+    const targetFactor = collapsed ? 0.9 : 0.75;
+    const maxWidth = collapsed ? 1400 : 1100;
+    let width = Math.max(320, Math.min(mainRect.width * targetFactor, maxWidth));
+    let height = Math.max(200, width * (ratio || 0.5625));
+    const maxHeight = Math.max(240, mainRect.height - 48);
+    if (height > maxHeight) {
+      height = maxHeight;
+      width = Math.max(320, height / (ratio || 0.5625));
+    }
+    $frame.style.width = `${width}px`;
+    $frame.style.height = `${height}px`;
+    $frame.style.left = `${Math.max(12, (mainRect.width - width) / 2)}px`;
+    $frame.style.top = `${Math.max(24, (mainRect.height - height) / 2)}px`;
+  }
+  setTimeout(() => {
+    clampFrameWithinMain();
+    scheduleFeedResize();
+  }, 50);
+};
+
+if ($menuToggle) {
+  $menuToggle.addEventListener('click', () => {
+    const collapsed = document.body.classList.contains('panel-collapsed');
+    setPanelCollapsed(!collapsed, { fromUser: true });
+    if (!document.body.classList.contains('panel-collapsed') && $u && typeof $u.focus === 'function') {
+      setTimeout(() => {
+        try {
+          $u.focus({ preventScroll: true });
+        } catch (_) {
+          $u.focus();
+        }
+      }, 120);
+    }
+  });
+}
+
+// ---- Frame dragging ----
+if ($frameHandle && $frame) {
+  let draggingFrame = false;
+  let startX = 0, startY = 0, frameStartLeft = 0, frameStartTop = 0;
+  $frameHandle.addEventListener('pointerdown', event => {
+    if (!$main) return;
+    draggingFrame = true;
+    startX = event.clientX;
+    startY = event.clientY;
+    const rect = $frame.getBoundingClientRect();
+    const mainRect = $main.getBoundingClientRect();
+    frameStartLeft = rect.left - mainRect.left;
+    frameStartTop = rect.top - mainRect.top;
+    try { $frameHandle.setPointerCapture(event.pointerId); } catch (_) {}
+    event.preventDefault();
+  });
+  const stopDragging = event => {
+    if (!draggingFrame) return;
+    draggingFrame = false;
+    try { $frameHandle.releasePointerCapture(event.pointerId); } catch (_) {}
+    clampFrameWithinMain();
+  };
+  $frameHandle.addEventListener('pointermove', event => {
+    if (!draggingFrame) return;
+    const deltaX = event.clientX - startX;
+    const deltaY = event.clientY - startY;
+    $frame.style.left = `${frameStartLeft + deltaX}px`;
+    $frame.style.top = `${frameStartTop + deltaY}px`;
+    frameTouched = true;
+  });
+  $frameHandle.addEventListener('pointerup', stopDragging);
+  $frameHandle.addEventListener('pointercancel', stopDragging);
+}
+
+if ($frameResizer && $frame) {
+  let resizing = false;
+  let startX = 0, startY = 0, startWidth = 0, startHeight = 0;
+  $frameResizer.addEventListener('pointerdown', event => {
+    resizing = true;
+    startX = event.clientX;
+    startY = event.clientY;
+    const rect = $frame.getBoundingClientRect();
+    startWidth = rect.width;
+    startHeight = rect.height;
+    try { $frameResizer.setPointerCapture(event.pointerId); } catch (_) {}
+    event.preventDefault();
+  });
+  const stopResizing = event => {
+    if (!resizing) return;
+    resizing = false;
+    try { $frameResizer.releasePointerCapture(event.pointerId); } catch (_) {}
+    clampFrameWithinMain();
+    scheduleFeedResize();
+  };
+  $frameResizer.addEventListener('pointermove', event => {
+    if (!resizing) return;
+    const deltaX = event.clientX - startX;
+    const deltaY = event.clientY - startY;
+    const minWidth = 240;
+    const minHeight = 160;
+    const newWidth = Math.max(minWidth, startWidth + deltaX);
+    const newHeight = Math.max(minHeight, startHeight + deltaY);
+    $frame.style.width = `${newWidth}px`;
+    $frame.style.height = `${newHeight}px`;
+    frameTouched = true;
+  });
+  $frameResizer.addEventListener('pointerup', stopResizing);
+  $frameResizer.addEventListener('pointercancel', stopResizing);
+}
+
+window.addEventListener('resize', () => {
+  clampFrameWithinMain();
+  scheduleFeedResize();
+});
+
+// ---- Feed sizing ----
+// Ask the server for frames no larger than the stage actually shows.
+// Sizes are bucketed like the server does so small drags don't reconnect.
+const FEED_SIZE_STEP = 32;
+let feedSource = null;
+let feedRate = { quality: 'auto', fps: '0' };
+let feedGrid = null;
+let feedMode = 'mjpeg';
+let feedReplay = null;
+let feedSizeKey = '';
+let feedResizeTimer = null;
+const feedBucket = v => Math.ceil(v / FEED_SIZE_STEP) * FEED_SIZE_STEP;
+const feedSize = () => {
+  if (!$stage) return null;
+  const rect = $stage.getBoundingClientRect();
+  if (!rect.width || !rect.height) return null;
+  const dpr = window.devicePixelRatio || 1;
+  return { w: feedBucket(rect.width * dpr), h: feedBucket(rect.height * dpr) };
+};
+const updateFeed = () => {
+  if (feedReplay) {
+    const params = new URLSearchParams();
+    if (feedSource) params.set('src', feedSource);
+    params.set('seconds', feedReplay.seconds);
+    params.set('speed', feedReplay.speed);
+    const key = `replay:${feedReplay.started}:${params}`;
+    if (key === feedSizeKey) return;
+    feedSizeKey = key;
+    stopSocket();
+    stopMse();
+    $feed.src = `/replay?${params}`;
+    return;
+  }
+  if (!feedGrid && feedMode === 'mp4' && !burnInActive() && !mseFailed && window.MediaSource) {
+    const params = new URLSearchParams();
+    if (feedSource) params.set('src', feedSource);
+    // Passthrough ignores size and rate, so resizing doesn't reconnect.
+    const key = `mp4:${params}`;
+    if (key === feedSizeKey) return;
+    feedSizeKey = key;
+    stopSocket();
+    startMse(params);
+    return;
+  }
+  stopMse();
+  const size = feedSize();
+  const useSocket = !feedGrid && feedMode === 'ws' && !wsFailed && window.WebSocket;
+  const params = new URLSearchParams();
+  if (feedGrid) {
+    feedGrid.sources.forEach(src => params.append('src', src));
+    params.set('layout', feedGrid.layout);
+  } else if (feedSource) {
+    params.set('src', feedSource);
+  }
+  if (feedRate.quality === 'auto') {
+    params.set('adaptive', '1');
+  } else if (feedRate.quality) {
+    params.set('quality', feedRate.quality);
+  }
+  if (feedRate.fps && feedRate.fps !== '0') params.set('fps', feedRate.fps);
+  if (size) {
+    params.set('w', size.w);
+    params.set('h', size.h);
+  }
+  const key = `${useSocket ? 'ws:' : ''}${params}`;
+  if (key === feedSizeKey) return;
+  feedSizeKey = key;
+  if (useSocket) {
+    startSocket(params);
+    return;
+  }
+  stopSocket();
+  $feed.src = `${feedGrid ? '/grid_feed' : '/video_feed'}?${params}`;
+};
+const setFeedSource = src => {
+  feedSource = src;
+  feedReplay = null;
+  mseFailed = false;
+  wsFailed = false;
+  updateFeed();
+  watchStatus();
+  syncBurnIn();
+};
+
+// ---- H.264 passthrough ----
+// /video_mp4 is the camera's own stream remuxed to fragmented MP4; it is
+// appended to a MediaSource as it arrives. Any failure (no FFmpeg on the
+// server, unsupported codec) drops back to MJPEG for this source.
+const LIVE_EDGE_MAX_SEC = 1.5;
+const BUFFER_KEEP_SEC = 20;
+let mseSession = null;
+let mseFailed = false;
+const stopMse = () => {
+  if (!mseSession) return;
+  mseSession.abort();
+  mseSession = null;
+  $video.hidden = true;
+  $video.removeAttribute('src');
+  $video.load();
+  $feed.hidden = false;
+};
+const startMse = params => {
+  stopMse();
+  const controller = new AbortController();
+  const session = { abort: () => controller.abort() };
+  mseSession = session;
+  const play = async () => {
+    const resp = await fetch(`/video_mp4?${params}`, { signal: controller.signal });
+    const type = resp.headers.get('Content-Type') || '';
+    if (!resp.ok || !resp.body || !MediaSource.isTypeSupported(type)) {
+      throw new Error(`passthrough unavailable (${resp.status} ${type})`);
+    }
+    const media = new MediaSource();
+    $video.src = URL.createObjectURL(media);
+    await new Promise(resolve => media.addEventListener('sourceopen', resolve, { once: true }));
+    URL.revokeObjectURL($video.src);
+    const buffer = media.addSourceBuffer(type);
+    buffer.mode = 'segments';
+    const queue = [];
+    const pump = () => {
+      if (buffer.updating || media.readyState !== 'open') return;
+      const ranges = buffer.buffered;
+      if (ranges.length) {
+        const end = ranges.end(ranges.length - 1);
+        // Stay near live: skip ahead after stalls, drop what was watched.
+        if (end - $video.currentTime > LIVE_EDGE_MAX_SEC) $video.currentTime = end - 0.2;
+        if ($video.currentTime - ranges.start(0) > BUFFER_KEEP_SEC * 2) {
+          buffer.remove(ranges.start(0), $video.currentTime - BUFFER_KEEP_SEC);
+          return;
+        }
+      }
+      if (queue.length) buffer.appendBuffer(queue.shift());
+    };
+    buffer.addEventListener('updateend', pump);
+    $feed.hidden = true;
+    $feed.removeAttribute('src');
+    $video.hidden = false;
+    $video.play().catch(() => {});
+    const reader = resp.body.getReader();
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      queue.push(value);
+      pump();
+    }
+  };
+  play().then(() => {
+    // Server ended the stream (source restarted): reconnect.
+    if (mseSession !== session) return;
+    feedSizeKey = '';
+    setTimeout(() => { if (mseSession === session) updateFeed(); }, 1000);
+  }).catch(err => {
+    if (mseSession !== session || controller.signal.aborted) return;
+    console.warn('Falling back to MJPEG:', err);
+    mseFailed = true;
+    feedSizeKey = '';
+    updateFeed();
+  });
+};
+
+// ---- WebSocket frames ----
+// /ws_feed sends one JPEG per message and waits for an ack before the
+// next, so frames are never queued behind a slow connection or tab.
+let feedSocket = null;
+let wsFailed = false;
+const stopSocket = () => {
+  if (!feedSocket) return;
+  const socket = feedSocket;
+  feedSocket = null;
+  socket.close();
+  $canvas.hidden = true;
+  $feed.hidden = false;
+};
+const startSocket = params => {
+  stopSocket();
+  const proto = location.protocol === 'https:' ? 'wss' : 'ws';
+  const socket = new WebSocket(`${proto}://${location.host}/ws_feed?${params}`);
+  socket.binaryType = 'blob';
+  feedSocket = socket;
+  const ctx = $canvas.getContext('2d');
+  let opened = false;
+  socket.addEventListener('open', () => {
+    opened = true;
+    $feed.hidden = true;
+    $feed.removeAttribute('src');
+    $canvas.hidden = false;
+  });
+  socket.addEventListener('message', async event => {
+    if (typeof event.data === 'string') {
+      try { showStatus(JSON.parse(event.data)); } catch (_) {}
+      return;
+    }
+    try {
+      const bitmap = await createImageBitmap(event.data);
+      if ($canvas.width !== bitmap.width) $canvas.width = bitmap.width;
+      if ($canvas.height !== bitmap.height) $canvas.height = bitmap.height;
+      ctx.drawImage(bitmap, 0, 0);
+      bitmap.close();
+    } catch (_) {}
+    // Ack once the frame is actually on screen.
+    requestAnimationFrame(() => {
+      if (socket.readyState === WebSocket.OPEN) socket.send('ack');
+    });
+  });
+  socket.addEventListener('close', () => {
+    if (feedSocket !== socket) return;
+    feedSocket = null;
+    feedSizeKey = '';
+    // Never opened: the server has no /ws_feed, so use MJPEG instead.
+    if (!opened) wsFailed = true;
+    setTimeout(updateFeed, opened ? 1000 : 0);
+  });
+};
+
+// ---- Source status ----
+let statusEvents = null;
+const describeStatus = status => {
+  switch (status.state) {
+    case 'connecting': return 'Connecting…';
+    case 'reconnecting':
+      return `Reconnecting (attempt ${status.attempt}, next in ${status.retry_in}s)`;
+    case 'failed': return 'Source unavailable';
+    default: return '';
+  }
+};
+const showStatus = status => {
+  const text = describeStatus(status);
+  $streamStatus.textContent = text;
+  $streamStatus.hidden = !text;
+};
+const watchStatus = () => {
+  if (!$streamStatus || typeof EventSource === 'undefined') return;
+  if (statusEvents) statusEvents.close();
+  statusEvents = null;
+  $streamStatus.hidden = true;
+  if (feedGrid) return;  // tiles show their own state
+  const params = new URLSearchParams();
+  if (feedSource) params.set('src', feedSource);
+  statusEvents = new EventSource(`/status_stream?${params}`);
+  statusEvents.addEventListener('message', event => {
+    try { showStatus(JSON.parse(event.data)); } catch (_) {}
+  });
+};
+const scheduleFeedResize = () => {
+  clearTimeout(feedResizeTimer);
+  feedResizeTimer = setTimeout(updateFeed, 400);
+};
+
+// ---- RTSP state ----
+const buildRtsp = (u, p, ip, port, path) => {
+  const auth = (u && p) ? `${encodeURIComponent(u)}:${encodeURIComponent(p)}@` : '';
+  const cleanPath = path.startsWith('/') ? path : `/${path}`;
+  return `rtsp://${auth}${ip}:${port}${cleanPath}`;
+};
+const loadRtsp = () => {
+  let hasSource = false;
+  try {
+    const r = JSON.parse(localStorage.getItem('rtsp_viewer_rtsp') || '{}');
+    if (r.u) $u.value = r.u;
+    if (r.p) $p.value = r.p;
+    if (r.ip) $ip.value = r.ip;
+    if (r.port) $port.value = r.port;
+    if (r.path) $path.value = r.path;
+    if (r.quality) $quality.value = r.quality;
+    if (r.fps) $fps.value = r.fps;
+    // 'auto' was passthrough when it was the default; it is opt-in now.
+    if (r.mode && r.mode !== 'auto') $playback.value = r.mode;
+    feedRate = { quality: $quality.value, fps: $fps.value };
+    feedMode = $playback.value;
+    if (r.src) {
+      feedSource = r.src;
+      hasSource = true;
+    }
+  } catch (_) {}
+  setPanelCollapsed(hasSource);
+};
+const saveRtsp = () => {
+  const src = $camera.value ||
+    buildRtsp($u.value.trim(), $p.value.trim(), $ip.value.trim(), $port.value.trim(), $path.value.trim());
+  const r = {
+    u: $u.value, p: $p.value, ip: $ip.value, port: $port.value, path: $path.value,
+    quality: $quality.value, fps: $fps.value, mode: $playback.value, src
+  };
+  localStorage.setItem('rtsp_viewer_rtsp', JSON.stringify(r));
+  feedRate = { quality: $quality.value, fps: $fps.value };
+  feedMode = $playback.value;
+  setFeedSource(src);
+  setPanelCollapsed(true);
+};
+$('#saveRtsp').addEventListener('click', saveRtsp);
+// Say which features passthrough leaves out while it is selected.
+const syncPlaybackHint = () => {
+  if ($playbackHint) $playbackHint.hidden = $playback.value !== 'mp4';
+};
+$playback.addEventListener('change', syncPlaybackHint);
+
+// ---- Cameras ----
+// Cameras saved on the server are streamed by name, so their login
+// never has to be stored in the browser.
+const addCameraOption = cam => {
+  let opt = [...$camera.options].find(o => o.value === cam.name);
+  if (!opt) {
+    opt = document.createElement('option');
+    opt.value = cam.name;
+    $camera.appendChild(opt);
+  }
+  opt.textContent = cam.warm ? `${cam.title} (warm)` : cam.title;
+};
+const loadCameras = async () => {
+  try {
+    const res = await fetch('/sources');
+    if (!res.ok) return;
+    const data = await res.json();
+    (data.sources || []).forEach(addCameraOption);
+    if ([...$camera.options].some(o => o.value && o.value === feedSource)) $camera.value = feedSource;
+  } catch (_) {}
+};
+const saveCamera = async () => {
+  const name = $cameraName.value.trim();
+  if (!name) {
+    $cameraName.focus();
+    return;
+  }
+  const base = `rtsp://${$ip.value.trim()}:${$port.value.trim()}`;
+  const path = $path.value.trim();
+  const body = {
+    name,
+    url: `${base}${path.startsWith('/') ? path : `/${path}`}`,
+    username: $u.value.trim(),
+    password: $p.value.trim(),
+    warm: $cameraWarm.checked
+  };
+  // Optional sub-stream: the server serves small views from it.
+  const subPath = $cameraSubPath.value.trim();
+  if (subPath) {
+    const size = $cameraSubSize.value.trim().match(/^(\d+)\s*[x×]\s*(\d+)$/);
+    if (!size) {
+      $cameraSubSize.focus();
+      return;
+    }
+    body.ladder = [{
+      url: `${base}${subPath.startsWith('/') ? subPath : `/${subPath}`}`,
+      width: Number(size[1]),
+      height: Number(size[2])
+    }];
+  }
+  try {
+    const res = await fetch('/sources', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(body)
+    });
+    const data = await res.json();
+    if (!res.ok) {
+      alert(data.error || 'Unable to save camera');
+      return;
+    }
+    addCameraOption(data);
+    $camera.value = data.name;
+    $p.value = '';
+    saveRtsp();
+  } catch (_) {}
+};
+$('#saveCamera').addEventListener('click', saveCamera);
+
+// ---- Grid state ----
+const GRID_KEY = 'rtsp_viewer_grid';
+const gridSourceList = () => $gridSources.value.split('\n').map(s => s.trim()).filter(Boolean);
+const setGridMode = on => {
+  const sources = gridSourceList();
+  feedGrid = (on && sources.length) ? { sources, layout: $gridLayout.value } : null;
+  feedReplay = null;
+  localStorage.setItem(GRID_KEY, JSON.stringify({
+    sources: $gridSources.value, layout: $gridLayout.value, active: !!feedGrid
+  }));
+  updateFeed();
+  watchStatus();
+};
+const loadGrid = () => {
+  try {
+    const g = JSON.parse(localStorage.getItem(GRID_KEY) || '{}');
+    if (g.sources) $gridSources.value = g.sources;
+    if (g.layout) $gridLayout.value = g.layout;
+    const sources = gridSourceList();
+    if (g.active && sources.length) feedGrid = { sources, layout: $gridLayout.value };
+  } catch (_) {}
+};
+// ---- Replay ----
+const replayQuery = () => {
+  const params = new URLSearchParams();
+  if (feedSource) params.set('src', feedSource);
+  return params;
+};
+const showReplayBack = () => { $replayBackLabel.textContent = `${$replayBack.value} s ago`; };
+const refreshReplayRange = async () => {
+  try {
+    const info = await (await fetch(`/replay_info?${replayQuery()}`)).json();
+    const available = Math.floor(info.seconds || 0);
+    $replayBack.max = Math.max(1, Math.floor(info.max_seconds || 30));
+    $replayHint.textContent = available
+      ? `${available} s recorded.`
+      : 'Nothing recorded yet: replay covers time this source has been open.';
+  } catch (_) {}
+  showReplayBack();
+};
+const playReplay = () => {
+  feedReplay = { seconds: $replayBack.value, speed: $replaySpeed.value, started: Date.now() };
+  $streamStatus.hidden = true;
+  updateFeed();
+};
+const goLive = () => {
+  if (!feedReplay) return;
+  feedReplay = null;
+  feedSizeKey = '';
+  updateFeed();
+};
+$replayBack.addEventListener('input', showReplayBack);
+$replayBack.addEventListener('change', () => { if (feedReplay) playReplay(); });
+$replaySpeed.addEventListener('change', () => { if (feedReplay) playReplay(); });
+$('#replaySection').addEventListener('toggle', event => {
+  if (event.target.open) refreshReplayRange();
+});
+$('#replayPlay').addEventListener('click', playReplay);
+$('#replayLive').addEventListener('click', goLive);
+
+$('#showGrid').addEventListener('click', () => setGridMode(true));
+$('#showSingle').addEventListener('click', () => setGridMode(false));
+
+// Init
+loadBranding();
+loadStickers();
+loadStyle();
+updateFullscreenState();
+loadRtsp();
+syncPlaybackHint();
+loadCameras();
+loadGrid();
+positionFrameInitially();
+clampFrameWithinMain();
+updateFeed();
+watchStatus();
@@ -0,0 +1,62 @@
+"""Import the viewer against throwaway paths, never the checkout's own files."""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pytest
+
+_tmp = tempfile.mkdtemp(prefix="rtsp-viewer-tests-")
+os.environ["RTSP_VIEWER_CONFIG"] = os.path.join(_tmp, "rtsp_viewer.json")
+os.environ["RTSP_VIEWER_SOURCES"] = os.path.join(_tmp, "rtsp_viewer_sources.json")
+os.environ["RTSP_VIEWER_RECORDINGS"] = os.path.join(_tmp, "recordings")
+os.environ["RTSP_VIEWER_LAST_FRAMES"] = ""
+os.environ["RTSP_VIEWER_WORKERS"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeCapture:
+    """Stands in for cv2.VideoCapture: numbered grey frames, ``interval`` apart."""
+
+    def __init__(self, size=(64, 48), interval=0.01):
+        self.size = size
+        self.interval = interval
+        self.frames = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        time.sleep(self.interval)
+        self.frames += 1
+        width, height = self.size
+        if image is None or image.shape != (height, width, 3):
+            image = np.empty((height, width, 3), np.uint8)
+        image[:] = self.frames % 256
+        return True, image
+
+    def get(self, prop):
+        return 0.0
+
+    def getBackendName(self):
+        return "fake"
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def fake_capture(monkeypatch):
+    """Make every SourceReader open a FakeCapture; returns the URLs opened."""
+    import rtsp_viewer
+
+    opened = []
+
+    def open_capture(rtsp_url, options=None):
+        opened.append(rtsp_url)
+        return FakeCapture()
+
+    monkeypatch.setattr(rtsp_viewer, "open_capture", open_capture)
+    return opened
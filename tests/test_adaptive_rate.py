@@ -0,0 +1,49 @@
+import numpy as np
+
+from rtsp_viewer import AdaptiveRate, CaptureOptions, FeedSession, SourceReader
+
+
+def run(rate: AdaptiveRate, drain: float, frames: int) -> list:
+    steps = [(rate.quality, rate.fps)]
+    for _ in range(frames):
+        rate.update(drain)
+        if steps[-1] != (rate.quality, rate.fps):
+            steps.append((rate.quality, rate.fps))
+    return steps
+
+
+def test_steps_are_capped_by_the_viewer():
+    rate = AdaptiveRate(65, 12)
+    assert rate.qualities == [30, 40, 50, 60, 65]
+    assert rate.fps_steps == [1, 2, 5, 10, 12]
+    assert (rate.quality, rate.fps) == (65, 12)
+
+
+def test_congestion_lowers_quality_before_fps():
+    rate = AdaptiveRate(80, 30)
+    steps = run(rate, 0.5, 300)
+    assert [q for q, f in steps if f == 30] == [80, 70, 60, 50, 40, 30]
+    assert steps[-1] == (30, 1)  # 0.5 s fits the 1 s budget
+
+
+def test_headroom_raises_fps_before_quality():
+    rate = AdaptiveRate(80, 30)
+    run(rate, 0.5, 300)
+    steps = run(rate, 0.0001, 2000)
+    assert [f for q, f in steps if q == 30] == [1, 2, 5, 10, 15, 20, 25, 30]
+    assert steps[-1] == (80, 30)
+
+
+def test_steady_drain_changes_nothing():
+    rate = AdaptiveRate(80, 10)
+    assert run(rate, 0.05, 200) == [(80, 10)]
+
+
+def test_fps_cap_paces_the_session():
+    reader = SourceReader("test://pace", CaptureOptions())
+    session = FeedSession(reader, fps=10)
+    assert session.pace() <= 0
+    reader._publish(np.zeros((48, 64, 3), np.uint8))
+    session.frame_chunk(*reader.wait_frame(-1, timeout=0))
+    assert 0.05 < session.pace() <= 0.1
+    assert FeedSession(reader).pace() == 0.0
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import pytest
+
+from rtsp_viewer_asgi import QueryArgs, app
+
+
+def request(path: str, query: bytes = b"", method: str = "GET", body: bytes = b"",
+            parts: int = 0) -> list:
+    """Run one HTTP request through the app; a stream is cut after ``parts`` body messages."""
+    sent = []
+
+    async def receive():
+        if body is not None and not sent:
+            return {"type": "http.request", "body": body, "more_body": False}
+        while len([m for m in sent if m["type"] == "http.response.body"]) < parts:
+            await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": path, "query_string": query, "method": method,
+             "headers": [], "client": ("127.0.0.1", 5000)}
+    asyncio.run(asyncio.wait_for(app(scope, receive, send), 5.0))
+    return sent
+
+
+def test_query_args_keep_every_value():
+    args = QueryArgs({"query_string": b"src=a&src=b&fps=&w=320"})
+    assert (args["src"], args["fps"], args["w"]) == ("a", "", "320")
+    assert args.getlist("src") == ["a", "b"] and args.getlist("h") == []
+
+
+def test_unknown_path():
+    assert request("/nope")[0]["status"] == 404
+
+
+def test_stats_is_json():
+    start, body = request("/stats")
+    assert start["status"] == 200
+    assert "sources" in json.loads(body["body"])
+
+
+@pytest.mark.parametrize("payload", [b'{"stickers": "abc"}', b'{"stickers": [1]}', b'{"x": NaN}'])
+def test_overlay_rejects_bad_payloads(payload):
+    start, body = request("/overlay", b"src=test://asgi", "POST", payload)
+    assert start["status"] == 400
+    assert "error" in json.loads(body["body"])
+
+
+def test_video_feed_rejects_bad_parameters():
+    assert request("/video_feed", b"src=test://asgi&fps=nan")[0]["status"] == 400
+
+
+def test_video_feed_streams_parts(fake_capture):
+    start, *parts = request("/video_feed", b"src=test://asgi/feed", parts=3)
+    assert start["status"] == 200
+    assert (b"content-type", b"multipart/x-mixed-replace; boundary=frame") in start["headers"]
+    chunks = [m["body"] for m in parts if m["type"] == "http.response.body"]
+    assert len(chunks) >= 3 and all(c.startswith(b"--frame\r\n") for c in chunks)
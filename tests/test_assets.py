@@ -0,0 +1,74 @@
+import gzip
+
+import pytest
+
+import assets
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", set()),
+    ("gzip, deflate, br", {"gzip", "deflate", "br"}),
+    ("GZip;q=0.5, BR", {"gzip", "br"}),
+    ("br;q=0, gzip", {"gzip"}),
+    ("br; q=0.000, gzip;q=0.001", {"gzip"}),
+    ("identity, *;q=0", {"identity"}),
+])
+def test_accepted_encodings(header, expected):
+    assert assets.accepted_encodings(header) == expected
+
+
+def test_etag_matches():
+    assert assets.etag_matches('"a", "b"', '"b"')
+    assert assets.etag_matches('W/"b"', '"b"')
+    assert assets.etag_matches("*", '"b"')
+    assert not assets.etag_matches('"a"', '"b"')
+
+
+BODY = b"body { color: red; }\n" * 100
+
+
+def test_prefers_compressed_variants():
+    asset = assets.Asset(BODY, "text/css")
+    status, body, headers = asset.response("gzip, deflate")
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == BODY
+    assert headers["ETag"] == f'"{asset.digest}-gzip"'
+    assert headers["Vary"] == "Accept-Encoding"
+
+    status, body, headers = asset.response("gzip;q=0")
+    assert body == BODY and "Content-Encoding" not in headers
+    assert headers["ETag"] == f'"{asset.digest}"'
+
+
+def test_brotli_when_available():
+    if assets.brotli is None:
+        pytest.skip("brotli not installed")
+    _, _, headers = assets.Asset(BODY, "text/css").response("gzip, br")
+    assert headers["Content-Encoding"] == "br"
+
+
+def test_small_bodies_are_not_compressed():
+    small = BODY[:assets.MIN_COMPRESS_BYTES - 1]
+    status, body, headers = assets.Asset(small, "text/css").response("gzip, br")
+    assert body == small and "Content-Encoding" not in headers
+
+
+def test_not_modified_per_variant():
+    asset = assets.Asset(BODY, "text/css", assets.IMMUTABLE)
+    tag = asset.response("gzip")[2]["ETag"]
+    status, body, headers = asset.response("gzip", tag)
+    assert (status, body) == (304, b"")
+    assert headers["Cache-Control"] == assets.IMMUTABLE
+    assert asset.response("", tag)[0] == 200  # identity has its own tag
+
+
+def test_bundle_hashed_and_plain_names(tmp_path):
+    (tmp_path / "app.js").write_bytes(b"console.log(1);\n")
+    bundle = assets.AssetBundle(str(tmp_path))
+    url = bundle.url("app.js")
+    assert url.startswith("/static/app.") and url.endswith(".js")
+    status, body, headers = bundle.response(url[len("/static/"):])
+    assert status == 200 and headers["Cache-Control"] == assets.IMMUTABLE
+    assert headers["Content-Type"].endswith("; charset=utf-8")
+    assert bundle.response("app.js")[2]["Cache-Control"] == assets.REVALIDATE
+    assert bundle.response("missing.js")[0] == 404
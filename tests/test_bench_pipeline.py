@@ -0,0 +1,31 @@
+import bench_pipeline
+import rtsp_viewer
+
+
+def test_percentiles():
+    assert bench_pipeline._percentiles([]) == {"p50": None, "p95": None, "max": None}
+    assert bench_pipeline._percentiles(list(range(1, 101))) == {"p50": 50.5, "p95": 96, "max": 100}
+
+
+def test_flatten_keeps_numbers_only():
+    out = {}
+    bench_pipeline._flatten("", {"decode": {"fps": 30, "ok": True, "name": "x"},
+                                 "clients": [{"fps": 1.5}]}, out)
+    assert out == {"decode.fps": 30, "clients[0].fps": 1.5}
+
+
+def test_pipeline_on_a_generated_clip(tmp_path, monkeypatch):
+    clip = str(tmp_path / "pattern.avi")
+    bench_pipeline.make_test_pattern(clip, 320, 180, 20, 20.0)
+    frames, decode = bench_pipeline.bench_decode(clip, 10)
+    assert decode["frames"] == len(frames) == 10
+    assert (decode["width"], decode["height"]) == (320, 180)
+
+    [full, small] = bench_pipeline.bench_encode(frames, 80, [160, 640], ["opencv"])
+    assert (full["width"], small["width"]) == (320, 160)
+    assert small["bytes_per_frame"] < full["bytes_per_frame"]
+
+    monkeypatch.setattr(rtsp_viewer, "CAPTURE_RETRY_DELAY_SEC", 0.0)
+    [clients] = bench_pipeline.bench_clients(clip, [2], 1.0, "")
+    assert clients["clients"] == 2 and not clients["errors"]
+    assert clients["per_client_fps"] > 0 and clients["latency_ms"]["p50"] is not None
@@ -0,0 +1,54 @@
+from rtsp_viewer import CaptureHub, CaptureOptions
+
+
+def test_viewers_of_one_source_share_a_reader(fake_capture):
+    hub = CaptureHub()
+    first = hub.acquire("test://hub/shared")
+    second = hub.acquire("test://hub/shared")
+    try:
+        assert first is second and first.viewers == 2
+        seq, frame = first.wait_frame(0, timeout=2.0)
+        assert seq > 0 and frame is not None
+        assert fake_capture == ["test://hub/shared"]
+    finally:
+        hub.release(first)
+        hub.release(second)
+
+
+def test_different_capture_options_get_their_own_reader(fake_capture):
+    hub = CaptureHub()
+    tcp = hub.acquire("test://hub/options")
+    udp = hub.acquire("test://hub/options", CaptureOptions(transport="udp"))
+    try:
+        assert tcp is not udp
+        assert len(hub.readers()) == 2
+    finally:
+        hub.release(tcp)
+        hub.release(udp)
+
+
+def test_last_viewer_leaving_stops_the_reader(fake_capture):
+    hub = CaptureHub()
+    reader = hub.acquire("test://hub/stop")
+    hub.acquire("test://hub/stop")
+    hub.release(reader)
+    assert hub.readers() == [reader] and not reader._stop.is_set()
+    hub.release(reader)
+    assert hub.readers() == []
+    reader._thread.join(2.0)
+    assert reader.state == "stopped"
+    again = hub.acquire("test://hub/stop")
+    try:
+        assert again is not reader
+    finally:
+        hub.release(again)
+
+
+def test_find_matches_any_options(fake_capture):
+    hub = CaptureHub()
+    reader = hub.acquire("test://hub/find", CaptureOptions(transport="udp"))
+    try:
+        assert hub.find("test://hub/find") is reader
+        assert hub.find("test://hub/other") is None
+    finally:
+        hub.release(reader)
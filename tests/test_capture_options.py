@@ -0,0 +1,45 @@
+import pytest
+
+import rtsp_viewer
+from rtsp_viewer import CaptureOptions, capture_options_for
+
+
+def test_from_dict_parses_strings():
+    opts = CaptureOptions.from_dict({"transport": "UDP", "buffer_size": "3", "low_latency": "off",
+                                     "unknown": "ignored"})
+    assert (opts.transport, opts.buffer_size, opts.low_latency) == ("udp", 3, False)
+
+
+@pytest.mark.parametrize("values", [
+    {"transport": "http"},
+    {"backend": "gstreamer"},
+    {"buffer_size": "-1"},
+    {"probesize": "lots"},
+])
+def test_from_dict_rejects(values):
+    with pytest.raises(ValueError):
+        CaptureOptions.from_dict(values)
+
+
+def test_ffmpeg_options():
+    assert CaptureOptions().ffmpeg_options() == (
+        "rtsp_transport;tcp|probesize;500000|analyzeduration;500000|fflags;nobuffer|flags;low_delay")
+    opts = CaptureOptions(transport="auto", probesize=0, analyzeduration=0, low_latency=False)
+    assert opts.ffmpeg_options() == ""
+    assert opts.ffmpeg_args() == ["-rw_timeout", "5000000"]
+
+
+def test_ffmpeg_args_match_the_options():
+    args = CaptureOptions(transport="udp", low_latency=False, read_timeout_ms=0).ffmpeg_args()
+    assert args == ["-rtsp_transport", "udp", "-probesize", "500000", "-analyzeduration", "500000"]
+
+
+def test_layers(monkeypatch):
+    url = "rtsp://cam/options"
+    monkeypatch.setitem(rtsp_viewer.CONFIG, "capture", {"transport": "udp", "buffer_size": 2})
+    monkeypatch.setitem(rtsp_viewer.CONFIG, "per_source", {url: {"buffer_size": 4, "probesize": 1000}})
+    opts = capture_options_for(url)
+    assert (opts.transport, opts.buffer_size, opts.probesize) == ("udp", 4, 1000)
+    opts = capture_options_for(url, {"transport": "tcp", "buffer": "0"})
+    assert (opts.transport, opts.buffer_size, opts.probesize) == ("tcp", 0, 1000)
+    assert capture_options_for("rtsp://cam/other").buffer_size == 2
@@ -0,0 +1,64 @@
+import numpy as np
+
+import rtsp_viewer
+from rtsp_viewer import CaptureOptions, EncodedFrame, FrameView, SourceReader
+
+
+def encodes(reader: SourceReader) -> int:
+    """Frames ``reader`` has encoded (readers in other tests encode concurrently)."""
+    for line in rtsp_viewer.ENCODE_SECONDS.samples():
+        if line.startswith(f'rtsp_encode_seconds_count{{source="{reader.label}"}}'):
+            return int(line.rsplit(" ", 1)[1])
+    return 0
+
+
+def publish(reader: SourceReader, level: int):
+    reader._publish(np.full((48, 64, 3), level, np.uint8))
+    return reader.wait_frame(-1, timeout=0)
+
+
+def test_one_encode_per_frame_quality_and_view():
+    reader = SourceReader("test://encode/once", CaptureOptions())
+    seq, frame = publish(reader, 10)
+    first = reader.encode(seq, frame, 80)
+    encoded = encodes(reader)
+    assert reader.encode(seq, frame, 80)[1] is first[1]
+    assert encodes(reader) == encoded
+    reader.encode(seq, frame, 50)
+    reader.encode(seq, frame, 80, FrameView(width=32))
+    assert encodes(reader) == encoded + 2
+
+
+def test_a_newer_frame_is_encoded_again():
+    reader = SourceReader("test://encode/newer", CaptureOptions())
+    old_seq, old_frame = publish(reader, 10)
+    old = reader.encode(old_seq, old_frame, 50)
+    seq, frame = publish(reader, 200)
+    new = reader.encode(seq, frame, 50)
+    assert new[0] == seq > old_seq and new[1] != old[1]
+    # A late viewer asking for the older frame gets the newer encode.
+    encoded = encodes(reader)
+    assert reader.encode(old_seq, old_frame, 50) == new
+    assert encodes(reader) == encoded
+
+
+def test_chunk_and_jpeg_share_one_encode():
+    reader = SourceReader("test://encode", CaptureOptions())
+    seq, frame = publish(reader, 10)
+    _, chunk = reader.encode(seq, frame, 80)
+    _, jpg = reader.encode_jpeg(seq, frame, 80)
+    assert jpg.startswith(b"\xff\xd8") and chunk.endswith(jpg + b"\r\n")
+    assert b"X-Frame-Seq: %d\r\n" % seq in chunk
+
+
+def test_encoded_frame_views_the_chunk():
+    encoded = EncodedFrame.from_jpeg(7, b"\xff\xd8jpeg\xff\xd9")
+    assert encoded.chunk.startswith(b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: 8\r\n")
+    assert bytes(encoded.jpg) == encoded.jpeg_bytes() == b"\xff\xd8jpeg\xff\xd9"
+
+
+def test_next_chunk_times_out_without_a_new_frame():
+    reader = SourceReader("test://encode", CaptureOptions())
+    seq, _ = publish(reader, 10)
+    assert reader.next_chunk(seq, 80, timeout=0.01) == (seq, None)
+    assert reader.next_chunk(0, 80, timeout=0.01)[0] == seq
@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+import pytest
+
+import encoders
+from rtsp_viewer import load_encoder
+
+FRAME = np.random.default_rng(0).integers(0, 255, (96, 128, 3), np.uint8)
+
+
+def decode(buf) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(bytes(buf), np.uint8), cv2.IMREAD_COLOR)
+
+
+def test_encoder_is_abstract():
+    with pytest.raises(TypeError):
+        encoders.Encoder()
+
+
+def test_opencv_roundtrip():
+    encoder = encoders.create("opencv", optimize="1")
+    assert decode(encoder.encode(FRAME, 90)).shape == FRAME.shape
+    assert len(encoder.encode(FRAME, 30)) < len(encoder.encode(FRAME, 90))
+
+
+def test_opencv_encodes_crops():
+    crop = FRAME[10:50, 20:100]
+    assert not crop.flags.c_contiguous
+    assert decode(encoders.create().encode(crop, 80)).shape == (40, 80, 3)
+
+
+def test_spec_roundtrip():
+    settings = encoders.parse_spec("opencv: subsampling=420, optimize=1")
+    assert settings == {"encoder": "opencv", "subsampling": "420", "optimize": "1"}
+    assert encoders.create(**settings).describe() == "opencv:subsampling=420,optimize=1"
+
+
+@pytest.mark.parametrize("settings", [
+    {"encoder": "png"},
+    {"encoder": "opencv", "subsampling": "411"},
+    {"encoder": "opencv", "fast_dct": "1"},
+])
+def test_bad_settings(settings):
+    with pytest.raises(ValueError):
+        encoders.create(**settings)
+
+
+def test_parse_spec_needs_key_value_pairs():
+    with pytest.raises(ValueError):
+        encoders.parse_spec("opencv:optimize")
+
+
+@pytest.mark.skipif(encoders.turbojpeg is not None, reason="PyTurboJPEG is installed")
+def test_missing_turbojpeg():
+    with pytest.raises(RuntimeError):
+        encoders.create("turbojpeg")
+
+
+@pytest.mark.skipif(encoders.turbojpeg is None, reason="PyTurboJPEG is not installed")
+def test_turbojpeg_roundtrip():
+    try:
+        encoder = encoders.create("turbojpeg", fast_dct="1")
+    except OSError:
+        pytest.skip("libturbojpeg is not installed")
+    assert decode(encoder.encode(FRAME[10:50, 20:100], 80)).shape == (40, 80, 3)
+
+
+def test_unusable_config_falls_back_to_opencv():
+    assert load_encoder({"encoder": "nope"}).name == "opencv"
+    assert load_encoder({"encoder": "opencv", "optimize": True}).options["optimize"] is True
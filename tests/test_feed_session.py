@@ -0,0 +1,31 @@
+import numpy as np
+
+from rtsp_viewer import CaptureOptions, FeedSession, SourceReader
+
+
+def publish(reader: SourceReader, count: int = 1):
+    for _ in range(count):
+        reader._publish(np.zeros((48, 64, 3), np.uint8))
+    return reader.wait_frame(-1, timeout=0)
+
+
+def test_slow_viewer_skips_to_the_newest_frame():
+    reader = SourceReader("test://feed", CaptureOptions())
+    session = FeedSession(reader, "10.0.0.9")
+    assert session.frame_chunk(*publish(reader)) is not None
+    assert session.seq == 1
+    seq, frame = publish(reader, 3)
+    assert session.frame_chunk(seq, frame) is not None
+    assert session.seq == 4 and session.viewer.frames_dropped == 2
+    assert session.frame_chunk(seq, frame) is None  # nothing new
+
+
+def test_viewer_stats_follow_the_session():
+    reader = SourceReader("test://feed", CaptureOptions())
+    session = FeedSession(reader, "10.0.0.9")
+    session.frame_chunk(*publish(reader))
+    session.sent()
+    [viewer] = reader.stats()["viewers"]
+    assert viewer["client"] == "10.0.0.9" and viewer["frames_sent"] == 1
+    session.close()
+    assert reader.stats()["viewers"] == []
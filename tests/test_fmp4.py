@@ -0,0 +1,76 @@
+import io
+import struct
+
+import pytest
+
+import fmp4
+
+
+def box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def full_box(kind: bytes, flags: int, payload: bytes) -> bytes:
+    return box(kind, struct.pack(">I", flags) + payload)
+
+
+def test_iter_boxes_walks_siblings():
+    data = box(b"ftyp", b"isom") + box(b"moov", box(b"mvhd"))
+    assert list(fmp4.iter_boxes(data)) == [(b"ftyp", 8, 12), (b"moov", 20, 28)]
+
+
+def test_iter_boxes_reads_large_and_open_ended_sizes():
+    large = struct.pack(">I4sQ", 1, b"mdat", 20) + b"abcd"
+    open_ended = struct.pack(">I4s", 0, b"free") + b"xyz"
+    assert list(fmp4.iter_boxes(large + open_ended)) == [(b"mdat", 16, 20), (b"free", 28, 31)]
+
+
+@pytest.mark.parametrize("data", [
+    struct.pack(">I4s", 100, b"moov") + b"short",   # runs past the end
+    struct.pack(">I4s", 4, b"moov"),                # smaller than its header
+    b"\0\0\0",                                      # not even a header
+])
+def test_iter_boxes_stops_at_broken_boxes(data):
+    assert list(fmp4.iter_boxes(box(b"ftyp") + data)) == [(b"ftyp", 8, 8)]
+
+
+def test_find_box_follows_a_path():
+    data = box(b"moov", box(b"mvhd") + box(b"trak", box(b"tkhd") + box(b"mdia", b"MDIA")))
+    start, stop = fmp4.find_box(data, (b"moov", b"trak", b"mdia"))
+    assert data[start:stop] == b"MDIA"
+    assert fmp4.find_box(data, (b"moov", b"mvex")) is None
+
+
+def test_read_box_from_a_stream():
+    stream = io.BytesIO(box(b"moof", b"1234") + box(b"mdat")[:5])
+    assert fmp4.read_box(stream) == (b"moof", box(b"moof", b"1234"))
+    assert fmp4.read_box(stream) is None            # truncated
+    with pytest.raises(ValueError):
+        fmp4.read_box(io.BytesIO(struct.pack(">I4s", 0, b"mdat")))
+
+
+def test_codec_string_for_avc():
+    avcc = box(b"avcC", bytes([1, 0x64, 0x00, 0x1F]))
+    stsd = full_box(b"stsd", 0, struct.pack(">I", 1) + box(b"avc1", bytes(78) + avcc))
+    init = box(b"moov", box(b"trak", box(b"mdia", box(b"minf", box(b"stbl", stsd)))))
+    assert fmp4.codec_string(init) == "avc1.64001f"
+    assert fmp4.codec_string(box(b"moov")) is None
+
+
+def fragment(trun_flags: int, first_sample_flags: int = 0, tfhd_flags: int = 0,
+             default_flags: int = 0) -> bytes:
+    tfhd = struct.pack(">I", 1) + (struct.pack(">I", default_flags) if tfhd_flags & 0x20 else b"")
+    trun = struct.pack(">I", 1) + (struct.pack(">I", first_sample_flags) if trun_flags & 0x04 else b"")
+    return box(b"moof", box(b"traf", full_box(b"tfhd", tfhd_flags, tfhd) + full_box(b"trun", trun_flags, trun)))
+
+
+def test_keyframe_from_first_sample_flags():
+    assert fmp4.starts_with_keyframe(fragment(0x04, first_sample_flags=0))
+    assert not fmp4.starts_with_keyframe(fragment(0x04, first_sample_flags=fmp4.SAMPLE_NON_SYNC))
+
+
+def test_keyframe_from_track_defaults():
+    assert not fmp4.starts_with_keyframe(fragment(0, tfhd_flags=0x20, default_flags=fmp4.SAMPLE_NON_SYNC))
+    assert not fmp4.starts_with_keyframe(fragment(0), default_flags=fmp4.SAMPLE_NON_SYNC)
+    assert fmp4.starts_with_keyframe(fragment(0))
+    assert not fmp4.starts_with_keyframe(box(b"moof"))
@@ -0,0 +1,62 @@
+import numpy as np
+
+from conftest import FakeCapture
+from rtsp_viewer import FULL_FRAME, CaptureOptions, FrameSlots, FrameView, SourceReader
+
+
+def test_free_slots_are_read_into_again():
+    slots, cap = FrameSlots(2), FakeCapture()
+    _, a = slots.read(cap)
+    slots.publish(a, 1)
+    _, b = slots.read(cap)
+    slots.publish(b, 2)
+    _, again = slots.read(cap)
+    assert again is a and again[0, 0, 0] == 3
+
+
+def test_published_and_held_slots_are_left_alone():
+    slots, cap = FrameSlots(2), FakeCapture()
+    _, a = slots.read(cap)
+    slots.publish(a, 1)
+    assert slots.hold(a, 1)
+    _, b = slots.read(cap)
+    slots.publish(b, 2)
+    _, extra = slots.read(cap)  # a is held, b is published: allocate
+    assert extra is not a and extra is not b and a[0, 0, 0] == 1
+    slots.release(a)
+    _, reused = slots.read(cap)
+    assert reused is a
+    assert not slots.hold(a, 1)  # it holds a newer frame now
+
+
+def test_frames_from_elsewhere_are_never_reused():
+    slots = FrameSlots(2)
+    frame = np.zeros((4, 4, 3), np.uint8)
+    assert slots.hold(frame, 7)
+    slots.release(frame)
+
+
+def test_a_new_frame_size_replaces_the_slot():
+    slots, cap = FrameSlots(1), FakeCapture((64, 48))
+    _, small = slots.read(cap)
+    cap.size = (128, 96)
+    _, large = slots.read(cap)
+    assert large.shape == (96, 128, 3) and large is not small
+    _, again = slots.read(cap)
+    assert again is large
+
+
+def test_image_is_the_callers_copy_of_a_current_frame():
+    reader = SourceReader("test://slots", CaptureOptions())
+    cap = FakeCapture()
+    _, frame = reader._slots.read(cap)
+    reader._publish(frame)
+    seq, frame = reader.wait_frame(-1, timeout=0)
+    image = reader.image(seq, frame, FULL_FRAME)
+    assert image is not frame and np.array_equal(image, frame)
+    assert reader.image(seq, frame, FrameView(width=32)).shape == (24, 32, 3)
+    reader._slots.publish(None, seq + 1)  # another frame was published ...
+    while reader._slots.read(cap)[1] is not frame:
+        pass                              # ... and this slot read into again
+    assert reader.image(seq, frame, FULL_FRAME) is None
+    assert reader.encode(seq, frame, 50) == (seq, None)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from rtsp_viewer import FULL_FRAME, FrameView
+
+FRAME = np.zeros((720, 1280, 3), np.uint8)
+
+
+def test_sizes_round_up_so_similar_windows_share_an_encode():
+    assert FrameView.from_args({"w": "630", "h": "350"}) == FrameView(640, 352)
+    assert FrameView.from_args({"w": "640", "h": "360"}) == FrameView(640, 384)
+    assert FrameView.from_args({}) == FULL_FRAME
+    assert FrameView.from_args({"crop": "0,0,1,1"}) == FULL_FRAME
+
+
+@pytest.mark.parametrize("args", [
+    {"w": "-1"},
+    {"scale": "0"},
+    {"scale": "1.5"},
+    {"scale": "nan"},
+    {"crop": "0,0,1"},
+    {"crop": "0.5,0,0.6,1"},
+    {"crop": "0,0,0,1"},
+    {"crop": "nan,0,1,1"},
+])
+def test_rejected(args):
+    with pytest.raises(ValueError):
+        FrameView.from_args(args)
+
+
+def test_fits_the_bounding_box_keeping_aspect():
+    assert FrameView(width=640).apply(FRAME).shape == (360, 640, 3)
+    assert FrameView(width=640, height=180).apply(FRAME).shape == (180, 320, 3)
+    assert FrameView(scale=0.25).apply(FRAME).shape == (180, 320, 3)
+
+
+def test_never_upscales():
+    assert FrameView(width=4096).apply(FRAME) is FRAME
+
+
+def test_crop_then_scale():
+    frame = FRAME.copy()
+    frame[360:, 640:] = 255
+    out = FrameView(crop=(0.5, 0.5, 0.5, 0.5)).apply(frame)
+    assert out.shape == (360, 640, 3) and out.min() == 255
+    assert FrameView(width=320, crop=(0.5, 0.5, 0.5, 0.5)).apply(frame).shape == (180, 320, 3)
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import rtsp_viewer
+from rtsp_viewer import GRID_MIN_CELL, GridReader, capture_hub, grid_layout, parse_grid_args
+
+
+@pytest.mark.parametrize("count, layout", [(1, (1, 1)), (2, (2, 1)), (3, (2, 2)), (5, (3, 2)), (9, (3, 3))])
+def test_auto_layout(count, layout):
+    assert grid_layout("auto", count) == layout
+
+
+def test_explicit_layout():
+    assert grid_layout("1X3", 2) == (1, 3)
+    for spec in ("3", "2x", "0x2", "1x1", "8x8"):
+        with pytest.raises(ValueError):
+            grid_layout(spec, 2)
+
+
+def test_parse_grid_args():
+    grid = parse_grid_args(MultiDict([("src", "a"), ("src", ""), ("src", "b"), ("w", "630"), ("fps", "5")]))
+    assert grid["sources"] == ("a", "b") and grid["layout"] == (2, 1)
+    assert grid["size"][0] == 640 and grid["fps"] == 5.0
+
+
+@pytest.mark.parametrize("args", [
+    [],
+    [("src", "a"), ("w", "0")],
+    [("src", "a"), ("w", "100000")],
+    [("src", "a"), ("src", "b"), ("layout", "2x1"), ("w", str(2 * GRID_MIN_CELL))],
+    [("src", "a"), ("layout", "1x4"), ("h", "96")],
+])
+def test_rejected(args):
+    with pytest.raises(ValueError):
+        parse_grid_args(MultiDict(args))
+
+
+def filled(canvas) -> bool:
+    return canvas is not None and all(canvas[48, x].any() for x in (64, 192))
+
+
+def test_composites_each_source_into_its_cell(fake_capture):
+    grid = capture_hub.acquire_grid(("test://grid/a", "test://grid/b"), (2, 1), (256, 96))
+    try:
+        seq, canvas, deadline = 0, None, time.monotonic() + 2.0
+        # Tiles fill in as their sources publish.
+        while not filled(canvas) and time.monotonic() < deadline:
+            seq, canvas = grid.wait_frame(seq, timeout=0.5)
+        assert filled(canvas) and canvas.shape == (96, 256, 3)
+        assert canvas[:, 127:129].max() == 0  # the gap between cells
+        assert sorted(fake_capture) == ["test://grid/a", "test://grid/b"]
+    finally:
+        capture_hub.release(grid)
+    grid._thread.join(2.0)
+    assert not [r for r in capture_hub.readers() if r.rtsp_url.startswith("test://grid/")]
+
+
+def test_failed_tiles_get_a_fresh_reader(fake_capture):
+    grid = GridReader(("test://grid/c",), (1, 1), (128, 96))
+    readers = [capture_hub.acquire("test://grid/c", rtsp_viewer.capture_options_for("test://grid/c"))]
+    gave_up = readers[0]
+    gave_up.state = "failed"
+    grid._restart_failed(readers, ["test://grid/c"])
+    try:
+        assert readers[0] is not gave_up and gave_up.viewers == 0
+        assert readers[0] in capture_hub.readers() and gave_up not in capture_hub.readers()
+    finally:
+        capture_hub.release(readers[0])
@@ -0,0 +1,66 @@
+import pytest
+
+import rtsp_viewer
+from rtsp_viewer import Camera, FrameView, main_source, parse_ladder, pick_source, source_url
+
+SUB = {"url": "rtsp://cam/stream2", "width": 640, "height": 360}
+
+
+@pytest.fixture
+def camera(monkeypatch):
+    cam = Camera.from_dict("door", {"url": "rtsp://u:p@cam/stream1",
+                                    "ladder": [{"width": 1280}, SUB]})
+    monkeypatch.setattr(rtsp_viewer, "cameras", type("Registry", (), {
+        "get": staticmethod({"door": cam}.get)})())
+    return cam
+
+
+def test_parse_ladder_sorts_and_strips_credentials():
+    ladder = parse_ladder([{"width": 1280, "height": 720},
+                           {"url": "rtsp://x:y@cam/stream2", "width": "640", "height": 360}])
+    assert ladder == [SUB, {"width": 1280, "height": 720}]
+
+
+@pytest.mark.parametrize("rungs", [
+    "640x360",
+    [640],
+    [{"height": 360}],
+    [{"width": -640}],
+    [{"url": "rtsp://cam/s2", "width": 640}],
+    [SUB, dict(SUB, url="rtsp://cam/s3")],
+    [{"width": 100 + n} for n in range(rtsp_viewer.LADDER_MAX_RUNGS + 1)],
+])
+def test_parse_ladder_rejects(rungs):
+    with pytest.raises((ValueError, TypeError)):
+        parse_ladder(rungs)
+
+
+def test_sub_stream_names(camera):
+    assert main_source("door@640") == "door"
+    assert main_source("rtsp://u:p@host/s") == "rtsp://u:p@host/s"
+    assert source_url("door@640") == "rtsp://u:p@cam/stream2"
+    assert source_url("door@641") == "door@641"
+    assert source_url("door") == "rtsp://u:p@cam/stream1"
+
+
+@pytest.mark.parametrize("view, expected", [
+    (FrameView(320, 180), ("door@640", FrameView(320, 180))),
+    (FrameView(640, 0), ("door@640", FrameView(640, 0))),
+    (FrameView(0, 360), ("door@640", FrameView(0, 360))),
+    (FrameView(672, 378), ("door", FrameView(1280, 0))),
+    (FrameView(1920, 1080), ("door", FrameView(1920, 1080))),
+    (FrameView(), ("door", FrameView())),
+])
+def test_pick_source(camera, view, expected):
+    assert pick_source("door", view) == expected
+
+
+def test_a_crop_counts_its_share_of_each_rung(camera):
+    quarter = (0.5, 0.5, 0.5, 0.5)
+    assert pick_source("door", FrameView(320, 0, crop=quarter))[0] == "door@640"
+    assert pick_source("door", FrameView(352, 0, crop=quarter)) == (
+        "door", FrameView(640, 0, crop=quarter))
+
+
+def test_sources_without_a_ladder_are_untouched(camera):
+    assert pick_source("rtsp://other/s", FrameView(320, 180)) == ("rtsp://other/s", FrameView(320, 180))
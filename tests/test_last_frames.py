@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+
+import rtsp_viewer
+from rtsp_viewer import CaptureOptions, FeedSession, FrameView, LastFrames, SourceReader
+
+JPG = cv2.imencode(".jpg", np.full((240, 320, 3), 128, np.uint8))[1].tobytes()
+
+
+def test_saved_frames_survive_a_restart(tmp_path):
+    LastFrames(str(tmp_path)).put("rtsp://u:p@cam/1", JPG)
+    frames = LastFrames(str(tmp_path))
+    assert frames.get("rtsp://u:p@cam/1") == JPG
+    assert frames.get("rtsp://cam/2") is None
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_forget_rereads_the_file(tmp_path):
+    ours, theirs = LastFrames(str(tmp_path)), LastFrames(str(tmp_path))
+    ours.put("cam", b"old")
+    theirs.put("cam", b"new")
+    assert ours.get("cam") == b"old"
+    ours.forget("cam")
+    assert ours.get("cam") == b"new"
+
+
+def test_memory_only():
+    frames = LastFrames("")
+    assert frames.get("cam") is None
+    frames.put("cam", JPG)
+    assert frames.get("cam") == JPG
+
+
+def test_reader_saves_its_newest_frame(monkeypatch):
+    monkeypatch.setattr(rtsp_viewer, "last_frames", LastFrames(""))
+    reader = SourceReader("test://last/a", CaptureOptions())
+    reader._publish(np.zeros((48, 64, 3), np.uint8))
+    assert rtsp_viewer.last_frames.get("test://last/a").startswith(b"\xff\xd8")
+
+
+def test_connecting_viewers_get_the_cached_frame_once(monkeypatch):
+    monkeypatch.setattr(rtsp_viewer, "last_frames", LastFrames(""))
+    rtsp_viewer.last_frames.put("test://last/b", JPG)
+    reader = SourceReader("test://last/b", CaptureOptions())
+    session = FeedSession(reader, view=FrameView(width=160))
+    chunk = session.status_chunk()
+    jpg = chunk[chunk.index(b"\xff\xd8"):-2]
+    assert cv2.imdecode(np.frombuffer(jpg, np.uint8), cv2.IMREAD_COLOR).shape == (120, 160, 3)
+    assert session.cached_jpeg() is None
+
+
+def test_nothing_cached_means_no_first_picture(monkeypatch):
+    monkeypatch.setattr(rtsp_viewer, "last_frames", LastFrames(""))
+    session = FeedSession(SourceReader("test://last/c", CaptureOptions()))
+    assert session.cached_jpeg() is None
@@ -0,0 +1,81 @@
+import metrics
+
+
+def test_label_values_are_escaped():
+    assert metrics.format_labels(("source", "client"), ('a"b\\c\nd', 1), 'le="1"') == (
+        '{source="a\\"b\\\\c\\nd",client="1",le="1"}')
+    assert metrics.format_labels((), ()) == ""
+
+
+def test_render_runs_collectors_first():
+    registry = metrics.Registry()
+    frames = registry.counter("frames_total", "Frames.", ("source",))
+    fps = registry.gauge("fps", "Rate.", ("source",))
+    fps.set(1.0, "gone")
+    registry.add_collector(lambda: fps.replace({("cam",): 25.0}))
+    frames.inc("cam")
+    frames.inc("cam", amount=2)
+    assert registry.render() == (
+        "# HELP frames_total Frames.\n# TYPE frames_total counter\n"
+        'frames_total{source="cam"} 3\n'
+        "# HELP fps Rate.\n# TYPE fps gauge\n"
+        'fps{source="cam"} 25.0\n')
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("h", "", (), (0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.samples() == [
+        'h_bucket{le="0.1"} 1', 'h_bucket{le="1.0"} 2', 'h_bucket{le="+Inf"} 3',
+        "h_sum 5.55", "h_count 3"]
+
+
+def test_endpoint():
+    import rtsp_viewer
+    response = rtsp_viewer.app.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+    assert b"# TYPE rtsp_frames_read_total counter" in response.data
+
+
+def test_counter_take_empties_the_series():
+    counter = metrics.Counter("c", "")
+    counter.inc("cam", amount=3)
+    assert counter.take() == {("cam",): 3}
+    assert counter.take() == {}
+    assert counter.samples() == []
+
+
+def test_two_workers_reporting_one_source():
+    # The source moved from the first worker to the second; both still report.
+    web = metrics.Counter("rtsp_frames_read_total", "", ("source",))
+    old, new = metrics.Counter("c", "", ("source",)), metrics.Counter("c", "", ("source",))
+    totals = []
+    for old_frames, new_frames in ((100, 0), (5, 40), (0, 60), (0, 0)):
+        if old_frames:
+            old.inc("cam", amount=old_frames)
+        if new_frames:
+            new.inc("cam", amount=new_frames)
+        web.add(old.take())
+        web.add(new.take())
+        totals.append(web.samples())
+    assert totals[-1] == ['rtsp_frames_read_total{source="cam"} 205']
+    values = [float(lines[0].rsplit(" ", 1)[1]) for lines in totals]
+    assert values == sorted(values)
+
+
+def test_histogram_add_sums_buckets():
+    web = metrics.Histogram("h", "", ("source",), (0.1, 1.0))
+    for worker_values in ((0.05, 0.5), (0.5, 2.0)):
+        worker = metrics.Histogram("h", "", ("source",), (0.1, 1.0))
+        for value in worker_values:
+            worker.observe(value, "cam")
+        web.add(worker.take())
+    assert web.samples() == [
+        'h_bucket{source="cam",le="0.1"} 1',
+        'h_bucket{source="cam",le="1.0"} 3',
+        'h_bucket{source="cam",le="+Inf"} 4',
+        'h_sum{source="cam"} 3.05',
+        'h_count{source="cam"} 4',
+    ]
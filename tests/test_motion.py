@@ -0,0 +1,64 @@
+import numpy as np
+
+from rtsp_viewer import MOTION_KEEPALIVE_SEC, CaptureOptions, SourceReader, capture_options_for
+
+
+def reader(threshold: float) -> SourceReader:
+    return SourceReader("test://motion", CaptureOptions(motion_threshold=threshold))
+
+
+def gray(level: int) -> np.ndarray:
+    return np.full((360, 640, 3), level, np.uint8)
+
+
+def test_first_frame_is_always_published():
+    r = reader(5)
+    assert r._changed_enough(gray(100), 0.0)
+    assert r.motion_score == 100.0
+
+
+def test_unchanged_frame_is_suppressed_until_keepalive():
+    r = reader(5)
+    r._changed_enough(gray(100), 0.0)
+    assert not r._changed_enough(gray(100), 1.0)
+    assert r.motion_score == 0.0
+    assert r._changed_enough(gray(100), MOTION_KEEPALIVE_SEC)
+
+
+def test_noise_below_pixel_delta_does_not_count():
+    r = reader(1)
+    r._changed_enough(gray(100), 0.0)
+    assert not r._changed_enough(gray(110), 0.1)
+
+
+def test_changed_area_is_compared_with_threshold():
+    r = reader(10)
+    r._changed_enough(gray(0), 0.0)
+    small = gray(0)
+    small[:, :40] = 255                  # 4 of the thumbnail's 64 columns
+    assert not r._changed_enough(small, 0.1)
+    assert r.motion_score == 6.25
+    large = gray(0)
+    large[:, :128] = 255                 # 20%
+    assert r._changed_enough(large, 0.2)
+
+
+def test_suppressed_frames_do_not_move_the_reference():
+    # A slow drift adds up against the last published frame.
+    r = reader(50)
+    r._changed_enough(gray(100), 0.0)
+    assert not r._changed_enough(gray(115), 0.1)
+    assert r._changed_enough(gray(130), 0.2)
+
+
+def test_threshold_is_not_a_viewer_option():
+    # Viewers of one source share its reader, whatever they ask for.
+    assert capture_options_for("test://motion", {"motion": "50"}).motion_threshold == 0
+    assert CaptureOptions(motion_threshold=5) == CaptureOptions()
+    assert hash(CaptureOptions(motion_threshold=5)) == hash(CaptureOptions())
+
+
+def test_threshold_comes_from_the_source_config(monkeypatch):
+    import rtsp_viewer
+    monkeypatch.setitem(rtsp_viewer.CONFIG, "per_source", {"test://motion": {"motion_threshold": 3}})
+    assert capture_options_for("test://motion", {"motion": "50"}).motion_threshold == 3
@@ -0,0 +1,77 @@
+import base64
+import json
+import pickle
+
+import cv2
+import numpy as np
+import pytest
+
+import rtsp_viewer
+from rtsp_viewer import Overlay
+
+PNG = base64.b64encode(cv2.imencode(".png", np.zeros((4, 4, 4), np.uint8))[1].tobytes()).decode()
+
+
+@pytest.mark.parametrize("values", [
+    {"stickers": "abc"},
+    {"stickers": {"image": ""}},
+    {"stickers": [1]},
+    {"stickers": [None]},
+    {"x": "nan"},
+    {"y": float("inf")},
+    {"stickers": [{"image": ""}]},
+    {"stickers": [{"image": "aGVsbG8="}]},
+    {"stickers": [{"image": PNG, "x": "nan"}]},
+    {"stickers": [{"image": PNG, "width": "nan"}]},
+    {"color": "red"},
+])
+def test_bad_overlays_are_value_errors(values):
+    with pytest.raises(ValueError):
+        Overlay.from_dict(values)
+
+
+def test_positions_are_clamped():
+    overlay = Overlay.from_dict({"text": "hi", "x": -20, "y": 250,
+                                 "stickers": [{"image": PNG, "x": 120, "y": 30}]})
+    assert (overlay.x, overlay.y) == (0.0, 100.0)
+    assert overlay.stickers[0][1:] == (100.0, 30.0, 0.2)
+
+
+@pytest.mark.parametrize("body", ['{"stickers": "abc"}', '{"stickers": [1]}', '[]', 'not json'])
+def test_route_rejects_bad_payloads(body):
+    response = rtsp_viewer.app.test_client().post("/overlay?src=cam", data=body)
+    assert response.status_code == 400
+    assert "error" in json.loads(response.data)
+    assert "cam" not in rtsp_viewer.overlays
+
+
+def test_sticker_is_blended_at_its_position():
+    red = np.zeros((10, 10, 4), np.uint8)
+    red[..., 2] = red[..., 3] = 255
+    image = base64.b64encode(cv2.imencode(".png", red)[1].tobytes()).decode()
+    overlay = Overlay.from_dict({"stickers": [{"image": image, "x": 25, "y": 50, "width": 0.1}]})
+    frame = np.zeros((100, 200, 3), np.uint8)
+    overlay.apply(frame)
+    assert tuple(frame[50, 50]) == (0, 0, 255)
+    assert not frame[:, 100:].any() and not frame[:40].any()
+
+
+def test_text_is_drawn_and_overlays_pickle():
+    overlay = pickle.loads(pickle.dumps(Overlay.from_dict({"text": "cam 1", "color": "#00ff00"})))
+    assert overlay.as_dict()["color"] == "#00ff00"
+    frame = np.zeros((360, 640, 3), np.uint8)
+    overlay.apply(frame)
+    assert frame[..., 1].max() > 200 and frame[..., 0].max() < 100
+
+
+def test_reader_burns_in_and_drops_a_broken_overlay(monkeypatch):
+    reader = rtsp_viewer.SourceReader("test://overlay/burn", rtsp_viewer.CaptureOptions())
+    monkeypatch.setitem(rtsp_viewer.overlays, "test://overlay/burn",
+                        Overlay.from_dict({"text": "x", "y": 50}))
+    reader._publish(np.zeros((360, 640, 3), np.uint8))
+    assert reader.wait_frame(-1, timeout=0)[1].any()
+    broken = Overlay.from_dict({"text": "x"})
+    broken.apply = None  # not callable
+    rtsp_viewer.overlays["test://overlay/burn"] = broken
+    reader._publish(np.zeros((360, 640, 3), np.uint8))
+    assert reader.seq == 2 and "test://overlay/burn" not in rtsp_viewer.overlays
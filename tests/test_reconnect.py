@@ -0,0 +1,43 @@
+import rtsp_viewer
+from rtsp_viewer import CaptureOptions, FeedSession, SourceReader, backoff_delay
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(rtsp_viewer.random, "uniform", lambda low, high: high)
+    delays = [backoff_delay(n) for n in range(1, 9)]
+    assert delays == [1.0, 2.0, 4.0, 8.0, 16.0, 30.0, 30.0, 30.0]
+
+
+def test_backoff_is_jittered_down_only():
+    for failures in (1, 3, 20):
+        delay = backoff_delay(failures)
+        full = min(rtsp_viewer.CAPTURE_RETRY_MAX_DELAY_SEC,
+                   rtsp_viewer.CAPTURE_RETRY_DELAY_SEC * 2 ** (failures - 1))
+        assert full / 2 <= delay <= full
+
+
+def test_reader_gives_up_after_max_attempts(monkeypatch):
+    opened = []
+    monkeypatch.setattr(rtsp_viewer, "open_capture", lambda url, options: opened.append(url))
+    monkeypatch.setattr(rtsp_viewer, "backoff_delay", lambda failures: 0.01)
+    monkeypatch.setattr(rtsp_viewer, "CAPTURE_MAX_ATTEMPTS", 3)
+    reader = SourceReader("test://down", CaptureOptions())
+    session = FeedSession(reader)
+    reader.start()
+    reader._thread.join(2.0)
+    assert len(opened) == 3
+    assert reader.status == {"state": "failed", "attempts": 3}
+    assert session.status_chunk() is not None and session.finished
+
+
+def test_reader_reports_each_retry(monkeypatch):
+    monkeypatch.setattr(rtsp_viewer, "open_capture", lambda url, options: None)
+    monkeypatch.setattr(rtsp_viewer, "backoff_delay", lambda failures: 0.2)
+    reader = SourceReader("test://flaky", CaptureOptions())
+    reader.start()
+    try:
+        version, status = reader.wait_status(0, timeout=2.0)
+        assert status == {"state": "reconnecting", "attempt": 1, "retry_in": 0.2}
+        assert reader.wait_status(version, timeout=2.0)[1]["attempt"] == 2
+    finally:
+        reader.stop()
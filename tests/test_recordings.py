@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+import rtsp_viewer
+
+
+@pytest.fixture
+def recordings(tmp_path, monkeypatch):
+    root = tmp_path / "recordings"
+    (root / "front-door").mkdir(parents=True)
+    (root / "front-door" / "20240101-120000.mp4").write_bytes(b"")
+    (tmp_path / "20240101.mp4").write_bytes(b"")  # outside the recordings directory
+    monkeypatch.setattr(rtsp_viewer, "RECORDINGS_DIR", str(root))
+    return root
+
+
+def test_finds_a_segment(recordings):
+    path = rtsp_viewer.recording_file("front-door", "20240101-120000.mp4")
+    assert path == os.path.realpath(recordings / "front-door" / "20240101-120000.mp4")
+
+
+@pytest.mark.parametrize("slug, name", [
+    ("front-door", "missing.mp4"),
+    ("front-door", "20240101-999999.mp4"),
+    ("front-door", "notes.txt"),
+    ("front-door", "../20240101.mp4"),
+    ("..", "20240101.mp4"),
+    (".", "20240101.mp4"),
+    ("a/b", "20240101.mp4"),
+])
+def test_rejects_other_names(recordings, slug, name):
+    assert rtsp_viewer.recording_file(slug, name) is None
+
+
+def test_rejects_symlinks_out_of_the_directory(recordings, tmp_path):
+    os.symlink(tmp_path, recordings / "escape")
+    assert rtsp_viewer.recording_file("escape", "20240101.mp4") is None
@@ -0,0 +1,112 @@
+import pytest
+
+from rtsp_viewer import FrameRing, parse_replay_args
+
+
+def frame(n: int, size: int = 30) -> bytes:
+    return bytes([n % 256]) * size
+
+
+def held(ring: FrameRing) -> list:
+    return [n for n, _ in ring.since(0)]
+
+
+def test_frames_are_numbered_and_read_back():
+    ring = FrameRing(1000, 10, 60)
+    for n in range(3):
+        ring.append(frame(n), float(n))
+    assert held(ring) == [0, 1, 2]
+    assert ring.get(1) == frame(1)
+    assert ring.get(3) is None
+
+
+def test_wrap_evicts_only_what_the_new_frame_overwrites():
+    ring = FrameRing(100, 10, 60)
+    for n in range(3):               # at 0, 30, 60
+        ring.append(frame(n), float(n))
+    ring.append(frame(3), 3.0)       # 90 + 30 > 100: wraps to 0 over frame 0
+    assert held(ring) == [1, 2, 3]
+    assert ring.get(0) is None
+    ring.append(frame(4), 4.0)       # 30..60, over frame 1
+    assert held(ring) == [2, 3, 4]
+    assert [ring.get(n) for n in (2, 3, 4)] == [frame(2), frame(3), frame(4)]
+
+
+def test_wrap_evicts_frames_in_the_skipped_tail():
+    ring = FrameRing(100, 10, 60)
+    for n, size in enumerate((10, 80, 10, 10)):  # the fourth wraps to 0 over frame 0
+        ring.append(frame(n, size), float(n))
+    ring.append(frame(4, 50), 4.0)   # 10..60, over frame 1; frame 2 stays at 90..100
+    assert held(ring) == [2, 3, 4]
+    ring.append(frame(5, 45), 5.0)   # wraps: frame 2 is older than 3 and 4 but not in the new range
+    assert held(ring) == [5]
+    assert ring.get(5) == frame(5, 45)
+
+
+def test_evicts_beyond_max_frames():
+    ring = FrameRing(1000, 3, 60)
+    for n in range(5):
+        ring.append(frame(n), float(n))
+    assert held(ring) == [2, 3, 4]
+    assert ring.get(4) == frame(4)
+
+
+def test_evicts_beyond_max_age():
+    ring = FrameRing(1000, 10, 10)
+    for t in (0.0, 5.0, 20.0):
+        ring.append(frame(int(t)), t)
+    assert ring.since(0) == [(2, 20.0)]
+
+
+def test_frame_larger_than_buffer_is_dropped():
+    ring = FrameRing(100, 10, 60)
+    ring.append(frame(0), 0.0)
+    ring.append(frame(1, 101), 1.0)
+    assert held(ring) == [0]
+
+
+def test_since_info_and_chunk():
+    ring = FrameRing(1000, 10, 60)
+    for n in range(4):
+        ring.append(frame(n), 100.0 + n)
+    assert [n for n, _ in ring.since(102.0)] == [2, 3]
+    info = ring.info()
+    assert (info["frames"], info["bytes"], info["oldest"], info["newest"]) == (4, 120, 100.0, 103.0)
+    chunk = ring.chunk(2)
+    assert chunk.startswith(b"--frame\r\n") and chunk.endswith(frame(2) + b"\r\n")
+    assert b"Content-Length: 30\r\n" in chunk
+    assert ring.chunk(9) is None
+    assert FrameRing(100, 2, 60).info()["frames"] == 0
+
+
+class _Reader:
+    def __init__(self):
+        self.state = "live"
+
+
+def test_one_recorder_until_it_stops():
+    ring = FrameRing(100, 2, 60)
+    first, second = _Reader(), _Reader()
+    assert ring.claim(first)
+    assert not ring.claim(second)
+    assert ring.claim(first)
+    first.state = "stopped"
+    assert ring.claim(second)
+    assert not ring.claim(first)
+
+
+@pytest.mark.parametrize("state", ["failed", "stopped"])
+def test_recorder_that_ended_is_replaced(state):
+    ring = FrameRing(100, 2, 60)
+    first = _Reader()
+    ring.claim(first)
+    first.state = state
+    assert ring.claim(_Reader())
+
+
+def test_parse_replay_args():
+    assert parse_replay_args({"seconds": "10", "speed": "2"}) == (10.0, 2.0)
+    for args in ({"seconds": "0"}, {"seconds": "nan"}, {"seconds": "inf"},
+                 {"speed": "0.05"}, {"speed": "nan"}):
+        with pytest.raises(ValueError):
+            parse_replay_args(args)
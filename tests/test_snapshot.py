@@ -0,0 +1,49 @@
+from email.utils import formatdate
+
+import cv2
+import numpy as np
+import pytest
+
+import rtsp_viewer
+from conftest import FakeCapture
+from rtsp_viewer import snapshot
+
+
+@pytest.fixture
+def slow_camera(monkeypatch):
+    # One frame every half second, so back-to-back requests see the same one.
+    monkeypatch.setattr(rtsp_viewer, "open_capture",
+                        lambda url, options: FakeCapture((320, 240), interval=0.5))
+    monkeypatch.setattr(rtsp_viewer, "SNAPSHOT_LINGER_SEC", 0.1)
+
+
+def test_serves_the_newest_frame(slow_camera):
+    status, body, headers = snapshot({"src": "test://snap/a", "w": "160"})
+    assert status == 200 and headers["Content-Type"] == "image/jpeg"
+    image = cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape == (120, 160, 3)
+    assert headers["Cache-Control"] == "no-cache"
+
+
+def test_conditional_requests(slow_camera):
+    args = {"src": "test://snap/b"}
+    _, _, headers = snapshot(args)
+    status, body, _ = snapshot(args, if_none_match=headers["ETag"])
+    assert (status, body) == (304, b"")
+    assert snapshot(args, if_modified_since=headers["Last-Modified"])[0] == 304
+    assert snapshot(args, if_modified_since=formatdate(0, usegmt=True))[0] == 200
+    # Each quality and size is its own representation.
+    assert snapshot({**args, "quality": "50"}, if_none_match=headers["ETag"])[0] == 200
+
+
+def test_no_frame_yet(monkeypatch):
+    monkeypatch.setattr(rtsp_viewer, "open_capture", lambda url, options: None)
+    monkeypatch.setattr(rtsp_viewer, "SNAPSHOT_WAIT_SEC", 0.1)
+    monkeypatch.setattr(rtsp_viewer, "SNAPSHOT_LINGER_SEC", 0.1)
+    status, _, headers = snapshot({"src": "test://snap/down"})
+    assert status == 503 and headers["Retry-After"] == "1"
+
+
+def test_bad_parameters():
+    with pytest.raises(ValueError):
+        snapshot({"src": "test://snap/c", "quality": "0"})
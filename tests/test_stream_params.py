@@ -0,0 +1,26 @@
+import pytest
+
+from rtsp_viewer import JPEG_QUALITY, stream_params
+
+
+def test_defaults():
+    assert stream_params({}) == (JPEG_QUALITY, 0.0, False)
+
+
+def test_values():
+    assert stream_params({"quality": "60", "fps": "2.5", "adaptive": "on"}) == (60, 2.5, True)
+    assert stream_params({"fps": ""}) == (JPEG_QUALITY, 0.0, False)
+
+
+@pytest.mark.parametrize("args", [
+    {"quality": "0"},
+    {"quality": "101"},
+    {"quality": "high"},
+    {"fps": "-1"},
+    {"fps": "nan"},
+    {"fps": "inf"},
+    {"fps": "-inf"},
+])
+def test_rejected(args):
+    with pytest.raises(ValueError):
+        stream_params(args)
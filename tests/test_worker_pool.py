@@ -0,0 +1,72 @@
+import os
+import signal
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import bench_pipeline
+import rtsp_viewer
+from rtsp_viewer import FeedSession, FrameView, WorkerReader, capture_hub
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(rtsp_viewer, "WORKER_PROCESSES", 1)
+    yield
+    if rtsp_viewer._worker_pool is not None:
+        rtsp_viewer._worker_pool.stop()
+        rtsp_viewer._worker_pool = None
+
+
+@pytest.fixture
+def clip(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    bench_pipeline.make_test_pattern(path, 320, 180, 300, 30.0)
+    return path
+
+
+def chunks(session: FeedSession, count: int) -> list:
+    seqs, deadline = [], time.monotonic() + 15
+    while len(seqs) < count and time.monotonic() < deadline:
+        seq, frame = session.reader.wait_frame(session.seq)
+        chunk = session.frame_chunk(seq, frame)
+        if chunk is not None:
+            seqs.append((seq, chunk))
+    return seqs
+
+
+def frames_read(label: str) -> float:
+    for line in rtsp_viewer.FRAMES_READ.samples():
+        if f'source="{label}"' in line:
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_worker_decodes_and_survives_a_crash(pool, clip):
+    reader = capture_hub.acquire(clip)
+    session = FeedSession(reader, view=FrameView(width=160))
+    try:
+        assert isinstance(reader, WorkerReader)
+        before = chunks(session, 3)
+        assert len(before) == 3 and reader.stats()["worker"] == 0
+        seq, chunk = before[-1]
+        jpg = chunk[chunk.index(b"\xff\xd8"):-2]
+        assert cv2.imdecode(np.frombuffer(jpg, np.uint8), cv2.IMREAD_COLOR).shape == (90, 160, 3)
+
+        time.sleep(rtsp_viewer.WORKER_METRICS_SEC * 1.5)
+        counted = frames_read(reader.label)
+        assert counted > 0
+
+        worker = rtsp_viewer._worker_pool.workers[0]
+        os.kill(worker.process.pid, signal.SIGKILL)
+        after = chunks(session, 3)
+        assert len(after) == 3 and after[0][0] > seq  # frame numbers carry on
+        assert worker.process.is_alive()
+
+        time.sleep(rtsp_viewer.WORKER_METRICS_SEC * 1.5)
+        assert frames_read(reader.label) > counted  # the new worker's counts add up
+    finally:
+        session.close()
+        capture_hub.release(reader)
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import time
+
+from rtsp_viewer_asgi import app
+
+
+async def ws_session(query: bytes, frames: int, ack_delay: float = 0.0) -> list:
+    """Connect to /ws_feed, ack ``frames`` binary frames, then hang up; returns what was sent."""
+    sent = []
+    incoming = asyncio.Queue()
+    incoming.put_nowait({"type": "websocket.connect"})
+
+    async def receive():
+        return await incoming.get()
+
+    async def send(message):
+        sent.append(message)
+        if "bytes" in message:
+            in_flight = len([m for m in sent if "bytes" in m])
+            if in_flight >= frames:
+                incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+            else:
+                asyncio.get_running_loop().call_later(
+                    ack_delay, incoming.put_nowait, {"type": "websocket.receive", "text": "ack"})
+
+    scope = {"type": "websocket", "path": "/ws_feed", "query_string": query, "headers": [],
+             "client": ("127.0.0.1", 5000)}
+    await asyncio.wait_for(app(scope, receive, send), 5.0)
+    return sent
+
+
+def test_frames_wait_for_the_page_to_ack(fake_capture):
+    started = time.monotonic()
+    sent = asyncio.run(ws_session(b"src=test://ws/a", 3, ack_delay=0.2))
+    elapsed = time.monotonic() - started
+    assert sent[0] == {"type": "websocket.accept"}
+    frames = [m["bytes"] for m in sent if "bytes" in m]
+    assert len(frames) == 3 and all(f.startswith(b"\xff\xd8") for f in frames)
+    # 100 frames a second are decoded, but only one is ever in flight.
+    assert elapsed >= 0.4
+    assert json.loads(next(m["text"] for m in sent if "text" in m))["state"] == "live"
+
+
+def test_bad_parameters_close_the_socket():
+    sent = asyncio.run(ws_session(b"src=test://ws/b&quality=0", 1))
+    assert sent[0]["type"] == "websocket.close" and sent[0]["code"] == 1008
+
+
+def test_unknown_websocket_path():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({"type": "websocket", "path": "/nope"}, None, send))
+    assert sent == [{"type": "websocket.close", "code": 1008}]